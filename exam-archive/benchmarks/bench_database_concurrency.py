@@ -0,0 +1,196 @@
+"""
+Measures exam listing reads while uploads are written concurrently, comparing SQLite
+with its default rollback journal, SQLite as configured (WAL) and PostgreSQL.
+
+Usage (from the exam-archive directory):
+    python benchmarks/bench_database_concurrency.py --readers 8 --writers 2 --duration 10
+    python benchmarks/bench_database_concurrency.py --postgresql-url postgresql://…/scratch
+
+The PostgreSQL database is migrated and filled with benchmark rows, use a scratch one.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "examarchive.settings")
+os.environ.setdefault("EXAMARCHIVE_ENVIORMENT", "development")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import OperationalError, connection, transaction  # noqa: E402
+
+from core.models import Course, Exam  # noqa: E402
+
+PAGE_SIZE: int = 50
+
+
+def _exam(course_id: int, index: int) -> Exam:
+    # Rows are created without files, so nothing is written to storage
+    return Exam(
+        file=f"exams/bench-{index}.pdf",
+        year=2000 + index % 50,
+        term="WS",
+        course_id=course_id,
+        metadata_status=Exam.MetadataStatus.DONE,
+    )
+
+
+def seed(exams: int) -> int:
+    course: Course = Course.objects.create(title="Benchmark")
+    Exam.objects.bulk_create([_exam(course.pk, i) for i in range(exams)])
+    return course.pk
+
+
+def read(stop: threading.Event, latencies: list[float], errors: list[str]) -> None:
+    try:
+        while not stop.is_set():
+            start: float = time.perf_counter()
+            try:
+                list(
+                    Exam.objects.published()
+                    .select_related("course")
+                    .order_by("-year", "-id")[:PAGE_SIZE]
+                )
+            except OperationalError as e:
+                errors.append(str(e))
+                continue
+            latencies.append(time.perf_counter() - start)
+    finally:
+        connection.close()
+
+
+def write(
+    stop: threading.Event,
+    course_id: int,
+    batch: int,
+    latencies: list[float],
+    errors: list[str],
+) -> None:
+    index: int = threading.get_ident() % 1_000_000 * 1_000_000
+    try:
+        while not stop.is_set():
+            start: float = time.perf_counter()
+            try:
+                with transaction.atomic():
+                    Exam.objects.bulk_create(
+                        [_exam(course_id, index + i) for i in range(batch)]
+                    )
+            except OperationalError as e:
+                errors.append(str(e))
+                continue
+            index += batch
+            latencies.append(time.perf_counter() - start)
+    finally:
+        connection.close()
+
+
+def run_profile(args: argparse.Namespace) -> dict:
+    """Runs the workload against the database configured in this process."""
+    call_command("migrate", verbosity=0)
+    course_id: int = seed(args.exams)
+
+    stop = threading.Event()
+    reads: list[float] = []
+    writes: list[float] = []
+    read_errors: list[str] = []
+    write_errors: list[str] = []
+    threads: list[threading.Thread] = [
+        threading.Thread(target=read, args=(stop, reads, read_errors))
+        for _ in range(args.readers)
+    ] + [
+        threading.Thread(
+            target=write, args=(stop, course_id, args.batch, writes, write_errors)
+        )
+        for _ in range(args.writers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    def percentile(values: list[float], p: int) -> float:
+        return statistics.quantiles(values, n=100)[p - 1] if len(values) > 1 else 0.0
+
+    return {
+        "reads_per_second": len(reads) / args.duration,
+        "read_p95_ms": percentile(reads, 95) * 1000,
+        "writes_per_second": len(writes) / args.duration,
+        "write_p95_ms": percentile(writes, 95) * 1000,
+        "errors": len(read_errors) + len(write_errors),
+    }
+
+
+def run_in_subprocess(profile: str, database_url: str, argv: list[str]) -> dict:
+    # Each profile gets a fresh process, as settings are read once at startup
+    env: dict[str, str] = {**os.environ, "EXAMARCHIVE_DATABASE_URL": database_url}
+    output: str = subprocess.run(
+        [sys.executable, __file__, *argv, "--profile", profile],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--batch", type=int, default=20, help="Exams per write.")
+    parser.add_argument("--exams", type=int, default=5000, help="Initial exams.")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds.")
+    parser.add_argument("--postgresql-url", default="")
+    parser.add_argument("--profile", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile is not None:
+        if args.profile == "sqlite-rollback":
+            # Drop the WAL and timeout tuning before the first connection is opened
+            settings.DATABASES["default"]["OPTIONS"] = {}
+        print(json.dumps(run_profile(args)))
+        return
+
+    argv: list[str] = [
+        *("--readers", str(args.readers), "--writers", str(args.writers)),
+        *("--batch", str(args.batch), "--exams", str(args.exams)),
+        *("--duration", str(args.duration)),
+    ]
+    print(
+        f"{'profile':<16} {'reads/s':>9} {'read p95':>10} {'writes/s':>9}"
+        f" {'write p95':>10} {'errors':>7}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        profiles: list[tuple[str, str]] = [
+            ("sqlite-rollback", f"sqlite:///{tmp}/rollback.sqlite3"),
+            ("sqlite-wal", f"sqlite:///{tmp}/wal.sqlite3"),
+        ]
+        if args.postgresql_url:
+            profiles.append(("postgresql", args.postgresql_url))
+
+        for profile, database_url in profiles:
+            result: dict = run_in_subprocess(profile, database_url, argv)
+            print(
+                f"{profile:<16} {result['reads_per_second']:>9.0f}"
+                f" {result['read_p95_ms']:>8.1f}ms {result['writes_per_second']:>9.0f}"
+                f" {result['write_p95_ms']:>8.1f}ms {result['errors']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Measures time and peak memory of the upload validation and metadata processing paths
+on synthetic PDF and DOCX files, optionally comparing against a stored baseline.
+
+Usage (from the exam-archive directory):
+    python benchmarks/bench_ingestion.py --output baseline.json
+    python benchmarks/bench_ingestion.py --baseline baseline.json --threshold 1.2
+
+Exits with status 1 if a measurement regressed beyond the threshold.
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from importlib.metadata import version
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "examarchive.settings")
+os.environ.setdefault("EXAMARCHIVE_ENVIORMENT", "development")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.files.storage import FileSystemStorage  # noqa: E402
+from django.db.models.fields.files import FieldFile  # noqa: E402
+from docx import Document  # noqa: E402
+
+from bench_pdf_metadata import generate_scanned_pdf  # noqa: E402
+from core.models import Exam  # noqa: E402
+from core.models.metadata_service import (  # noqa: E402
+    modify_file_metadata,
+    process_docx,
+    process_pdf,
+)
+from core.models.validators import validate_file_format  # noqa: E402
+from core.utils import extract_file_mime_type  # noqa: E402
+
+# (pages, size in MB) of the generated files
+CASES: dict[str, list[tuple[int, int]]] = {
+    "full": [(1, 1), (20, 5), (50, 10), (100, 25)],
+    "quick": [(1, 1), (10, 2)],
+}
+
+# Smaller differences to the baseline are noise rather than regressions
+NOISE_FLOORS: dict[str, float] = {
+    "median_seconds": 0.005,
+    "peak_memory_bytes": 256 * 1024,
+}
+
+
+@dataclass
+class Measurement:
+    function: str
+    case: str
+    file_size: int
+    median_seconds: float
+    peak_memory_bytes: int
+
+
+def _png(width: int, height: int) -> bytes:
+    """An uncompressed grayscale PNG of noise, which keeps DOCX files at their size."""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(data))
+            + kind
+            + data
+            + struct.pack(">I", zlib.crc32(kind + data))
+        )
+
+    rows: bytes = b"".join(b"\x00" + os.urandom(width) for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows, 0))
+        + chunk(b"IEND", b"")
+    )
+
+
+def generate_docx(path: Path, size_mb: int, pages: int) -> None:
+    """Writes a DOCX with a page of text and a 'scanned' image per page."""
+    document = Document()
+    image_width: int = 1024
+    image_height: int = max(size_mb * 1024 * 1024 // pages // image_width, 1)
+    for page in range(pages):
+        document.add_paragraph(f"Exercise {page + 1}. " + "Lorem ipsum dolor. " * 50)
+        document.add_picture(io.BytesIO(_png(image_width, image_height)))
+        if page < pages - 1:
+            document.add_page_break()
+    document.save(path)
+
+
+def _field_file(storage: FileSystemStorage, name: str) -> FieldFile:
+    file = FieldFile(Exam(), Exam._meta.get_field("file"), name)
+    file.storage = storage
+    return file
+
+
+def _validate(storage: FileSystemStorage, name: str) -> None:
+    file = _field_file(storage, name)
+    # Validators skip files that are already stored
+    file._committed = False
+    try:
+        validate_file_format(file)
+    finally:
+        file.close()
+
+
+def _sniff(storage: FileSystemStorage, name: str) -> None:
+    with _field_file(storage, name).open("rb") as file:
+        extract_file_mime_type(file)
+
+
+def _measure(
+    function: Callable[[FileSystemStorage, str], None],
+    storage: FileSystemStorage,
+    sample: str,
+    repeat: int,
+    rewrites: bool,
+) -> tuple[float, int]:
+    def run() -> float:
+        name: str = sample
+        if rewrites:
+            # Functions that modify the file get a fresh copy every time
+            name = f"work-{sample}"
+            shutil.copyfile(storage.path(sample), storage.path(name))
+        start: float = time.perf_counter()
+        function(storage, name)
+        return time.perf_counter() - start
+
+    # Timed without tracemalloc, whose bookkeeping slows allocations down
+    timings: list[float] = [run() for _ in range(repeat)]
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def run_benchmarks(cases: list[tuple[int, int]], repeat: int) -> list[Measurement]:
+    functions: dict[str, tuple[Callable, bool]] = {
+        "validate_file_format": (_validate, False),
+        "extract_file_mime_type": (_sniff, False),
+        "modify_file_metadata": (
+            lambda storage, name: modify_file_metadata(_field_file(storage, name)),
+            True,
+        ),
+    }
+    processors: dict[str, tuple[str, Callable]] = {
+        ".pdf": ("process_pdf", process_pdf),
+        ".docx": ("process_docx", process_docx),
+    }
+    generators: dict[str, Callable[[Path, int, int], None]] = {
+        ".pdf": generate_scanned_pdf,
+        ".docx": generate_docx,
+    }
+
+    measurements: list[Measurement] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = FileSystemStorage(location=tmp)
+        for extension, generate in generators.items():
+            name, process = processors[extension]
+            case_functions = {
+                **functions,
+                name: (lambda s, n, p=process: p(_field_file(s, n)), True),
+            }
+            for pages, size_mb in cases:
+                sample: str = f"sample-{pages}p-{size_mb}mb{extension}"
+                generate(Path(storage.path(sample)), size_mb, pages)
+                for function_name, (function, rewrites) in case_functions.items():
+                    seconds, peak = _measure(
+                        function, storage, sample, repeat, rewrites
+                    )
+                    measurements.append(
+                        Measurement(
+                            function=function_name,
+                            case=f"{extension[1:]}-{pages}p-{size_mb}mb",
+                            file_size=storage.size(sample),
+                            median_seconds=seconds,
+                            peak_memory_bytes=peak,
+                        )
+                    )
+                    print(
+                        f"{function_name:<24} {measurements[-1].case:<18}"
+                        f" {seconds * 1000:>10.1f}ms {peak / 1024 / 1024:>9.1f}MB"
+                    )
+    return measurements
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    """Returns a description of every measurement slower or larger than allowed."""
+    previous: dict[tuple[str, str], dict] = {
+        (m["function"], m["case"]): m for m in baseline["measurements"]
+    }
+    regressions: list[str] = []
+    for measurement in report["measurements"]:
+        before: dict | None = previous.get(
+            (measurement["function"], measurement["case"])
+        )
+        if before is None:
+            continue
+        for metric, noise_floor in NOISE_FLOORS.items():
+            increase: float = measurement[metric] - before[metric]
+            if increase > noise_floor and increase > (threshold - 1) * before[metric]:
+                regressions.append(
+                    f"{measurement['function']} {measurement['case']}: {metric} "
+                    f"{before[metric]:.4g} -> {measurement[metric]:.4g}"
+                )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", choices=CASES, default="full")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    parser.add_argument("--baseline", help="JSON report to compare against.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="Allowed ratio to the baseline before reporting a regression.",
+    )
+    args = parser.parse_args()
+
+    # The processors log every file they touch
+    logging.disable(logging.WARNING)
+
+    print(f"{'function':<24} {'case':<18} {'median':>12} {'peak':>11}")
+    measurements: list[Measurement] = run_benchmarks(CASES[args.cases], args.repeat)
+    report: dict = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            **{
+                package: version(package)
+                for package in ("django", "pypdf", "python-docx", "lxml")
+            },
+        },
+        "measurements": [asdict(measurement) for measurement in measurements],
+    }
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions: list[str] = compare(
+                report, json.load(baseline_file), args.threshold
+            )
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold}x of the baseline.")
+
+
+if __name__ == "__main__":
+    main()
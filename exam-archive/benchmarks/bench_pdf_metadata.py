@@ -0,0 +1,127 @@
+"""
+Compares the incremental-update PDF metadata writer with the full document rewrite.
+
+Usage (from the exam-archive directory):
+    python benchmarks/bench_pdf_metadata.py --sizes 1 5 10 25 50 --repeat 3
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "examarchive.settings")
+os.environ.setdefault("EXAMARCHIVE_ENVIORMENT", "development")
+
+import django  # noqa: E402
+
+django.setup()
+
+from pypdf import PdfWriter  # noqa: E402
+from pypdf.generic import (  # noqa: E402
+    DecodedStreamObject,
+    DictionaryObject,
+    NameObject,
+    NumberObject,
+)
+
+from core.models import pdf_metadata  # noqa: E402
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+METADATA: dict[str, str] = {"/Author": "Benchmark Author"}
+
+
+def generate_scanned_pdf(path: Path, size_mb: int, pages: int) -> None:
+    """Writes a PDF whose pages each hold one uncompressed grayscale 'scan'."""
+    writer = PdfWriter()
+    image_bytes: int = size_mb * 1024 * 1024 // pages
+    image_width: int = 1024
+    image_height: int = max(image_bytes // image_width, 1)
+
+    for _ in range(pages):
+        page = writer.add_blank_page(PAGE_WIDTH, PAGE_HEIGHT)
+
+        image = DecodedStreamObject()
+        image.set_data(os.urandom(image_width * image_height))
+        image.update(
+            {
+                NameObject("/Type"): NameObject("/XObject"),
+                NameObject("/Subtype"): NameObject("/Image"),
+                NameObject("/Width"): NumberObject(image_width),
+                NameObject("/Height"): NumberObject(image_height),
+                NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+                NameObject("/BitsPerComponent"): NumberObject(8),
+            }
+        )
+        content = DecodedStreamObject()
+        content.set_data(b"q %d 0 0 %d 0 0 cm /Im0 Do Q" % (PAGE_WIDTH, PAGE_HEIGHT))
+
+        page[NameObject("/Resources")] = DictionaryObject(
+            {
+                NameObject("/XObject"): DictionaryObject(
+                    {NameObject("/Im0"): writer._add_object(image)}
+                )
+            }
+        )
+        page[NameObject("/Contents")] = writer._add_object(content)
+
+    with open(path, "wb") as output:
+        writer.write(output)
+
+
+def incremental_update(path: Path) -> None:
+    with open(path, "rb") as pdf_file:
+        update: bytes = pdf_metadata.build_info_update(pdf_file, METADATA)
+    with open(path, "ab") as pdf_file:
+        pdf_file.write(update)
+
+
+def full_rewrite(path: Path) -> None:
+    output_path: Path = path.with_suffix(".out.pdf")
+    with open(path, "rb") as pdf_file, open(output_path, "wb") as output:
+        pdf_metadata.rewrite_metadata(pdf_file, output, METADATA)
+    os.replace(output_path, path)
+
+
+def measure(sample: Path, work_dir: Path, strategy, repeat: int) -> float:
+    timings: list[float] = []
+    for _ in range(repeat):
+        target: Path = work_dir / "target.pdf"
+        shutil.copyfile(sample, target)
+        start: float = time.perf_counter()
+        strategy(target)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 10, 25, 50])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'incremental':>14} {'full rewrite':>14} {'speedup':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        for size_mb in args.sizes:
+            sample: Path = work_dir / f"sample-{size_mb}mb.pdf"
+            generate_scanned_pdf(sample, size_mb, args.pages)
+
+            incremental: float = measure(
+                sample, work_dir, incremental_update, args.repeat
+            )
+            rewrite: float = measure(sample, work_dir, full_rewrite, args.repeat)
+            print(
+                f"{size_mb:>6}MB {incremental * 1000:>12.1f}ms {rewrite * 1000:>12.1f}ms"
+                f" {rewrite / incremental:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
 from core.admin.admin import DegreeTypeAdmin, FieldOfStudyAdmin  # noqa: F401
 from core.admin.course_admin import CourseAdmin  # noqa: F401
 from core.admin.exam_admin import ExamAdmin  # noqa: F401
+from core.admin.job_admin import MetadataJobAdmin  # noqa: F401
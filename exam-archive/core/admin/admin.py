@@ -14,3 +14,4 @@ class FieldOfStudyAdmin(admin.ModelAdmin):
     list_display = ("name", "abbreviation", "degree")
     search_fields = ("name", "abbreviation")
     list_filter = ("degree",)
+    list_select_related = ("degree",)
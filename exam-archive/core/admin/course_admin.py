@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib import admin
+from django.db.models import Count
 
 from core.models import Course, Exam, FieldOfStudy
 
@@ -53,7 +54,11 @@ class CourseAdmin(admin.ModelAdmin):
     filter_horizontal = ("fields_of_study",)
     readonly_fields = ("created_at", "updated_at")
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(exam_count=Count("exam"))
+
     def exams(self, obj):
-        return obj.exam_set.count()
+        return obj.exam_count
 
     exams.short_description = "Exams"
+    exams.admin_order_field = "exam_count"
@@ -49,6 +49,7 @@ class ExamAdmin(admin.ModelAdmin):
         "year",
         "term",
         "course",
+        "metadata_status",
         "created_at",
         "updated_at",
     )
@@ -57,6 +58,18 @@ class ExamAdmin(admin.ModelAdmin):
         "course",
         "file_type",
         "readable_term",
+        "metadata_status",
         "updated_at",
     )
-    readonly_fields = ("file_name", "file_type", "created_at", "updated_at")
+    list_filter = ("metadata_status",)
+    list_select_related = ("course",)
+    readonly_fields = (
+        "file_name",
+        "file_type",
+        "metadata_status",
+        "created_at",
+        "updated_at",
+    )
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_readable_term()
@@ -0,0 +1,46 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from core.cache import bump_listing_generation
+from core.jobs.backends import get_backend
+from core.models import Exam, MetadataJob
+
+
+@admin.register(MetadataJob)
+class MetadataJobAdmin(admin.ModelAdmin):
+    list_display = ("exam", "status", "attempts", "run_after", "updated_at")
+    list_filter = ("status",)
+    list_select_related = ("exam__course",)
+    readonly_fields = (
+        "exam",
+        "status",
+        "attempts",
+        "max_attempts",
+        "last_error",
+        "run_after",
+        "created_at",
+        "updated_at",
+    )
+    actions = ["retry_jobs"]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Retry selected jobs")
+    def retry_jobs(self, request, queryset):
+        job_ids = list(
+            queryset.exclude(status=MetadataJob.Status.RUNNING).values_list(
+                "pk", flat=True
+            )
+        )
+        MetadataJob.objects.filter(pk__in=job_ids).update(
+            status=MetadataJob.Status.PENDING, attempts=0, run_after=timezone.now()
+        )
+        Exam.objects.filter(jobs__pk__in=job_ids).update(
+            metadata_status=Exam.MetadataStatus.PENDING
+        )
+        bump_listing_generation()
+        for job_id in job_ids:
+            get_backend().submit(job_id)
+
+        self.message_user(request, f"Queued {len(job_ids)} job(s) for retry.")
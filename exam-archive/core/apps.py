@@ -7,3 +7,6 @@ class CoreConfig(AppConfig):
 
     def ready(self) -> None:
         import core.signals  # noqa: F401
+        from core.registry import build_registry
+
+        build_registry()
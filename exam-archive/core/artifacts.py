@@ -0,0 +1,191 @@
+import functools
+import io
+import logging
+import posixpath
+import zipfile
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F, QuerySet
+
+from core.handlers import run_stream_handler
+from core.models import Exam, ExamArtifacts
+from core.registry import FileFormat, get_file_format_by_mime_type
+from core.utils import extract_file_mime_type
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_FORMAT: str = "PNG"
+THUMBNAIL_CONTENT_TYPE: str = "image/png"
+_DOCX_APP_PROPERTIES: str = "docProps/app.xml"
+_DOCX_THUMBNAIL_PREFIX: str = "docProps/thumbnail."
+
+
+@dataclass
+class DerivedData:
+    """What the thumbnailer of a file format derives from an exam file."""
+
+    page_count: int | None = None
+    preview: str = ""
+    # Encoded image that the thumbnail is scaled down from
+    thumbnail_source: bytes | None = None
+
+
+@functools.cache
+def _pillow_image():
+    """PIL.Image, imported on first use like the other file parsers, or None."""
+    try:
+        from PIL import Image
+    except ImportError:  # Pillow is optional, without it exams have no thumbnails
+        return None
+    return Image
+
+
+def thumbnail_name(content_hash: str) -> str:
+    """Storage name of the thumbnail for the given content, e.g. 'artifacts/ab/ab….png'."""
+    return posixpath.join(
+        settings.EXAM_ARTIFACTS_DIRECTORY, content_hash[:2], f"{content_hash}.png"
+    )
+
+
+def current_artifacts(exam: Exam) -> ExamArtifacts | None:
+    """The artifacts of the exam, unless they were built from a previous file."""
+    artifacts: ExamArtifacts | None = getattr(exam, "artifacts", None)
+    if artifacts is None or artifacts.content_hash != exam.content_hash:
+        return None
+    return artifacts
+
+
+def exams_needing_artifacts(exams: QuerySet) -> QuerySet:
+    """Exams without artifacts, or whose file changed since they were built."""
+    return exams.exclude(artifacts__content_hash=F("content_hash"))
+
+
+def build_artifacts(exam: Exam, force: bool = False) -> ExamArtifacts:
+    """
+    Derives page count, size, preview and thumbnail of the exam file. Unless forced,
+    artifacts are only rebuilt when the content hash changed since the last build.
+    """
+    previous: ExamArtifacts | None = ExamArtifacts.objects.filter(exam=exam).first()
+    if previous is not None and previous.content_hash == exam.content_hash:
+        if not force:
+            return previous
+        default_storage.delete(thumbnail_name(exam.content_hash))
+
+    with exam.file.open("rb") as stream:
+        file_format: FileFormat | None = get_file_format_by_mime_type(
+            extract_file_mime_type(exam.file)
+        )
+        derived: DerivedData = (
+            run_stream_handler(file_format, file_format.thumbnailer, stream)
+            if file_format is not None and file_format.thumbnailer is not None
+            else DerivedData()
+        )
+        file_size: int = exam.file.size
+
+    artifacts, _ = ExamArtifacts.objects.update_or_create(
+        exam=exam,
+        defaults={
+            "content_hash": exam.content_hash,
+            "file_size": file_size,
+            "page_count": derived.page_count,
+            "preview": " ".join(derived.preview.split())[
+                : settings.EXAM_PREVIEW_LENGTH
+            ],
+            "has_thumbnail": _store_thumbnail(
+                exam.content_hash, derived.thumbnail_source
+            ),
+        },
+    )
+    if previous is not None and previous.content_hash != exam.content_hash:
+        delete_artifacts(previous.content_hash)
+    return artifacts
+
+
+def delete_artifacts(content_hash: str) -> None:
+    """Deletes the stored artifacts of the content, unless an exam still uses them."""
+    if not content_hash or Exam.objects.filter(content_hash=content_hash).exists():
+        return
+    default_storage.delete(thumbnail_name(content_hash))
+
+
+def _store_thumbnail(content_hash: str, source: bytes | None) -> bool:
+    Image = _pillow_image()
+    if Image is None or source is None:
+        return False
+
+    name: str = thumbnail_name(content_hash)
+    # Identical files share their thumbnail
+    if default_storage.exists(name):
+        return True
+
+    try:
+        with Image.open(io.BytesIO(source)) as image:
+            image.thumbnail((settings.EXAM_THUMBNAIL_SIZE,) * 2)
+            output = io.BytesIO()
+            image.convert("RGB").save(output, THUMBNAIL_FORMAT, optimize=True)
+    except Exception as e:
+        logger.warning(
+            f"Could not create a thumbnail for content '{content_hash}': {e}"
+        )
+        return False
+
+    default_storage.save(name, ContentFile(output.getvalue()))
+    return True
+
+
+def derive_pdf(stream: BinaryIO) -> DerivedData:
+    from pypdf import PdfReader
+
+    reader = PdfReader(stream)
+    if not reader.pages:
+        return DerivedData(page_count=0)
+
+    first_page = reader.pages[0]
+    derived = DerivedData(
+        page_count=len(reader.pages), preview=first_page.extract_text() or ""
+    )
+    if _pillow_image() is not None:
+        # Without a PDF renderer, the page scan of scanned exams makes the thumbnail
+        try:
+            largest = max(first_page.images, key=lambda i: len(i.data), default=None)
+        except Exception as e:
+            logger.info(f"Could not read the images of the first page: {e}")
+        else:
+            derived.thumbnail_source = largest.data if largest else None
+    return derived
+
+
+def derive_docx(stream: BinaryIO) -> DerivedData:
+    from docx import Document
+    from lxml import etree
+
+    derived = DerivedData()
+    with zipfile.ZipFile(stream) as archive:
+        names: list[str] = archive.namelist()
+        if _DOCX_APP_PROPERTIES in names:
+            # Page count as last computed by the authoring application
+            pages = etree.fromstring(archive.read(_DOCX_APP_PROPERTIES)).find(
+                "{*}Pages"
+            )
+            if pages is not None and (pages.text or "").isdigit():
+                derived.page_count = int(pages.text)
+        thumbnail: str | None = next(
+            (name for name in names if name.startswith(_DOCX_THUMBNAIL_PREFIX)), None
+        )
+        if thumbnail is not None:
+            derived.thumbnail_source = archive.read(thumbnail)
+
+    stream.seek(0)
+    preview_parts: list[str] = []
+    length: int = 0
+    for paragraph in Document(stream).paragraphs:
+        if length >= settings.EXAM_PREVIEW_LENGTH:
+            break
+        preview_parts.append(paragraph.text)
+        length += len(paragraph.text) + 1
+    derived.preview = "\n".join(preview_parts)
+    return derived
@@ -0,0 +1,131 @@
+import functools
+import hashlib
+import time
+from collections.abc import Callable
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpRequest, HttpResponse
+
+from core.metrics import LISTING_CACHE_REQUESTS
+from core.models import ListingGeneration
+
+# Primary key of the single ListingGeneration row
+LISTING_GENERATION_ID: int = 1
+LISTING_GENERATION_CACHE_KEY: str = "listing:generation"
+
+
+def get_listing_generation() -> int:
+    """
+    The generation of cached listings, cached for LISTING_GENERATION_TIMEOUT seconds
+    so that serving a cached listing needs no database query.
+    """
+    generation: int | None = cache.get(LISTING_GENERATION_CACHE_KEY)
+    if generation is None:
+        generation = _read_listing_generation()
+        cache.set(
+            LISTING_GENERATION_CACHE_KEY,
+            generation,
+            settings.LISTING_GENERATION_TIMEOUT,
+        )
+    return generation
+
+
+def _read_listing_generation() -> int:
+    generation: int | None = (
+        ListingGeneration.objects.filter(pk=LISTING_GENERATION_ID)
+        .values_list("value", flat=True)
+        .first()
+    )
+    if generation is None:
+        # Starting from the current time instead of 1 keeps entries cached before
+        # the database was reset from being served again
+        generation = ListingGeneration.objects.get_or_create(
+            pk=LISTING_GENERATION_ID, defaults={"value": time.time_ns()}
+        )[0].value
+    return generation
+
+
+def bump_listing_generation() -> None:
+    """
+    Invalidates all cached listings, to be called whenever listed data changed.
+    Inside a transaction, the new generation is only seen once it is committed.
+    """
+    if not ListingGeneration.objects.filter(pk=LISTING_GENERATION_ID).update(
+        value=F("value") + 1
+    ):
+        _read_listing_generation()
+    # Requests may cache the old generation again until the new one is committed
+    cache.delete(LISTING_GENERATION_CACHE_KEY)
+    transaction.on_commit(functools.partial(cache.delete, LISTING_GENERATION_CACHE_KEY))
+
+
+def _listing_key(view: str, request: HttpRequest) -> str:
+    query: str = "&".join(sorted(request.GET.urlencode().split("&")))
+    digest: str = hashlib.sha256(f"{request.path}?{query}".encode()).hexdigest()
+    return f"listing:{get_listing_generation()}:{view}:{digest}"
+
+
+def _cached_response(
+    view: str, cached: tuple[str, bytes] | None
+) -> HttpResponse | None:
+    LISTING_CACHE_REQUESTS.inc(view=view, result="miss" if cached is None else "hit")
+    if cached is None:
+        return None
+    content_type, content = cached
+    response = HttpResponse(content, content_type=content_type)
+    response["X-Cache"] = "HIT"
+    return response
+
+
+def _cacheable(response: HttpResponse) -> tuple[str, bytes] | None:
+    response["X-Cache"] = "MISS"
+    if response.status_code != 200 or response.streaming:
+        return None
+    return response["Content-Type"], response.content
+
+
+def cache_listing(view_func: Callable) -> Callable:
+    """
+    Caches successful responses of a listing view per path and query string, until
+    bump_listing_generation() is called or LISTING_CACHE_TIMEOUT passed.
+    Works for sync and async views.
+    """
+    view: str = view_func.__name__
+
+    if iscoroutinefunction(view_func):
+
+        @functools.wraps(view_func)
+        async def async_wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            if settings.LISTING_CACHE_TIMEOUT <= 0:
+                return await view_func(request, *args, **kwargs)
+
+            key: str = await sync_to_async(_listing_key)(view, request)
+            response: HttpResponse | None = _cached_response(
+                view, await cache.aget(key)
+            )
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+                if (value := _cacheable(response)) is not None:
+                    await cache.aset(key, value, settings.LISTING_CACHE_TIMEOUT)
+            return response
+
+        return async_wrapper
+
+    @functools.wraps(view_func)
+    def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        if settings.LISTING_CACHE_TIMEOUT <= 0:
+            return view_func(request, *args, **kwargs)
+
+        key: str = _listing_key(view, request)
+        response: HttpResponse | None = _cached_response(view, cache.get(key))
+        if response is None:
+            response = view_func(request, *args, **kwargs)
+            if (value := _cacheable(response)) is not None:
+                cache.set(key, value, settings.LISTING_CACHE_TIMEOUT)
+        return response
+
+    return wrapper
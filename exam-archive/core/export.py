@@ -0,0 +1,111 @@
+import hashlib
+import logging
+import zipfile
+from collections.abc import Iterable, Iterator
+
+from django.db.models import QuerySet
+
+from core.models import Exam
+from core.registry import FileFormat, get_file_format
+from core.utils import extract_file_extension, to_snake_case
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE: int = 64 * 1024
+
+
+class _ZipOutput:
+    """Write-only, unseekable sink that hands out what zipfile wrote so far."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data: bytes = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _compress_type(exam: Exam) -> int:
+    file_format: FileFormat | None = get_file_format(extract_file_extension(exam.file))
+    if file_format and file_format.compressed:
+        # Deflating already-compressed files costs CPU and gains nothing
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _entry_name(exam: Exam, used_names: set[str]) -> str:
+    # Winter terms read e.g. 'WS-2023/24', which would create a sub-directory
+    name: str = exam.file_name.replace("/", "-")
+    stem, dot, extension = name.rpartition(".")
+    counter: int = 2
+    while name in used_names:
+        name = f"{stem}-{counter}{dot}{extension}"
+        counter += 1
+    used_names.add(name)
+    return name
+
+
+def stream_exam_archive(exams: Iterable[Exam]) -> Iterator[bytes]:
+    """
+    Yields a ZIP archive of the given exams piece by piece.
+
+    The archive is written to an unseekable sink, so zipfile emits data descriptors
+    instead of seeking back, and only one chunk of one file is held in memory at a
+    time. Exams whose file is missing are skipped.
+    """
+    output = _ZipOutput()
+    used_names: set[str] = set()
+
+    with zipfile.ZipFile(output, "w") as archive:
+        for exam in exams:
+            try:
+                source = exam.file.open("rb")
+            except FileNotFoundError:
+                logger.warning(
+                    f"Skipping exam #{exam.pk} in export, file '{exam.file.name}' is missing."
+                )
+                continue
+
+            info = zipfile.ZipInfo(
+                _entry_name(exam, used_names),
+                date_time=exam.updated_at.timetuple()[:6],
+            )
+            info.compress_type = _compress_type(exam)
+            with source, archive.open(info, "w") as entry:
+                for chunk in source.chunks(EXPORT_CHUNK_SIZE):
+                    entry.write(chunk)
+                    yield output.drain()
+            yield output.drain()
+
+    yield output.drain()
+
+
+def export_etag(exams: QuerySet) -> str:
+    """A strong ETag that changes whenever the set or content of the exams changes."""
+    digest = hashlib.sha256()
+    for pk, content_hash, updated_at in exams.order_by("pk").values_list(
+        "pk", "content_hash", "updated_at"
+    ):
+        digest.update(f"{pk}:{content_hash}:{updated_at.isoformat()};".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def export_file_name(exams: QuerySet, params: dict) -> str:
+    parts: list[str] = ["exams"]
+    course_id: str | None = params.get("course")
+    if course_id:
+        exam: Exam | None = exams.select_related("course").first()
+        if exam is not None:
+            parts.append(to_snake_case(exam.course.title))
+    for key in ("year", "term"):
+        if params.get(key):
+            parts.append(str(params[key]))
+    return "-".join(parts) + ".zip"
@@ -0,0 +1,63 @@
+from django.core.exceptions import ValidationError
+from django.db.models import QuerySet
+from django.http import QueryDict
+
+from core.models import Course
+from core.models.validators import validate_term, validate_year
+
+
+def _get_int(params: QueryDict, key: str) -> int | None:
+    value: str | None = params.get(key)
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError(f"'{key}' must be an integer, got '{value}'.")
+
+
+def filter_courses(queryset: QuerySet, params: QueryDict) -> QuerySet:
+    """
+    Filters courses by the 'field_of_study' and 'degree' query parameters.
+    Courses belong to several fields of study, so both use subqueries instead of
+    joins to avoid returning a course once per matching field.
+    """
+    field_of_study: int | None = _get_int(params, "field_of_study")
+    if field_of_study is not None:
+        queryset = queryset.filter(
+            pk__in=Course.objects.filter(fields_of_study=field_of_study).values("pk")
+        )
+
+    degree: int | None = _get_int(params, "degree")
+    if degree is not None:
+        queryset = queryset.filter(
+            pk__in=Course.objects.filter(fields_of_study__degree=degree).values("pk")
+        )
+
+    return queryset
+
+
+def filter_exams(queryset: QuerySet, params: QueryDict) -> QuerySet:
+    """
+    Filters exams by the 'course', 'field_of_study', 'degree', 'year' and 'term'
+    query parameters. Raises ValidationError for malformed values.
+    """
+    course: int | None = _get_int(params, "course")
+    if course is not None:
+        queryset = queryset.filter(course_id=course)
+
+    if params.get("field_of_study") or params.get("degree"):
+        courses: QuerySet = filter_courses(Course.objects.all(), params)
+        queryset = queryset.filter(course__in=courses.values("pk"))
+
+    year: int | None = _get_int(params, "year")
+    if year is not None:
+        validate_year(year)
+        queryset = queryset.filter(year=year)
+
+    term: str | None = params.get("term")
+    if term:
+        validate_term(term)
+        queryset = queryset.filter(term=term)
+
+    return queryset
@@ -0,0 +1,33 @@
+import os
+
+from django import forms
+from django.core.exceptions import ValidationError
+
+from core.models import Exam, ExamUpload
+from core.registry import get_file_format, get_registry
+
+
+class ExamUploadForm(forms.ModelForm):
+    """Exam uploads through the API; the file is validated by the model validators."""
+
+    class Meta:
+        model = Exam
+        fields = ("file", "year", "term", "course")
+
+
+class ExamUploadMetadataForm(forms.ModelForm):
+    """Exam fields of a resumable upload, validated before any bytes are sent."""
+
+    class Meta:
+        model = ExamUpload
+        fields = ("filename", "year", "term", "course")
+
+    def clean_filename(self) -> str:
+        filename: str = self.cleaned_data["filename"]
+        extension: str = os.path.splitext(filename)[1].lower()
+        if get_file_format(extension) is None:
+            raise ValidationError(
+                f"Unsupported file extension: {extension or filename}. Allowed "
+                f"extensions are: {', '.join(get_registry().formats_by_extension)}"
+            )
+        return filename
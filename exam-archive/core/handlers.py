@@ -0,0 +1,107 @@
+"""
+Runs the file handlers of the registry where their file format declares:
+"inline" in the calling thread, "thread" in a shared thread pool or "process" in a
+shared pool of worker processes, which keeps CPU-bound parsing from holding the
+GIL of web workers. Both pools have EXAM_FILE_HANDLER_WORKERS workers and are
+created on first use.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import threading
+from collections.abc import Callable
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import BinaryIO, TypeVar
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db.models.fields.files import FieldFile
+
+from core.registry import FileFormat
+from core.workers import create_process_pool, in_worker_process
+
+T = TypeVar("T")
+
+_executors: dict[str, Executor] = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(execution: str) -> Executor | None:
+    """The pool for the execution mode, or None if the handler runs inline."""
+    # Jobs of the process backend already run in a worker, which has no pool of its own
+    if execution == "inline" or in_worker_process():
+        return None
+    with _executors_lock:
+        if execution not in _executors:
+            workers: int = settings.EXAM_FILE_HANDLER_WORKERS
+            _executors[execution] = (
+                create_process_pool(workers)
+                if execution == "process"
+                else ThreadPoolExecutor(workers, thread_name_prefix="file-handler")
+            )
+        return _executors[execution]
+
+
+def run_stream_handler(
+    file_format: FileFormat, handler: Callable[[BinaryIO], T], stream: BinaryIO
+) -> T:
+    """Runs a handler reading an open file, e.g. a text extractor."""
+    executor: Executor | None = _get_executor(file_format.execution)
+    if executor is None:
+        return handler(stream)
+    if file_format.execution == "process":
+        # Open files cannot be sent to another process, their content is
+        return executor.submit(_call_with_content, handler, stream.read()).result()
+    return executor.submit(handler, stream).result()
+
+
+def run_file_handler(
+    file_format: FileFormat, handler: Callable[[FieldFile], T], file: FieldFile
+) -> T:
+    """Runs a handler rewriting a stored file in place, e.g. a processor."""
+    executor: Executor | None = _get_executor(file_format.execution)
+    if executor is None:
+        return handler(file)
+    if file_format.execution == "thread":
+        return executor.submit(handler, file).result()
+
+    # Worker processes rewrite the file on disk, through a local copy if needed
+    if not isinstance(file.storage, FileSystemStorage):
+        return _run_on_local_copy(executor, handler, file)
+    return executor.submit(_call_with_path, handler, file.path).result()
+
+
+def _run_on_local_copy(
+    executor: Executor, handler: Callable[[FieldFile], T], file: FieldFile
+) -> T:
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, os.path.basename(file.name))
+        with file.open("rb") as source, open(path, "wb") as copy:
+            shutil.copyfileobj(source, copy)
+        copied: os.stat_result = os.stat(path)
+
+        result: T = executor.submit(_call_with_path, handler, path).result()
+
+        modified: os.stat_result = os.stat(path)
+        if (modified.st_mtime_ns, modified.st_size) != (
+            copied.st_mtime_ns,
+            copied.st_size,
+        ):
+            with open(path, "rb") as source, file.open("wb") as target:
+                shutil.copyfileobj(source, target)
+    return result
+
+
+def _call_with_content(handler: Callable[[BinaryIO], T], content: bytes) -> T:
+    return handler(io.BytesIO(content))
+
+
+def _call_with_path(handler: Callable[[FieldFile], T], path: str) -> T:
+    from core.models import Exam
+
+    directory, name = os.path.split(path)
+    file = FieldFile(None, Exam._meta.get_field("file"), name)
+    file.storage = FileSystemStorage(location=directory)
+    return handler(file)
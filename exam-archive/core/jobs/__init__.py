@@ -0,0 +1,10 @@
+from core.jobs.metadata_jobs import (  # noqa: F401
+    copy_derived_data,
+    enqueue_metadata_job,
+    enqueue_metadata_jobs,
+    optimize_exam,
+    reclaim_stale_metadata_jobs,
+    run_due_metadata_jobs,
+    run_metadata_job,
+    wait_for_metadata_jobs,
+)
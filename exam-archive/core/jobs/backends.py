@@ -0,0 +1,93 @@
+import functools
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from core.jobs.metadata_jobs import run_metadata_job_with_retries
+from core.workers import create_process_pool
+
+logger = logging.getLogger(__name__)
+
+
+class BaseJobBackend:
+    """Base class for metadata job backends."""
+
+    def submit(self, job_id: int) -> None:
+        raise NotImplementedError
+
+    def wait(self) -> None:
+        """Blocks until the submitted jobs are finished, for callers about to exit."""
+
+
+class SyncJobBackend(BaseJobBackend):
+    """Runs jobs inline, blocking the caller. Mainly useful for development and tests."""
+
+    def submit(self, job_id: int) -> None:
+        run_metadata_job_with_retries(job_id)
+
+
+class DatabaseJobBackend(BaseJobBackend):
+    """
+    Leaves jobs in the job table to be picked up by `manage.py process_metadata_jobs`.
+    """
+
+    def submit(self, job_id: int) -> None:
+        logger.info(f"Metadata job #{job_id} queued for a database worker.")
+
+
+class _PoolJobBackend(BaseJobBackend):
+    def __init__(self, max_workers: int) -> None:
+        self.max_workers = max_workers
+        self._executor: Executor | None = None
+
+    def _create_executor(self) -> Executor:
+        raise NotImplementedError
+
+    def submit(self, job_id: int) -> None:
+        if self._executor is None:
+            self._executor = self._create_executor()
+        self._executor.submit(run_metadata_job_with_retries, job_id)
+
+    def wait(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+class ThreadPoolJobBackend(_PoolJobBackend):
+    """Runs jobs in a thread pool of the current process."""
+
+    def _create_executor(self) -> Executor:
+        return ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="metadata-job"
+        )
+
+
+class ProcessPoolJobBackend(_PoolJobBackend):
+    """Runs jobs in a pool of separate processes, keeping CPU-bound work off the GIL."""
+
+    def _create_executor(self) -> Executor:
+        return create_process_pool(self.max_workers)
+
+
+JOB_BACKENDS: dict[str, type[BaseJobBackend]] = {
+    "sync": SyncJobBackend,
+    "thread": ThreadPoolJobBackend,
+    "process": ProcessPoolJobBackend,
+    "database": DatabaseJobBackend,
+}
+
+
+@functools.cache
+def get_backend() -> BaseJobBackend:
+    """Returns the job backend configured in settings.EXAM_METADATA_JOB_BACKEND."""
+    backend_name: str = settings.EXAM_METADATA_JOB_BACKEND
+    backend_class: type[BaseJobBackend] = JOB_BACKENDS.get(backend_name) or (
+        import_string(backend_name)
+    )
+
+    if issubclass(backend_class, _PoolJobBackend):
+        return backend_class(max_workers=settings.EXAM_METADATA_JOB_WORKERS)
+    return backend_class()
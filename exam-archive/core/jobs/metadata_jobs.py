@@ -0,0 +1,339 @@
+import logging
+import posixpath
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from typing import TypeVar
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, Storage
+from django.db import close_old_connections
+from django.db.models import F
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from core.artifacts import build_artifacts
+from core.cache import bump_listing_generation
+from core.metrics import STORAGE_WRITE_SECONDS, file_type_label
+from core.models import Exam, ExamArtifacts, ExamText, MetadataJob
+from core.models.metadata_service import (
+    FileOptimization,
+    modify_file_metadata,
+    optimize_file,
+)
+from core.search import index_exam
+from core.utils import compute_file_hash
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def enqueue_metadata_job(exam_id: int) -> MetadataJob | None:
+    """Creates a metadata job for the exam and hands it to the configured backend."""
+    from core.jobs.backends import get_backend
+
+    if MetadataJob.objects.filter(
+        exam_id=exam_id, status=MetadataJob.Status.PENDING
+    ).exists():
+        logger.info(f"Metadata job for exam #{exam_id} is already queued.")
+        return None
+
+    job = MetadataJob.objects.create(exam_id=exam_id)
+    get_backend().submit(job.pk)
+    return job
+
+
+def enqueue_metadata_jobs(exam_ids: list[int]) -> list[MetadataJob]:
+    """Bulk variant of enqueue_metadata_job() for freshly created exams."""
+    from core.jobs.backends import get_backend
+
+    jobs: list[MetadataJob] = MetadataJob.objects.bulk_create(
+        [MetadataJob(exam_id=exam_id) for exam_id in exam_ids]
+    )
+    backend = get_backend()
+    for job in jobs:
+        backend.submit(job.pk)
+    return jobs
+
+
+def wait_for_metadata_jobs() -> None:
+    """
+    Waits for the jobs queued by this process. Management commands call it before
+    exiting, as the jobs of pool backends would otherwise be cut off.
+    """
+    from core.jobs.backends import get_backend
+
+    get_backend().wait()
+
+
+def run_metadata_job(job_id: int) -> MetadataJob | None:
+    """
+    Runs a single attempt of the given job and records its outcome.
+    Returns None if the job was claimed by another worker or no longer exists.
+    """
+    claimed_at: datetime = timezone.now()
+    claimed: int = MetadataJob.objects.filter(
+        pk=job_id, status=MetadataJob.Status.PENDING
+    ).update(
+        status=MetadataJob.Status.RUNNING,
+        attempts=F("attempts") + 1,
+        updated_at=claimed_at,
+    )
+    if not claimed:
+        return None
+
+    job: MetadataJob = MetadataJob.objects.select_related("exam").get(pk=job_id)
+    exam: Exam = job.exam
+    original_name: str = exam.file.name
+
+    try:
+        processed_name, optimization = _rewrite_file(exam.file, modify_file_metadata)
+        content_hash, file_size = _hash_and_size(exam.file.storage, processed_name)
+    except Exception as e:
+        failed: bool = job.attempts >= job.max_attempts
+        delay: int = settings.EXAM_METADATA_JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+
+        job.status = MetadataJob.Status.FAILED if failed else MetadataJob.Status.PENDING
+        job.last_error = str(e)
+        job.run_after = timezone.now() + timedelta(seconds=delay)
+        job.save(update_fields=["status", "last_error", "run_after", "updated_at"])
+
+        if failed:
+            Exam.objects.filter(pk=exam.pk).update(
+                metadata_status=Exam.MetadataStatus.FAILED
+            )
+            logger.error(
+                f"Metadata job #{job.pk} for exam #{exam.pk} failed after {job.attempts} attempts."
+            )
+        else:
+            logger.warning(
+                f"Metadata job #{job.pk} for exam #{exam.pk} failed, retrying in {delay}s."
+            )
+        return job
+
+    job.status = MetadataJob.Status.DONE
+    job.last_error = ""
+    job.save(update_fields=["status", "last_error", "updated_at"])
+    if _record_rewrite(
+        exam,
+        original_name,
+        processed_name,
+        content_hash,
+        file_size,
+        optimization,
+        started_at=claimed_at,
+        metadata_status=Exam.MetadataStatus.DONE,
+        metadata_author=settings.EXAM_METADATA_AUTHOR,
+    ):
+        # Queryset updates send no signals, but the exam is published now
+        bump_listing_generation()
+        _derive_from_file(exam)
+    return job
+
+
+def optimize_exam(exam_id: int) -> FileOptimization | None:
+    """
+    Optimizes the stored file of a processed exam, regardless of
+    EXAM_PDF_OPTIMIZATION. Returns None if the exam does not exist, is not processed
+    yet or has no optimizer for its file type. Runs in worker processes.
+    """
+    started_at: datetime = timezone.now()
+    try:
+        exam: Exam = Exam.objects.get(
+            pk=exam_id, metadata_status=Exam.MetadataStatus.DONE
+        )
+        original_name: str = exam.file.name
+        original_hash: str = exam.content_hash
+        processed_name, optimization = _rewrite_file(exam.file, optimize_file)
+        if optimization is None:
+            return None
+        content_hash, file_size = _hash_and_size(exam.file.storage, processed_name)
+        updated: bool = _record_rewrite(
+            exam,
+            original_name,
+            processed_name,
+            content_hash,
+            file_size,
+            optimization,
+            started_at=started_at,
+        )
+        if updated and content_hash != original_hash:
+            bump_listing_generation()
+            _derive_from_file(exam)
+        return optimization
+    except Exam.DoesNotExist:
+        return None
+    finally:
+        close_old_connections()
+
+
+def _record_rewrite(
+    exam: Exam,
+    original_name: str,
+    processed_name: str,
+    content_hash: str,
+    file_size: int,
+    optimization: FileOptimization | None,
+    started_at: datetime,
+    **fields,
+) -> bool:
+    """
+    Points the exam at its rewritten file and records the file's hash and size.
+    Files modified after started_at, when the rewrite began, are not deleted.
+    Returns whether the exam was updated.
+    """
+    if optimization is not None:
+        fields["original_size"] = optimization.original_size
+        fields["optimized_size"] = optimization.optimized_size
+
+    # Only record the result if the exam still points at the file that was processed
+    updated: int = Exam.objects.filter(pk=exam.pk, file=original_name).update(
+        file=processed_name,
+        content_hash=content_hash,
+        file_size=file_size,
+        **fields,
+    )
+    if processed_name != original_name:
+        # Either the original or, if the exam changed meanwhile, the result is unused.
+        # An upload with the same content may have stored the blob again but not saved
+        # its exam yet; a kept blob is left to `manage.py fsck_exams`
+        Exam.delete_file_if_unreferenced(
+            exam.file.storage,
+            original_name if updated else processed_name,
+            unmodified_since=started_at,
+        )
+    if updated:
+        exam.file = processed_name
+        exam.content_hash = content_hash
+    return bool(updated)
+
+
+def _hash_and_size(storage: Storage, name: str) -> tuple[str, int]:
+    with storage.open(name, "rb") as file:
+        return compute_file_hash(file), storage.size(name)
+
+
+def _rewrite_file(file: FieldFile, rewrite: Callable[[FieldFile], T]) -> tuple[str, T]:
+    """
+    Rewrites an exam file in-place with the given function. Returns the name of the
+    result and what the function returned.
+    """
+    if not getattr(file.storage, "content_addressed", False):
+        return file.name, rewrite(file)
+
+    # Content-addressed files are shared and immutable, so a private copy is
+    # processed and the result stored as a file of its own
+    with tempfile.TemporaryDirectory() as work_directory:
+        work_storage = FileSystemStorage(location=work_directory)
+        work_name: str = work_storage.save(posixpath.basename(file.name), file)
+        work_file = FieldFile(file.instance, file.field, work_name)
+        work_file.storage = work_storage
+        result: T = rewrite(work_file)
+        with (
+            work_file.open("rb"),
+            STORAGE_WRITE_SECONDS.time(file_type=file_type_label(work_name)),
+        ):
+            name: str = file.storage.save(
+                file.field.generate_filename(file.instance, work_name), work_file
+            )
+        return name, result
+
+
+def copy_derived_data(source: Exam, target: Exam) -> None:
+    """Gives an exam the search text and artifacts of one with identical content."""
+    for model in (ExamText, ExamArtifacts):
+        values: dict | None = model.objects.filter(exam=source).values().first()
+        if values is None:
+            continue
+        del values["exam_id"], values["updated_at"]
+        model.objects.update_or_create(exam=target, defaults=values)
+
+
+def _derive_from_file(exam: Exam) -> None:
+    # The file itself is fine at this point, so failures here do not fail the job;
+    # `manage.py rebuild_search_index` and `build_exam_artifacts` catch up later
+    for derive in (index_exam, build_artifacts):
+        try:
+            derive(exam)
+        except Exception as e:
+            logger.warning(f"{derive.__name__}() failed for exam #{exam.pk}: {e}")
+
+
+def run_metadata_job_with_retries(job_id: int) -> None:
+    """Runs a job until it succeeds or runs out of attempts, waiting between retries."""
+    try:
+        while True:
+            job: MetadataJob | None = run_metadata_job(job_id)
+            if job is None or job.status != MetadataJob.Status.PENDING:
+                return
+            time.sleep(max((job.run_after - timezone.now()).total_seconds(), 0))
+    except Exception:
+        logger.exception(f"Unexpected error while running metadata job #{job_id}.")
+    finally:
+        close_old_connections()
+
+
+def reclaim_stale_metadata_jobs() -> int:
+    """
+    Requeues jobs that are running for longer than EXAM_METADATA_JOB_TIMEOUT, as
+    their worker died, or fails them if they are out of attempts. Returns the
+    number of reclaimed jobs.
+    """
+    now = timezone.now()
+    stale_jobs: list[MetadataJob] = list(
+        MetadataJob.objects.filter(
+            status=MetadataJob.Status.RUNNING,
+            updated_at__lt=now - timedelta(seconds=settings.EXAM_METADATA_JOB_TIMEOUT),
+        )
+    )
+
+    reclaimed: int = 0
+    for job in stale_jobs:
+        failed: bool = job.attempts >= job.max_attempts
+        # Unless the job finished or was reclaimed by another worker meanwhile
+        if not MetadataJob.objects.filter(
+            pk=job.pk, status=MetadataJob.Status.RUNNING, updated_at=job.updated_at
+        ).update(
+            status=(
+                MetadataJob.Status.FAILED if failed else MetadataJob.Status.PENDING
+            ),
+            last_error="The worker stopped before the job finished.",
+            run_after=now,
+            updated_at=now,
+        ):
+            continue
+
+        reclaimed += 1
+        if failed:
+            Exam.objects.filter(pk=job.exam_id).update(
+                metadata_status=Exam.MetadataStatus.FAILED
+            )
+            logger.error(
+                f"Metadata job #{job.pk} for exam #{job.exam_id} failed after {job.attempts} attempts, its worker stopped."
+            )
+        else:
+            logger.warning(
+                f"Metadata job #{job.pk} for exam #{job.exam_id} was reclaimed from a stopped worker."
+            )
+    return reclaimed
+
+
+def run_due_metadata_jobs(limit: int | None = None) -> int:
+    """Runs a single attempt of every pending job that is due. Returns the number run."""
+    due_jobs = (
+        MetadataJob.objects.filter(
+            status=MetadataJob.Status.PENDING, run_after__lte=timezone.now()
+        )
+        .order_by("run_after")
+        .values_list("pk", flat=True)
+    )
+    if limit is not None:
+        due_jobs = due_jobs[:limit]
+
+    processed: int = 0
+    for job_id in list(due_jobs):
+        if run_metadata_job(job_id) is not None:
+            processed += 1
+    return processed
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.cache import bump_listing_generation
+from core.models import Exam
+from core.utils import compute_file_hash
+
+
+class Command(BaseCommand):
+    help = "Computes the content hash of exams that do not have one yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of rows to update per query (default: 500).",
+        )
+        parser.add_argument(
+            "--mark-processed",
+            action="store_true",
+            help=(
+                "Record the current EXAM_METADATA_AUTHOR for exams whose metadata is "
+                "already processed, so that they are not rewritten again on save."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        batch_size: int = options["batch_size"]
+        batch: list[Exam] = []
+        updated: int = 0
+        update_fields: list[str] = ["content_hash"]
+        if options["mark_processed"]:
+            update_fields.append("metadata_author")
+
+        exams = Exam.objects.filter(content_hash="").only(
+            "pk", "file", "metadata_status"
+        )
+        for exam in exams.iterator(chunk_size=batch_size):
+            try:
+                with exam.file.open("rb"):
+                    exam.content_hash = compute_file_hash(exam.file)
+            except OSError as e:
+                self.stderr.write(f"Skipping exam #{exam.pk} ('{exam.file.name}'): {e}")
+                continue
+
+            if exam.metadata_status == Exam.MetadataStatus.DONE:
+                exam.metadata_author = settings.EXAM_METADATA_AUTHOR
+            batch.append(exam)
+
+            if len(batch) >= batch_size:
+                updated += Exam.objects.bulk_update(batch, update_fields)
+                batch = []
+
+        if batch:
+            updated += Exam.objects.bulk_update(batch, update_fields)
+        # Listed artifacts depend on the content hash, and bulk_update() sends no signals
+        if updated:
+            bump_listing_generation()
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} exam hash(es)."))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from core.artifacts import build_artifacts, exams_needing_artifacts
+from core.models import Exam
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds page counts, previews and thumbnails of exams. Only exams without "
+        "artifacts or whose content hash changed are processed, unless --full is set."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rebuild the artifacts of every exam.",
+        )
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.published()
+        if not options["full"]:
+            exams = exams_needing_artifacts(exams)
+
+        built: int = 0
+        failed: int = 0
+        for exam in exams.iterator():
+            try:
+                build_artifacts(exam, force=options["full"])
+            except Exception as e:
+                self.stderr.write(f"Skipping exam #{exam.pk}: {e}")
+                failed += 1
+            else:
+                built += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Built artifacts of {built} exam(s), {failed} failed.")
+        )
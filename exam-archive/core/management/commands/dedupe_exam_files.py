@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Exam
+from core.storage import ContentAddressedStorage
+from core.utils import compute_file_hash
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves exam files stored under their upload names into the content-addressed "
+        "layout, keeping a single file for identical content."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many files would be merged and the space saved.",
+        )
+
+    def handle(self, *args, **options):
+        storage = Exam._meta.get_field("file").storage
+        if not isinstance(storage, ContentAddressedStorage):
+            raise CommandError(
+                "Exam files are not stored in a ContentAddressedStorage, see "
+                "EXAMARCHIVE_EXAM_FILE_STORAGE."
+            )
+
+        seen_hashes: set[str] = set()
+        moved: int = 0
+        merged: int = 0
+        saved_bytes: int = 0
+        exams = Exam.objects.exclude(file="").only("pk", "file").order_by("pk")
+        for exam in exams.iterator():
+            name: str = exam.file.name
+            if storage.is_blob_name(name):
+                continue
+
+            try:
+                with storage.open(name, "rb") as file:
+                    content_hash: str = compute_file_hash(file)
+                size: int = storage.size(name)
+            except OSError as e:
+                self.stderr.write(f"Skipping exam #{exam.pk} ('{name}'): {e}")
+                continue
+
+            if options["dry_run"]:
+                duplicate: bool = content_hash in seen_hashes or storage.exists(
+                    storage.blob_name(name, content_hash)
+                )
+                seen_hashes.add(content_hash)
+            else:
+                blob_name, duplicate = storage.adopt(name, content_hash)
+                # Point the exam at the blob before the legacy file disappears
+                Exam.objects.filter(pk=exam.pk, file=name).update(file=blob_name)
+                Exam.delete_file_if_unreferenced(storage, name)
+
+            if duplicate:
+                merged += 1
+                saved_bytes += size
+            else:
+                moved += 1
+
+        move, merge = (
+            ("Would move", "merge") if options["dry_run"] else ("Moved", "merged")
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{move} {moved} file(s) and {merge} {merged} duplicate(s), "
+                f"saving {saved_bytes / 1024 / 1024:.1f} MB."
+            )
+        )
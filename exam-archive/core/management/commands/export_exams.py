@@ -0,0 +1,57 @@
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core.export import stream_exam_archive
+from core.filters import filter_exams
+from core.models import Exam
+
+
+class Command(BaseCommand):
+    help = "Writes a ZIP archive of all exams matching the given filters."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Path of the ZIP file, or '-' for stdout.")
+        parser.add_argument("--course", help="Course ID.")
+        parser.add_argument("--field-of-study", help="Field of study ID.")
+        parser.add_argument("--degree", help="Degree type ID.")
+        parser.add_argument("--year", help="The year the term started.")
+        parser.add_argument("--term", help="Term code, e.g. 'WS'.")
+        parser.add_argument(
+            "--include-unpublished",
+            action="store_true",
+            help="Also export exams whose metadata has not been processed yet.",
+        )
+
+    def handle(self, *args, **options):
+        params: dict[str, str] = {
+            key: options[key]
+            for key in ("course", "field_of_study", "degree", "year", "term")
+            if options[key]
+        }
+        exams = Exam.objects.all()
+        if not options["include_unpublished"]:
+            exams = exams.published()
+
+        try:
+            exams = filter_exams(exams, params)
+        except ValidationError as e:
+            raise CommandError(" ".join(e.messages))
+
+        exams = exams.select_related("course").order_by("course__title", "-year")
+
+        if options["output"] == "-":
+            output = sys.stdout.buffer
+            for chunk in stream_exam_archive(exams.iterator()):
+                output.write(chunk)
+            output.flush()
+        else:
+            with open(options["output"], "wb") as output:
+                for chunk in stream_exam_archive(exams.iterator()):
+                    output.write(chunk)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Exported {exams.count()} exam(s) to '{options['output']}'."
+                )
+            )
@@ -0,0 +1,275 @@
+import csv
+import os
+import posixpath
+from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.core.files.storage import Storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.cache import bump_listing_generation
+from core.jobs import enqueue_metadata_job, wait_for_metadata_jobs
+from core.models import Exam
+from core.registry import FileFormat, get_file_format
+from core.utils import compute_file_hash, extract_file_mime_type
+
+
+@dataclass
+class Problem:
+    kind: str
+    name: str
+    message: str
+    exam_id: int | None = None
+    repaired: bool = False
+
+
+@dataclass
+class FileCheck:
+    """The state of an exam's stored file, gathered in a worker thread."""
+
+    exam: Exam
+    exists: bool = True
+    size: int | None = None
+    content_hash: str = ""
+    mime_type: str = ""
+    error: str = ""
+
+
+def check_file(exam: Exam, verify_hash: bool) -> FileCheck:
+    storage: Storage = exam.file.storage
+    name: str = exam.file.name
+    result = FileCheck(exam=exam)
+    try:
+        if not storage.exists(name):
+            result.exists = False
+            return result
+        result.size = storage.size(name)
+        with storage.open(name, "rb") as file:
+            result.mime_type = extract_file_mime_type(file)
+            if verify_hash:
+                result.content_hash = compute_file_hash(file)
+    except OSError as e:
+        result.error = str(e)
+    return result
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks exam files against the Exam table: files without an exam (orphans), "
+        "exams whose file is missing, files whose size or hash differs from the "
+        "recorded one and files that fail the MIME type validation. With --repair, "
+        "orphans are deleted, recorded sizes and hashes are updated (queueing a "
+        "metadata job for changed files) and exams with invalid files are marked as "
+        "failed so they are no longer published. Missing files are only reported."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repair", action="store_true", help="Fix the problems that were found."
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Number of threads checking files (default: 8).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of exams checked and updated at a time (default: 500).",
+        )
+        parser.add_argument(
+            "--skip-hash",
+            action="store_true",
+            help="Only compare sizes instead of reading and hashing every file.",
+        )
+        parser.add_argument(
+            "--orphan-age",
+            type=int,
+            default=3600,
+            help=(
+                "Seconds a file without an exam must be unmodified before it counts "
+                "as orphaned, sparing uploads being saved (default: 3600)."
+            ),
+        )
+        parser.add_argument("--report", help="Write a CSV report to this path.")
+
+    def handle(self, *args, **options):
+        self.repair: bool = options["repair"]
+        self.problems: list[Problem] = []
+        file_field = Exam._meta.get_field("file")
+
+        referenced: set[str] = set()
+        checked: int = 0
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            for batch in self._batches(options["batch_size"]):
+                referenced.update(exam.file.name for exam in batch)
+                results: list[FileCheck] = list(
+                    pool.map(
+                        lambda exam: check_file(exam, not options["skip_hash"]), batch
+                    )
+                )
+                self._handle_results(results)
+                checked += len(batch)
+
+        cutoff: datetime = timezone.now() - timedelta(seconds=options["orphan_age"])
+        for name in self._walk(file_field.storage, str(file_field.upload_to)):
+            if name not in referenced:
+                self._handle_orphan(file_field.storage, name, cutoff)
+
+        if self.repair and any(
+            p.repaired and p.kind in ("invalid", "mismatch") for p in self.problems
+        ):
+            # Queryset updates send no signals
+            bump_listing_generation()
+        if any(p.repaired and p.kind == "mismatch" for p in self.problems):
+            self.stdout.write("Waiting for the metadata jobs of changed files.")
+            wait_for_metadata_jobs()
+
+        if options["report"]:
+            with open(options["report"], "w", newline="", encoding="utf-8") as report:
+                writer = csv.writer(report)
+                writer.writerow(["kind", "exam", "name", "message", "repaired"])
+                writer.writerows(
+                    (p.kind, p.exam_id or "", p.name, p.message, p.repaired)
+                    for p in self.problems
+                )
+
+        for problem in self.problems:
+            exam: str = f"exam #{problem.exam_id}" if problem.exam_id else "no exam"
+            repaired: str = " (repaired)" if problem.repaired else ""
+            self.stderr.write(
+                f"{problem.kind}: '{problem.name}' ({exam}): {problem.message}{repaired}"
+            )
+        counts: Counter[str] = Counter(problem.kind for problem in self.problems)
+        summary: str = ", ".join(f"{n} {kind}" for kind, n in sorted(counts.items()))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {checked} exam(s): {summary or 'no problems'}, "
+                f"{sum(p.repaired for p in self.problems)} repaired."
+            )
+        )
+
+    def _batches(self, batch_size: int) -> Iterator[list[Exam]]:
+        exams = (
+            Exam.objects.exclude(file="")
+            .only("pk", "file", "file_size", "content_hash", "metadata_status")
+            .order_by("pk")
+        )
+        batch: list[Exam] = []
+        for exam in exams.iterator(chunk_size=batch_size):
+            batch.append(exam)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _walk(self, storage: Storage, directory: str) -> Iterator[str]:
+        """Names of all files below the directory, using only the Storage API."""
+        try:
+            directories, files = storage.listdir(directory)
+        except FileNotFoundError:
+            return
+        for file_name in files:
+            yield posixpath.join(directory, file_name)
+        for subdirectory in directories:
+            yield from self._walk(storage, posixpath.join(directory, subdirectory))
+
+    def _record(self, kind: str, name: str, message: str, **kwargs) -> Problem:
+        problem = Problem(kind=kind, name=name, message=message, **kwargs)
+        self.problems.append(problem)
+        return problem
+
+    def _handle_results(self, results: list[FileCheck]) -> None:
+        updated: list[Exam] = []
+        changed: list[int] = []
+        for result in results:
+            exam: Exam = result.exam
+            name: str = exam.file.name
+            if result.error:
+                self._record("error", name, result.error, exam_id=exam.pk)
+                continue
+            if not result.exists:
+                self._record(
+                    "missing", name, "The file does not exist.", exam_id=exam.pk
+                )
+                continue
+
+            file_format: FileFormat | None = get_file_format(
+                os.path.splitext(name)[1].lower()
+            )
+            if file_format is None or result.mime_type != file_format.mime_type:
+                problem = self._record(
+                    "invalid",
+                    name,
+                    f"MIME type '{result.mime_type}' is not allowed for the file name.",
+                    exam_id=exam.pk,
+                )
+                if self.repair and exam.metadata_status != Exam.MetadataStatus.FAILED:
+                    Exam.objects.filter(pk=exam.pk).update(
+                        metadata_status=Exam.MetadataStatus.FAILED
+                    )
+                    problem.repaired = True
+                continue
+
+            if self._changed(exam, result):
+                problem = self._record(
+                    "mismatch",
+                    name,
+                    f"Recorded size {exam.file_size} and hash "
+                    f"'{exam.content_hash[:12]}' but found {result.size} and "
+                    f"'{result.content_hash[:12]}'.",
+                    exam_id=exam.pk,
+                )
+                if self.repair:
+                    exam.file_size = result.size
+                    exam.content_hash = result.content_hash or exam.content_hash
+                    updated.append(exam)
+                    changed.append(exam.pk)
+                    problem.repaired = True
+            elif exam.file_size is None and self.repair:
+                # Exams stored before sizes were recorded
+                exam.file_size = result.size
+                updated.append(exam)
+
+        if updated:
+            Exam.objects.bulk_update(updated, ["file_size", "content_hash"])
+        for exam_id in changed:
+            # The file changed outside of the archive, so its metadata and derived
+            # data are rebuilt
+            enqueue_metadata_job(exam_id)
+
+    def _changed(self, exam: Exam, result: FileCheck) -> bool:
+        # Pending exams are rewritten in place by their metadata job at any moment
+        if exam.metadata_status == Exam.MetadataStatus.PENDING:
+            return False
+        if exam.file_size is not None and result.size != exam.file_size:
+            return True
+        return bool(
+            result.content_hash
+            and exam.content_hash
+            and result.content_hash != exam.content_hash
+        )
+
+    def _handle_orphan(self, storage: Storage, name: str, cutoff: datetime) -> None:
+        try:
+            if storage.get_modified_time(name) > cutoff:
+                return
+        except NotImplementedError:
+            pass
+        except OSError:
+            # Removed since the directory was listed
+            return
+        problem = self._record("orphan", name, "No exam references the file.")
+        # Checked again right before deleting, as an upload may have reused the file
+        # and its exam be added since
+        if self.repair and Exam.delete_file_if_unreferenced(
+            storage, name, unmodified_since=cutoff
+        ):
+            problem.repaired = True
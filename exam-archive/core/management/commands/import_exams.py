@@ -0,0 +1,303 @@
+import csv
+import os
+import re
+from concurrent.futures import as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.jobs import enqueue_metadata_jobs, wait_for_metadata_jobs
+from core.models import Course, Exam
+from core.models.validators import (
+    validate_file_format,
+    validate_file_size,
+    validate_term,
+    validate_year,
+)
+from core.utils import ingest_file
+from core.workers import create_process_pool
+
+STATE_FILE_NAME: str = ".import_exams.state"
+
+
+@dataclass
+class Candidate:
+    path: str
+    course: str
+    year: str
+    term: str
+    content_hash: str = ""
+
+
+def validate_candidate(path: str, year: str, term: str) -> str:
+    """
+    Runs the Exam validators on a file on disk and returns its content hash.
+    Executed in worker processes, so it only takes and returns plain values.
+    """
+    try:
+        year_value = int(year)
+    except ValueError:
+        raise ValidationError(f"Year must be a number, got '{year}'.")
+    validate_year(year_value)
+    validate_term(term)
+
+    with open(path, "rb") as raw_file:
+        file = File(raw_file, name=os.path.basename(path))
+        validate_file_format(file)
+        validate_file_size(file)
+        return ingest_file(file).content_hash
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports exam files from a directory. Courses, years and terms come from a "
+        "CSV mapping (columns: path, course, year, term) or from a regular expression "
+        "with the named groups 'course', 'year' and 'term' matched against each "
+        "file's path relative to the directory. Courses are given by ID or title."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="Directory containing the exam files.")
+        mapping = parser.add_mutually_exclusive_group(required=True)
+        mapping.add_argument("--mapping", help="CSV file mapping paths to exams.")
+        mapping.add_argument(
+            "--pattern",
+            help=r"Regex for relative paths, e.g. '(?P<course>[^/]+)/(?P<year>\d{4})-(?P<term>\w\w)\.pdf'.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of validation processes (default: number of CPUs).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Number of exams inserted per transaction (default: 200).",
+        )
+        parser.add_argument(
+            "--state-file",
+            help=f"File recording imported paths, to resume an interrupted import "
+            f"(default: <directory>/{STATE_FILE_NAME}).",
+        )
+        parser.add_argument(
+            "--report", help="Write a per-file CSV report to this path."
+        )
+        parser.add_argument(
+            "--create-courses",
+            action="store_true",
+            help="Create courses that are referenced by title but do not exist.",
+        )
+
+    def handle(self, *args, **options):
+        directory = Path(options["directory"]).resolve()
+        if not directory.is_dir():
+            raise CommandError(f"'{directory}' is not a directory.")
+
+        state_path = Path(options["state_file"] or directory / STATE_FILE_NAME)
+        self.report: list[tuple[str, str, str]] = []
+
+        if options["mapping"]:
+            candidates = self._read_mapping(directory, options["mapping"])
+        else:
+            candidates = self._match_pattern(directory, options["pattern"])
+
+        done: set[str] = self._read_state(state_path)
+        pending: list[Candidate] = []
+        for candidate in candidates:
+            if candidate.path in done:
+                self._record(candidate.path, "skipped", "Already imported.")
+            else:
+                pending.append(candidate)
+
+        courses: dict[str, Course] = self._resolve_courses(
+            pending, options["create_courses"]
+        )
+        valid: list[Candidate] = self._validate(
+            [c for c in pending if c.course in courses], options["workers"]
+        )
+
+        imported: int = 0
+        with open(state_path, "a", encoding="utf-8") as state_file:
+            batch_size: int = options["batch_size"]
+            for start in range(0, len(valid), batch_size):
+                batch: list[Candidate] = valid[start : start + batch_size]
+                imported += self._import_batch(batch, courses, state_file)
+        if imported:
+            self.stdout.write("Waiting for the metadata jobs of the imported exams.")
+            wait_for_metadata_jobs()
+
+        if options["report"]:
+            with open(options["report"], "w", newline="", encoding="utf-8") as report:
+                writer = csv.writer(report)
+                writer.writerow(["path", "status", "message"])
+                writer.writerows(self.report)
+
+        errors: int = sum(1 for _, status, _ in self.report if status == "error")
+        self.stdout.write(
+            self.style.SUCCESS(f"Imported {imported} exam(s), {errors} error(s).")
+        )
+        for path, status, message in self.report:
+            if status == "error":
+                self.stderr.write(f"{path}: {message}")
+
+    def _record(self, path: str, status: str, message: str = "") -> None:
+        self.report.append((path, status, message))
+
+    def _read_state(self, state_path: Path) -> set[str]:
+        if not state_path.exists():
+            return set()
+        with open(state_path, encoding="utf-8") as state_file:
+            return {line.rstrip("\n") for line in state_file if line.strip()}
+
+    def _read_mapping(self, directory: Path, mapping_path: str) -> list[Candidate]:
+        candidates: list[Candidate] = []
+        with open(mapping_path, newline="", encoding="utf-8") as mapping_file:
+            for row in csv.DictReader(mapping_file):
+                try:
+                    candidates.append(
+                        Candidate(
+                            path=str((directory / row["path"]).resolve()),
+                            course=row["course"].strip(),
+                            year=row["year"].strip(),
+                            term=row["term"].strip(),
+                        )
+                    )
+                except KeyError as e:
+                    raise CommandError(f"Mapping is missing the column {e}.")
+        return candidates
+
+    def _match_pattern(self, directory: Path, pattern: str) -> list[Candidate]:
+        regex = re.compile(pattern)
+        missing_groups = {"course", "year", "term"} - set(regex.groupindex)
+        if missing_groups:
+            raise CommandError(
+                f"Pattern is missing the named group(s): {', '.join(sorted(missing_groups))}."
+            )
+
+        candidates: list[Candidate] = []
+        for path in sorted(p for p in directory.rglob("*") if p.is_file()):
+            relative_path: str = path.relative_to(directory).as_posix()
+            if relative_path == STATE_FILE_NAME:
+                continue
+            match = regex.fullmatch(relative_path)
+            if match is None:
+                self._record(str(path), "error", "Path does not match the pattern.")
+                continue
+            candidates.append(
+                Candidate(
+                    path=str(path),
+                    course=match["course"],
+                    year=match["year"],
+                    term=match["term"],
+                )
+            )
+        return candidates
+
+    def _resolve_courses(
+        self, candidates: list[Candidate], create_courses: bool
+    ) -> dict[str, Course]:
+        keys: set[str] = {candidate.course for candidate in candidates}
+        ids: set[int] = {int(key) for key in keys if key.isdigit()}
+
+        courses: dict[str, Course] = {
+            str(course.pk): course for course in Course.objects.filter(pk__in=ids)
+        }
+        for course in Course.objects.filter(title__in=keys - courses.keys()):
+            courses.setdefault(course.title, course)
+
+        for key in sorted(keys - courses.keys()):
+            if create_courses and not key.isdigit():
+                courses[key] = Course.objects.create(title=key)
+                continue
+            for candidate in candidates:
+                if candidate.course == key:
+                    self._record(candidate.path, "error", f"Unknown course '{key}'.")
+
+        return courses
+
+    def _validate(
+        self, candidates: list[Candidate], workers: int | None
+    ) -> list[Candidate]:
+        valid: list[Candidate] = []
+        with create_process_pool(workers) as pool:
+            futures = {
+                pool.submit(validate_candidate, c.path, c.year, c.term): c
+                for c in candidates
+            }
+            for future in as_completed(futures):
+                candidate: Candidate = futures[future]
+                try:
+                    candidate.content_hash = future.result()
+                except ValidationError as e:
+                    self._record(candidate.path, "error", " ".join(e.messages))
+                except OSError as e:
+                    self._record(candidate.path, "error", str(e))
+                except Exception as e:
+                    # E.g. a parser crashing on a malformed file or a worker dying;
+                    # the other files are still imported
+                    self._record(candidate.path, "error", f"Validation failed: {e!r}")
+                else:
+                    valid.append(candidate)
+
+        # Keep the import order stable regardless of which worker finished first
+        return sorted(valid, key=lambda candidate: candidate.path)
+
+    def _import_batch(
+        self, batch: list[Candidate], courses: dict[str, Course], state_file
+    ) -> int:
+        file_field = Exam._meta.get_field("file")
+        # Stored file names and when they were stored
+        stored_at: dict[str, datetime] = {}
+        exams: list[Exam] = []
+
+        try:
+            for candidate in batch:
+                with open(candidate.path, "rb") as raw_file:
+                    name: str = file_field.storage.save(
+                        file_field.generate_filename(
+                            None, os.path.basename(candidate.path)
+                        ),
+                        File(raw_file),
+                    )
+                stored_at[name] = timezone.now()
+                exams.append(
+                    Exam(
+                        file=name,
+                        year=int(candidate.year),
+                        term=candidate.term,
+                        course=courses[candidate.course],
+                        content_hash=candidate.content_hash,
+                        file_size=os.path.getsize(candidate.path),
+                        metadata_status=Exam.MetadataStatus.PENDING,
+                    )
+                )
+
+            with transaction.atomic():
+                created: list[Exam] = Exam.objects.bulk_create(exams)
+                transaction.on_commit(
+                    lambda: enqueue_metadata_jobs([exam.pk for exam in created])
+                )
+        except Exception as e:
+            # Nothing of this batch was recorded, so do not leave its files behind,
+            # unless uploads with the same content have stored them again since
+            for name, stored in stored_at.items():
+                Exam.delete_file_if_unreferenced(
+                    file_field.storage, name, unmodified_since=stored
+                )
+            for candidate in batch:
+                self._record(candidate.path, "error", f"Import failed: {e}")
+            return 0
+
+        for candidate in batch:
+            state_file.write(candidate.path + "\n")
+            self._record(candidate.path, "imported")
+        state_file.flush()
+        return len(created)
@@ -0,0 +1,61 @@
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import optimize_exam
+from core.models import Exam
+from core.models.metadata_service import FileOptimization
+from core.workers import create_process_pool
+
+
+class Command(BaseCommand):
+    help = (
+        "Losslessly optimizes the stored PDF files of processed exams in parallel, "
+        "keeping each result only if it is at least "
+        "EXAM_PDF_OPTIMIZATION_MIN_SAVINGS percent smaller. Exams that were "
+        "optimized before are skipped, unless --force is set."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of worker processes (default: number of CPUs).",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Also optimize exams that were optimized before.",
+        )
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.published().filter(file__iendswith=".pdf")
+        if not options["force"]:
+            exams = exams.filter(optimized_size__isnull=True)
+        exam_ids: list[int] = list(exams.order_by("pk").values_list("pk", flat=True))
+
+        optimized: int = 0
+        failed: int = 0
+        saved_bytes: int = 0
+        with create_process_pool(options["workers"]) as pool:
+            futures = {pool.submit(optimize_exam, pk): pk for pk in exam_ids}
+            for future in as_completed(futures):
+                try:
+                    optimization: FileOptimization | None = future.result()
+                except Exception as e:
+                    self.stderr.write(f"Skipping exam #{futures[future]}: {e}")
+                    failed += 1
+                    continue
+                if optimization is not None and optimization.kept:
+                    optimized += 1
+                    saved_bytes += (
+                        optimization.original_size - optimization.optimized_size
+                    )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Optimized {optimized} of {len(exam_ids)} exam(s), saving "
+                f"{saved_bytes / 1024 / 1024:.1f} MB; {failed} failed."
+            )
+        )
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import reclaim_stale_metadata_jobs, run_due_metadata_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Processes queued exam metadata jobs from the job table. Jobs whose worker "
+        "stopped are requeued once they ran longer than EXAM_METADATA_JOB_TIMEOUT; "
+        "with the thread or process backend, run it with --once periodically to "
+        "pick those up."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process all due jobs once and exit instead of polling.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when no job is due (default: 2).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Maximum number of jobs to run per poll (default: 50).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            reclaimed: int = reclaim_stale_metadata_jobs()
+            if reclaimed:
+                self.stdout.write(f"Reclaimed {reclaimed} stale metadata job(s).")
+
+            processed: int = run_due_metadata_jobs(limit=options["batch_size"])
+            if processed:
+                self.stdout.write(f"Processed {processed} metadata job(s).")
+
+            if options["once"] and processed < options["batch_size"]:
+                return
+            if not processed:
+                time.sleep(options["interval"])
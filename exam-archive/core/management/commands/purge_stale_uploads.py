@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.uploads import purge_expired_uploads
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes resumable uploads that made no progress for EXAM_UPLOAD_EXPIRY "
+        "seconds, together with their partial files."
+    )
+
+    def handle(self, *args, **options):
+        purged: int = purge_expired_uploads()
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} stale upload(s)."))
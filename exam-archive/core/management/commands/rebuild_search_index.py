@@ -0,0 +1,63 @@
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+
+from core.models import Exam, ExamText
+from core.search import exams_needing_index
+from core.search.extraction import extract_text
+from core.workers import create_process_pool
+
+
+def extract_exam_text(exam_id: int) -> tuple[str, str]:
+    """Returns the content hash and text of an exam. Runs in worker processes."""
+    exam: Exam = Exam.objects.only("pk", "file", "content_hash").get(pk=exam_id)
+    return exam.content_hash, extract_text(exam.file)
+
+
+class Command(BaseCommand):
+    help = (
+        "Extracts the text of exams for full-text search. Only exams that are not "
+        "indexed yet or whose content hash changed are processed, unless --full is set."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Re-extract the text of every exam.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of extraction processes (default: number of CPUs).",
+        )
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.published()
+        if not options["full"]:
+            exams = exams_needing_index(exams)
+        exam_ids: list[int] = list(exams.values_list("pk", flat=True))
+
+        indexed: int = 0
+        with create_process_pool(options["workers"]) as pool:
+            futures = {
+                pool.submit(extract_exam_text, exam_id): exam_id for exam_id in exam_ids
+            }
+            for future in as_completed(futures):
+                exam_id: int = futures[future]
+                try:
+                    content_hash, text = future.result()
+                except Exception as e:
+                    self.stderr.write(f"Skipping exam #{exam_id}: {e}")
+                    continue
+
+                ExamText.objects.update_or_create(
+                    exam_id=exam_id,
+                    defaults={"text": text, "content_hash": content_hash},
+                )
+                indexed += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed {indexed} of {len(exam_ids)} exam(s).")
+        )
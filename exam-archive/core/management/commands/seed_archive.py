@@ -0,0 +1,335 @@
+import hashlib
+import io
+import random
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.cache import bump_listing_generation
+from core.models import Course, DegreeType, Exam, ExamText, FieldOfStudy
+from core.registry import get_file_format, get_registry
+
+SUBJECTS: tuple[str, ...] = (
+    "Algebra",
+    "Analysis",
+    "Statistics",
+    "Databases",
+    "Operating Systems",
+    "Thermodynamics",
+    "Microeconomics",
+    "Macroeconomics",
+    "Organic Chemistry",
+    "Genetics",
+    "Contract Law",
+    "Signal Processing",
+    "Machine Learning",
+    "Accounting",
+    "Mechanics",
+    "Compiler Construction",
+)
+PREFIXES: tuple[str, ...] = ("Introduction to", "Advanced", "Applied", "Seminar in")
+DEGREES: tuple[str, ...] = ("Bachelor", "Master", "Diploma", "Doctorate", "Minor")
+WORDS: tuple[str, ...] = (
+    "prove calculate derive explain compare estimate sketch assume show determine "
+    "function matrix vector integral limit sequence probability variance market "
+    "equilibrium reaction molecule protein contract liability transaction index "
+    "query kernel process memory signal filter gradient model error bound energy"
+).split()
+
+
+@dataclass
+class SeedFile:
+    name: str
+    content: bytes
+    text: str
+
+
+def _pdf(text: str, author: str) -> bytes:
+    """A one-page PDF with a text layer and the author already set."""
+
+    def literal(value: str) -> str:
+        encoded: str = value.encode("latin-1", "replace").decode("latin-1")
+        return encoded.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    lines: str = " ".join(f"({literal(line)}) '" for line in text.splitlines())
+    stream: bytes = f"BT /F1 11 Tf 40 800 Td 14 TL {lines} ET".encode("latin-1")
+    objects: list[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        f"<< /Author ({literal(author)}) >>".encode("latin-1"),
+    ]
+    output = bytearray(b"%PDF-1.4\n")
+    offsets: list[int] = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref: int = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R /Info %d 0 R >>\n" % (
+        len(objects) + 1,
+        len(objects),
+    )
+    output += b"startxref\n%d\n%%%%EOF\n" % xref
+    return bytes(output)
+
+
+def _docx(text: str, author: str) -> bytes:
+    """A minimal DOCX package with one paragraph per line and the author set."""
+    paragraphs: str = "".join(
+        f"<w:p><w:r><w:t>{escape(line)}</w:t></w:r></w:p>" for line in text.splitlines()
+    )
+    parts: dict[str, str] = {
+        # libmagic recognizes DOCX files by this entry coming first
+        "[Content_Types].xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            '<Override PartName="/docProps/core.xml" ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>'
+            "</Types>"
+        ),
+        "_rels/.rels": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>'
+            '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties" Target="docProps/core.xml"/>'
+            "</Relationships>"
+        ),
+        "word/document.xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f"<w:body>{paragraphs}</w:body></w:document>"
+        ),
+        "docProps/core.xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f"<dc:creator>{escape(author)}</dc:creator></cp:coreProperties>"
+        ),
+    }
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in parts.items():
+            archive.writestr(name, content)
+    return output.getvalue()
+
+
+GENERATORS = {".pdf": _pdf, ".docx": _docx}
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a synthetic archive of degrees, fields of study, courses and "
+        "published exams with small PDF and DOCX files and their search text, for "
+        "load testing. Rows are inserted with bulk_create in batched transactions, "
+        "files are written by a thread pool. Thumbnails are not generated, run "
+        "build_exam_artifacts afterwards if needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--degrees", type=int, default=5)
+        parser.add_argument(
+            "--fields-per-degree",
+            type=int,
+            default=4,
+            help="Fields of study per degree (default: 4).",
+        )
+        parser.add_argument("--courses", type=int, default=200)
+        parser.add_argument("--exams", type=int, default=2000)
+        parser.add_argument(
+            "--docx-ratio",
+            type=float,
+            default=0.2,
+            help="Share of exams stored as DOCX instead of PDF (default: 0.2).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of exams inserted per transaction (default: 1000).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Number of threads writing files to storage (default: 8).",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Seed of the random generator."
+        )
+
+    def handle(self, *args, **options):
+        if any(options[key] < 1 for key in ("degrees", "fields_per_degree", "courses")):
+            raise CommandError("Degrees, fields of study and courses must be positive.")
+        extensions: list[str] = [e for e in GENERATORS if get_file_format(e)]
+        if not extensions:
+            raise CommandError("Neither PDF nor DOCX is an allowed exam file format.")
+
+        self.random = random.Random(options["seed"])
+        self.terms: list[str] = list(get_registry().terms)
+        max_year: int = min(settings.EXAM_MAX_YEAR, date.today().year)
+        self.years: range = range(
+            max(settings.EXAM_MIN_YEAR, max_year - 14), max_year + 1
+        )
+        self.author: str = settings.EXAM_METADATA_AUTHOR
+        # Keeps degree names and file names unique when seeding a database again
+        self.run: str = uuid.uuid4().hex[:8]
+
+        courses: list[Course] = self._create_courses(
+            options["degrees"], options["fields_per_degree"], options["courses"]
+        )
+
+        created: int = 0
+        batch_size: int = options["batch_size"]
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            for start in range(0, options["exams"], batch_size):
+                count: int = min(batch_size, options["exams"] - start)
+                created += self._create_exams(
+                    pool, courses, start, count, extensions, options["docx_ratio"]
+                )
+                self.stdout.write(f"Created {created}/{options['exams']} exam(s).")
+
+        # bulk_create() sends no signals
+        bump_listing_generation()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded {len(courses)} course(s) and {created} exam(s)."
+            )
+        )
+
+    def _create_courses(
+        self, degrees: int, fields_per_degree: int, courses: int
+    ) -> list[Course]:
+        with transaction.atomic():
+            degree_types: list[DegreeType] = DegreeType.objects.bulk_create(
+                [
+                    DegreeType(name=f"{DEGREES[i % len(DEGREES)]} {self.run}-{i}")
+                    for i in range(degrees)
+                ]
+            )
+            fields: list[FieldOfStudy] = FieldOfStudy.objects.bulk_create(
+                [
+                    FieldOfStudy(
+                        name=f"{SUBJECTS[(i + j) % len(SUBJECTS)]} Studies",
+                        abbreviation=f"F{i}-{j}",
+                        degree=degree,
+                    )
+                    for i, degree in enumerate(degree_types)
+                    for j in range(fields_per_degree)
+                ]
+            )
+            created: list[Course] = Course.objects.bulk_create(
+                [
+                    Course(
+                        title=f"{self.random.choice(PREFIXES)} "
+                        f"{self.random.choice(SUBJECTS)} {i + 1}"
+                    )
+                    for i in range(courses)
+                ]
+            )
+            Course.fields_of_study.through.objects.bulk_create(
+                [
+                    Course.fields_of_study.through(
+                        course_id=course.pk, fieldofstudy_id=field.pk
+                    )
+                    for course in created
+                    for field in self.random.sample(fields, min(2, len(fields)))
+                ]
+            )
+        return created
+
+    def _generate_file(self, index: int, course: Course, extension: str) -> SeedFile:
+        sentences: list[str] = [
+            f"Exercise {number}. "
+            + " ".join(
+                self.random.choices(WORDS, k=self.random.randint(6, 14))
+            ).capitalize()
+            + "."
+            for number in range(1, self.random.randint(3, 8))
+        ]
+        text: str = "\n".join([f"{course.title} - exam {self.run}-{index}", *sentences])
+        return SeedFile(
+            name=f"seed-{self.run}-{index}{extension}",
+            content=GENERATORS[extension](text, self.author),
+            text=text,
+        )
+
+    def _create_exams(
+        self,
+        pool: ThreadPoolExecutor,
+        courses: list[Course],
+        start: int,
+        count: int,
+        extensions: list[str],
+        docx_ratio: float,
+    ) -> int:
+        file_field = Exam._meta.get_field("file")
+        exams: list[Exam] = []
+        files: list[SeedFile] = []
+        for index in range(start, start + count):
+            extension: str = (
+                ".docx"
+                if ".docx" in extensions and self.random.random() < docx_ratio
+                else extensions[0]
+            )
+            course: Course = self.random.choice(courses)
+            files.append(self._generate_file(index, course, extension))
+            exams.append(
+                Exam(
+                    year=self.random.choice(self.years),
+                    term=self.random.choice(self.terms),
+                    course=course,
+                    content_hash=hashlib.sha256(files[-1].content).hexdigest(),
+                    file_size=len(files[-1].content),
+                    metadata_status=Exam.MetadataStatus.DONE,
+                    metadata_author=self.author,
+                )
+            )
+
+        stored_names: list[str] = list(
+            pool.map(
+                lambda file: file_field.storage.save(
+                    file_field.generate_filename(None, file.name),
+                    ContentFile(file.content),
+                ),
+                files,
+            )
+        )
+        stored_at: datetime = timezone.now()
+        for exam, name in zip(exams, stored_names):
+            exam.file = name
+
+        try:
+            with transaction.atomic():
+                created: list[Exam] = Exam.objects.bulk_create(exams)
+                ExamText.objects.bulk_create(
+                    [
+                        ExamText(
+                            exam=exam, content_hash=exam.content_hash, text=file.text
+                        )
+                        for exam, file in zip(created, files)
+                    ]
+                )
+        except Exception:
+            # Blobs that uploads with the same content stored again since are kept
+            for name in stored_names:
+                Exam.delete_file_if_unreferenced(
+                    file_field.storage, name, unmodified_since=stored_at
+                )
+            raise
+        return len(created)
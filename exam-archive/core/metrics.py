@@ -0,0 +1,280 @@
+import bisect
+import contextlib
+import math
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from core.registry import FileFormat, get_file_format
+
+# Seconds; request and query latencies
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+# Seconds; reading, validating and rewriting files of up to a few hundred MB
+FILE_BUCKETS: tuple[float, ...] = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_COUNT_BUCKETS: tuple[float, ...] = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], **extra) -> str:
+    pairs: list[str] = [
+        f'{name}="{_escape(value)}"'
+        for name, value in [*zip(names, values), *extra.items()]
+    ]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type: str = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return "\n".join(
+            [
+                f"# HELP {self.name} {self.documentation}",
+                f"# TYPE {self.name} {self.type}",
+                *self._samples(),
+            ]
+        )
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...]):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key: tuple[str, ...] = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            values: dict[tuple[str, ...], float] = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield (
+                f"{self.name}{_format_labels(self.labelnames, key)} "
+                f"{_format_value(value)}"
+            )
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...],
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        # Per label values: observations per bucket (the last one is +Inf) and sum
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key: tuple[str, ...] = self._label_values(labels)
+        index: int = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[index] += 1
+            total[0] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observes the duration of the block, also when it raises."""
+        start: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            values = {key: (list(c), t[0]) for key, (c, t) in self._values.items()}
+        for key, (counts, total) in sorted(values.items()):
+            cumulative: int = 0
+            for bound, count in zip([*self.buckets, math.inf], counts):
+                cumulative += count
+                labels: str = _format_labels(
+                    self.labelnames, key, le=_format_value(bound)
+                )
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    """
+    Metrics of the current process. With several worker processes, every process
+    exposes its own values, which is what Prometheus expects from each target.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: tuple[str, ...] = (),
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def file_type_label(name: str) -> str:
+    """The 'file_type' label of a file name, bounded to the configured formats."""
+    file_format: FileFormat | None = get_file_format(os.path.splitext(name)[1].lower())
+    return file_format.extension.lstrip(".") if file_format else "other"
+
+
+FILE_INGESTION_SECONDS: Histogram = histogram(
+    "examarchive_file_ingestion_seconds",
+    "Time to read an uploaded file once for its MIME type, size and hash.",
+    ("file_type",),
+    FILE_BUCKETS,
+)
+MIME_SNIFF_SECONDS: Histogram = histogram(
+    "examarchive_mime_sniff_seconds",
+    "Time to sniff the MIME type of a stored file.",
+    ("file_type",),
+)
+FILE_VALIDATION_SECONDS: Histogram = histogram(
+    "examarchive_file_validation_seconds",
+    "Time spent in the file validators of uploads.",
+    ("file_type", "validator"),
+    FILE_BUCKETS,
+)
+METADATA_REWRITE_SECONDS: Histogram = histogram(
+    "examarchive_metadata_rewrite_seconds",
+    "Time to rewrite the metadata of an exam file.",
+    ("file_type", "handler"),
+    FILE_BUCKETS,
+)
+METADATA_REWRITE_FAILURES: Counter = counter(
+    "examarchive_metadata_rewrite_failures_total",
+    "Metadata rewrites that raised an error.",
+    ("file_type", "handler"),
+)
+STORAGE_WRITE_SECONDS: Histogram = histogram(
+    "examarchive_storage_write_seconds",
+    "Time to write an exam file to storage.",
+    ("file_type",),
+    FILE_BUCKETS,
+)
+DB_QUERY_SECONDS: Histogram = histogram(
+    "examarchive_db_query_seconds",
+    "Duration of single database queries, by the view that issued them.",
+    ("view",),
+)
+REQUEST_SECONDS: Histogram = histogram(
+    "examarchive_request_seconds",
+    "Duration of HTTP requests.",
+    ("view", "method", "status"),
+)
+REQUEST_DB_QUERIES: Histogram = histogram(
+    "examarchive_request_db_queries",
+    "Number of database queries per HTTP request.",
+    ("view",),
+    QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_SECONDS: Histogram = histogram(
+    "examarchive_request_db_seconds",
+    "Total time spent in database queries per HTTP request.",
+    ("view",),
+)
+LISTING_CACHE_REQUESTS: Counter = counter(
+    "examarchive_listing_cache_requests_total",
+    "Requests to cached listings, by whether the response came from the cache.",
+    ("view", "result"),
+)
+
+
+@dataclass
+class RequestStats:
+    """Database usage of the request being handled."""
+
+    view: str = "unmatched"
+    queries: int = 0
+    query_seconds: float = 0.0
+
+
+# Set by core.middleware.MetricsMiddleware; context variables are copied into the
+# threads sync_to_async() runs ORM calls of async views in
+current_request_stats: ContextVar[RequestStats | None] = ContextVar(
+    "current_request_stats", default=None
+)
+
+
+def instrument_query(execute: Callable, sql, params, many: bool, context: dict):
+    """Database execute wrapper observing the duration of every query."""
+    start: float = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration: float = time.perf_counter() - start
+        stats: RequestStats | None = current_request_stats.get()
+        if stats is None:
+            # Management commands and metadata jobs
+            DB_QUERY_SECONDS.observe(duration, view="background")
+        else:
+            DB_QUERY_SECONDS.observe(duration, view=stats.view)
+            stats.queries += 1
+            stats.query_seconds += duration
@@ -0,0 +1,80 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import HttpRequest, HttpResponseBase
+
+from core.metrics import (
+    REQUEST_DB_QUERIES,
+    REQUEST_DB_SECONDS,
+    REQUEST_SECONDS,
+    RequestStats,
+    current_request_stats,
+)
+
+# Other methods share a label value, as clients can send any
+HTTP_METHODS: frozenset[str] = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+)
+
+
+class MetricsMiddleware:
+    """
+    Records the duration and the database queries of every request. Streamed
+    responses are measured until their headers are ready, not until the body is sent.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponseBase:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        start: float = time.perf_counter()
+        try:
+            response: HttpResponseBase = self.get_response(request)
+        finally:
+            current_request_stats.reset(token)
+        self._record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        start: float = time.perf_counter()
+        try:
+            response: HttpResponseBase = await self.get_response(request)
+        finally:
+            current_request_stats.reset(token)
+        self._record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def process_view(self, request: HttpRequest, view_func, view_args, view_kwargs):
+        # URL names rather than paths keep the number of label values bounded
+        stats: RequestStats | None = current_request_stats.get()
+        if stats is not None:
+            stats.view = request.resolver_match.view_name
+        return None
+
+    @staticmethod
+    def _record(
+        request: HttpRequest,
+        response: HttpResponseBase,
+        stats: RequestStats,
+        duration: float,
+    ) -> None:
+        REQUEST_SECONDS.observe(
+            duration,
+            view=stats.view,
+            method=request.method if request.method in HTTP_METHODS else "other",
+            status=f"{response.status_code // 100}xx",
+        )
+        REQUEST_DB_QUERIES.observe(stats.queries, view=stats.view)
+        REQUEST_DB_SECONDS.observe(stats.query_seconds, view=stats.view)
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:02
+
+import core.models.job_model
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def mark_existing_exams_done(apps, schema_editor):
+    # Exams saved before the job queue existed were processed synchronously
+    Exam = apps.get_model("core", "Exam")
+    Exam.objects.update(metadata_status="done")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='metadata_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', editable=False, max_length=10),
+        ),
+        migrations.RunPython(mark_existing_exams_done, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='MetadataJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=core.models.job_model._default_max_attempts)),
+                ('last_error', models.TextField(blank=True)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='core.exam')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='core_metada_status_d7bea8_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_exam_metadata_status_metadatajob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, help_text='SHA-256 of the stored file after metadata processing.', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='metadata_author',
+            field=models.CharField(blank=True, editable=False, help_text='The author last written into the file metadata.', max_length=255),
+        ),
+    ]
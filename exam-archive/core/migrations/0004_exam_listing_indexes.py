@@ -0,0 +1,21 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_exam_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['course', 'year', 'term'], name='core_exam_course__aea6d2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exam',
+            index=models.Index(fields=['year', 'term'], name='core_exam_year_dd0596_idx'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.utils import OperationalError
+
+# The FTS5 index mirrors core_examtext through triggers. SQLite builds without FTS5
+# and other databases skip it and search with the in-memory index instead. Note that
+# table-rebuilding migrations of ExamText on SQLite drop these triggers.
+FTS5_SQL = [
+    """
+    CREATE VIRTUAL TABLE core_examtext_fts USING fts5(
+        text, content='core_examtext', content_rowid='exam_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER core_examtext_fts_insert AFTER INSERT ON core_examtext BEGIN
+        INSERT INTO core_examtext_fts(rowid, text) VALUES (new.exam_id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER core_examtext_fts_delete AFTER DELETE ON core_examtext BEGIN
+        INSERT INTO core_examtext_fts(core_examtext_fts, rowid, text)
+        VALUES ('delete', old.exam_id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER core_examtext_fts_update AFTER UPDATE ON core_examtext BEGIN
+        INSERT INTO core_examtext_fts(core_examtext_fts, rowid, text)
+        VALUES ('delete', old.exam_id, old.text);
+        INSERT INTO core_examtext_fts(rowid, text) VALUES (new.exam_id, new.text);
+    END
+    """,
+]
+
+
+def create_fts5_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(FTS5_SQL[0])
+        except OperationalError:
+            # no such module: fts5
+            return
+        for statement in FTS5_SQL[1:]:
+            cursor.execute(statement)
+
+
+def drop_fts5_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for trigger in ("insert", "delete", "update"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS core_examtext_fts_{trigger}")
+        cursor.execute("DROP TABLE IF EXISTS core_examtext_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_exam_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamText',
+            fields=[
+                ('exam', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='text', serialize=False, to='core.exam')),
+                ('content_hash', models.CharField(blank=True, help_text='Hash of the file the text was taken from.', max_length=64)),
+                ('text', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_fts5_index, drop_fts5_index),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_examtext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamArtifacts',
+            fields=[
+                ('exam', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='artifacts', serialize=False, to='core.exam')),
+                ('content_hash', models.CharField(help_text='Hash of the file the artifacts were built from.', max_length=64)),
+                ('file_size', models.PositiveBigIntegerField()),
+                ('page_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('preview', models.TextField(blank=True, help_text='Text of the first page.')),
+                ('has_thumbnail', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:29
+
+import core.models.validators
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_examartifacts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exam',
+            name='file',
+            field=models.FileField(storage=core.storage.select_exam_storage, upload_to='exams/', validators=[core.models.validators.validate_file_format, core.models.validators.validate_file_size]),
+        ),
+    ]
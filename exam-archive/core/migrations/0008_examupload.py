@@ -0,0 +1,38 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:39
+
+import core.models.validators
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_exam_file_storage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('length', models.PositiveBigIntegerField(help_text='Total size in bytes.')),
+                ('offset', models.PositiveBigIntegerField(default=0, help_text='Number of bytes received so far.')),
+                ('mime_type', models.CharField(blank=True, help_text='Sniffed from the first chunk.', max_length=255)),
+                ('year', models.PositiveIntegerField(validators=[core.models.validators.validate_year])),
+                ('term', models.CharField(max_length=2, validators=[core.models.validators.validate_term])),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.course')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('exam', models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.exam')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['updated_at'], name='core_examup_updated_b25698_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_examupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='file_size',
+            field=models.PositiveBigIntegerField(editable=False, help_text='Size of the stored file in bytes.', null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_exam_file_size'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='optimized_size',
+            field=models.PositiveBigIntegerField(editable=False, help_text='Size of the optimized file in bytes, which is only kept if it is sufficiently smaller.', null=True),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='original_size',
+            field=models.PositiveBigIntegerField(editable=False, help_text='Size of the file in bytes before it was optimized.', null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-18 21:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_exam_optimization_sizes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField()),
+            ],
+        ),
+    ]
@@ -1,2 +1,7 @@
+from core.models.artifact_model import ExamArtifacts  # noqa: F401
+from core.models.cache_model import ListingGeneration  # noqa: F401
 from core.models.exam_model import Exam  # noqa: F401
+from core.models.job_model import MetadataJob  # noqa: F401
 from core.models.models import Course, DegreeType, FieldOfStudy  # noqa: F401
+from core.models.search_model import ExamText  # noqa: F401
+from core.models.upload_model import ExamUpload  # noqa: F401
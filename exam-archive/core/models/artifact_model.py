@@ -0,0 +1,23 @@
+from django.db import models
+
+
+class ExamArtifacts(models.Model):
+    """
+    Data derived from an exam file for browsing without downloading it. The
+    thumbnail is stored under a name derived from the content hash, see core.artifacts.
+    """
+
+    exam = models.OneToOneField(
+        "Exam", on_delete=models.CASCADE, primary_key=True, related_name="artifacts"
+    )
+    content_hash = models.CharField(
+        max_length=64, help_text="Hash of the file the artifacts were built from."
+    )
+    file_size = models.PositiveBigIntegerField()
+    page_count = models.PositiveIntegerField(null=True, blank=True)
+    preview = models.TextField(blank=True, help_text="Text of the first page.")
+    has_thumbnail = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"Artifacts of exam #{self.exam_id}"
@@ -0,0 +1,14 @@
+from django.db import models
+
+
+class ListingGeneration(models.Model):
+    """
+    The generation of cached listings, a single row shared by all processes.
+    Cache keys contain it, so bumping it invalidates every cached listing, even
+    those in the per-process memory of other workers. See core.cache.
+    """
+
+    value = models.BigIntegerField()
+
+    def __str__(self) -> str:
+        return f"Listing generation {self.value}"
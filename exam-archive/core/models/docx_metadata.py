@@ -0,0 +1,208 @@
+import io
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from lxml import etree
+
+CORE_PROPERTIES_PART: str = "docProps/core.xml"
+DC_NAMESPACE: str = "http://purl.org/dc/elements/1.1/"
+
+_CHUNK_SIZE: int = 64 * 1024
+_END_OF_CENTRAL_DIRECTORY = struct.Struct("<4s4H2LH")
+_CENTRAL_DIRECTORY_RECORD = struct.Struct("<4s4B4HL2L5H2L")
+_LOCAL_FILE_HEADER = struct.Struct("<4s2B4HL2L2H")
+_END_OF_CENTRAL_DIRECTORY_SIGNATURE: bytes = b"PK\x05\x06"
+_CENTRAL_DIRECTORY_SIGNATURE: bytes = b"PK\x01\x02"
+_LOCAL_FILE_HEADER_SIGNATURE: bytes = b"PK\x03\x04"
+# End of central directory record plus the longest possible archive comment
+_MAX_TAIL_SIZE: int = _END_OF_CENTRAL_DIRECTORY.size + 0xFFFF
+_FLAG_DATA_DESCRIPTOR: int = 0x08
+_FLAG_ENCRYPTED: int = 0x01
+
+
+class UnsupportedArchiveError(ValueError):
+    """The archive layout cannot be patched at the zip level."""
+
+
+@dataclass
+class _Member:
+    name: str
+    record: bytes
+    header_offset: int
+
+
+def _read_central_directory(stream: BinaryIO) -> tuple[list[_Member], int, bytes]:
+    file_size: int = stream.seek(0, io.SEEK_END)
+    tail_size: int = min(file_size, _MAX_TAIL_SIZE)
+    stream.seek(file_size - tail_size)
+    tail: bytes = stream.read(tail_size)
+
+    end_position: int = tail.rfind(_END_OF_CENTRAL_DIRECTORY_SIGNATURE)
+    if end_position < 0:
+        raise UnsupportedArchiveError("End of central directory record not found.")
+    end_record: bytes = tail[end_position:]
+    _, disk, _, _, entries, directory_size, directory_offset, _ = (
+        _END_OF_CENTRAL_DIRECTORY.unpack_from(end_record)
+    )
+    if disk != 0 or entries == 0xFFFF or directory_offset == 0xFFFFFFFF:
+        raise UnsupportedArchiveError(
+            "Multi-disk and ZIP64 archives are not supported."
+        )
+
+    stream.seek(directory_offset)
+    directory: bytes = stream.read(directory_size)
+    members: list[_Member] = []
+    position: int = 0
+    for _ in range(entries):
+        fields = _CENTRAL_DIRECTORY_RECORD.unpack_from(directory, position)
+        if fields[0] != _CENTRAL_DIRECTORY_SIGNATURE:
+            raise UnsupportedArchiveError("Malformed central directory.")
+        flag_bits: int = fields[5]
+        name_length, extra_length, comment_length = fields[12:15]
+        if flag_bits & _FLAG_ENCRYPTED:
+            raise UnsupportedArchiveError("Encrypted archives are not supported.")
+
+        record_size: int = (
+            _CENTRAL_DIRECTORY_RECORD.size + name_length + extra_length + comment_length
+        )
+        record: bytes = directory[position : position + record_size]
+        name_start: int = _CENTRAL_DIRECTORY_RECORD.size
+        encoding: str = "utf-8" if flag_bits & 0x800 else "cp437"
+        name: str = record[name_start : name_start + name_length].decode(encoding)
+        members.append(_Member(name=name, record=record, header_offset=fields[18]))
+        position += record_size
+
+    return members, directory_offset, end_record
+
+
+def _copy_range(stream: BinaryIO, output: BinaryIO, start: int, end: int) -> None:
+    stream.seek(start)
+    remaining: int = end - start
+    while remaining > 0:
+        chunk: bytes = stream.read(min(_CHUNK_SIZE, remaining))
+        if not chunk:
+            raise UnsupportedArchiveError("Archive is truncated.")
+        output.write(chunk)
+        remaining -= len(chunk)
+
+
+def _read_member(stream: BinaryIO, member: _Member) -> bytes:
+    stream.seek(member.header_offset)
+    header = _LOCAL_FILE_HEADER.unpack(stream.read(_LOCAL_FILE_HEADER.size))
+    if header[0] != _LOCAL_FILE_HEADER_SIGNATURE:
+        raise UnsupportedArchiveError(f"Malformed local header for '{member.name}'.")
+
+    # Sizes in the local header are zero when a data descriptor follows the data
+    fields = _CENTRAL_DIRECTORY_RECORD.unpack_from(member.record)
+    compress_type: int = fields[6]
+    compressed_size: int = fields[10]
+    stream.seek(header[10] + header[11], io.SEEK_CUR)
+    data: bytes = stream.read(compressed_size)
+
+    if compress_type == 0:
+        return data
+    if compress_type == 8:
+        return zlib.decompress(data, -zlib.MAX_WBITS)
+    raise UnsupportedArchiveError(f"Unsupported compression method {compress_type}.")
+
+
+def _set_author(core_xml: bytes, author: str) -> bytes:
+    root = etree.fromstring(core_xml)
+    creator = root.find(f"{{{DC_NAMESPACE}}}creator")
+    if creator is None:
+        creator = etree.SubElement(root, f"{{{DC_NAMESPACE}}}creator")
+    creator.text = author
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+def _write_member(output: BinaryIO, member: _Member, data: bytes) -> bytes:
+    """Writes a deflated replacement member and returns its central directory record."""
+    fields = list(_CENTRAL_DIRECTORY_RECORD.unpack_from(member.record))
+    name: bytes = member.record[
+        _CENTRAL_DIRECTORY_RECORD.size : _CENTRAL_DIRECTORY_RECORD.size + fields[12]
+    ]
+
+    compressor = zlib.compressobj(
+        zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS
+    )
+    compressed: bytes = compressor.compress(data) + compressor.flush()
+    crc: int = zlib.crc32(data)
+    flag_bits: int = fields[5] & ~_FLAG_DATA_DESCRIPTOR
+    header_offset: int = output.tell()
+
+    output.write(
+        _LOCAL_FILE_HEADER.pack(
+            _LOCAL_FILE_HEADER_SIGNATURE,
+            max(fields[3], 20),  # version needed to extract
+            0,
+            flag_bits,
+            8,  # deflated
+            fields[7],  # modification time
+            fields[8],  # modification date
+            crc,
+            len(compressed),
+            len(data),
+            len(name),
+            0,
+        )
+    )
+    output.write(name)
+    output.write(compressed)
+
+    fields[3] = max(fields[3], 20)
+    fields[5] = flag_bits
+    fields[6] = 8
+    fields[9:12] = [crc, len(compressed), len(data)]
+    fields[18] = header_offset
+    return (
+        _CENTRAL_DIRECTORY_RECORD.pack(*fields)
+        + member.record[_CENTRAL_DIRECTORY_RECORD.size :]
+    )
+
+
+def set_author(stream: BinaryIO, output: BinaryIO, author: str) -> None:
+    """
+    Copies the DOCX archive from stream to output with the given core-properties author.
+
+    Only docProps/core.xml is decompressed and rewritten; every other member is copied
+    byte-for-byte. Raises UnsupportedArchiveError for archives that cannot be patched
+    this way, e.g. ZIP64 or documents without a core-properties part.
+    """
+    members, directory_offset, end_record = _read_central_directory(stream)
+    by_offset: list[_Member] = sorted(members, key=lambda member: member.header_offset)
+    if not any(member.name == CORE_PROPERTIES_PART for member in members):
+        raise UnsupportedArchiveError(f"Archive has no '{CORE_PROPERTIES_PART}' part.")
+
+    # Data preceding the first member (if any) is kept as-is
+    _copy_range(stream, output, 0, by_offset[0].header_offset if by_offset else 0)
+
+    records: dict[int, bytes] = {}
+    for index, member in enumerate(by_offset):
+        next_offset: int = (
+            by_offset[index + 1].header_offset
+            if index + 1 < len(by_offset)
+            else directory_offset
+        )
+        if member.name == CORE_PROPERTIES_PART:
+            core_xml: bytes = _set_author(_read_member(stream, member), author)
+            records[member.header_offset] = _write_member(output, member, core_xml)
+            continue
+
+        new_offset: int = output.tell()
+        _copy_range(stream, output, member.header_offset, next_offset)
+        record = bytearray(member.record)
+        struct.pack_into("<L", record, 42, new_offset)
+        records[member.header_offset] = bytes(record)
+
+    new_directory_offset: int = output.tell()
+    for member in members:
+        output.write(records[member.header_offset])
+    new_directory_size: int = output.tell() - new_directory_offset
+
+    fields = list(_END_OF_CENTRAL_DIRECTORY.unpack_from(end_record))
+    fields[5:7] = [new_directory_size, new_directory_offset]
+    output.write(_END_OF_CENTRAL_DIRECTORY.pack(*fields))
+    # The archive comment follows the end of central directory record
+    output.write(end_record[_END_OF_CENTRAL_DIRECTORY.size :])
@@ -1,28 +1,105 @@
+from datetime import datetime
+
 from django.conf import settings
+from django.core.files.storage import Storage
 from django.db import models
 
-from core.models.metadata_service import modify_file_metadata
+from core.metrics import STORAGE_WRITE_SECONDS, file_type_label
 from core.models.validators import (
     validate_file_format,
     validate_file_size,
     validate_term,
     validate_year,
 )
-from core.utils import extract_file_extension, to_snake_case
+from core.registry import (
+    UNKNOWN_TERM,
+    FileFormat,
+    Term,
+    get_file_format,
+    get_term,
+    readable_term_expression,
+)
+from core.storage import select_exam_storage
+from core.utils import (
+    FileIngestion,
+    extract_file_extension,
+    ingest_file,
+    to_snake_case,
+)
+
+
+class ExamQuerySet(models.QuerySet):
+    def published(self) -> "ExamQuerySet":
+        """Exams whose metadata has been processed and which may be handed out."""
+        return self.filter(metadata_status=Exam.MetadataStatus.DONE)
+
+    def with_readable_term(self) -> "ExamQuerySet":
+        """Computes readable_term in the database instead of once per instance."""
+        return self.annotate(term_label=readable_term_expression())
 
 
 class Exam(models.Model):
+    class MetadataStatus(models.TextChoices):
+        PENDING = "pending", "Pending"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
     file = models.FileField(
-        upload_to="exams/", validators=[validate_file_format, validate_file_size]
+        upload_to="exams/",
+        storage=select_exam_storage,
+        validators=[validate_file_format, validate_file_size],
     )
     year = models.PositiveIntegerField(
         validators=[validate_year], help_text="The year the term started."
     )
     term = models.CharField(max_length=2, validators=[validate_term])
     course = models.ForeignKey("Course", on_delete=models.CASCADE)
+    metadata_status = models.CharField(
+        max_length=10,
+        choices=MetadataStatus.choices,
+        default=MetadataStatus.PENDING,
+        editable=False,
+    )
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        help_text="SHA-256 of the stored file after metadata processing.",
+    )
+    file_size = models.PositiveBigIntegerField(
+        null=True,
+        editable=False,
+        help_text="Size of the stored file in bytes.",
+    )
+    original_size = models.PositiveBigIntegerField(
+        null=True,
+        editable=False,
+        help_text="Size of the file in bytes before it was optimized.",
+    )
+    optimized_size = models.PositiveBigIntegerField(
+        null=True,
+        editable=False,
+        help_text="Size of the optimized file in bytes, which is only kept if "
+        "it is sufficiently smaller.",
+    )
+    metadata_author = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        help_text="The author last written into the file metadata.",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ExamQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Cover the filters of the public exam listing
+            models.Index(fields=["course", "year", "term"]),
+            models.Index(fields=["year", "term"]),
+        ]
+
     @property
     def file_name(self):
         file_extension: str = extract_file_extension(self.file)
@@ -30,31 +107,91 @@ class Exam(models.Model):
 
     @property
     def readable_term(self):
-        for term in settings.TERMS:
-            if term["code"] == self.term:
-                start_month, _ = term["start_date"]
-                end_month, _ = term["end_date"]
-                if start_month > end_month:
-                    return f"{term['code']}-{self.year}/{str(self.year + 1)[-2:]}"
-                else:
-                    return f"{term['code']}-{self.year}"
+        if "term_label" in self.__dict__:
+            return self.term_label
 
-        return "Unknown Term"
+        term: Term | None = get_term(self.term)
+        return term.label(self.year) if term else UNKNOWN_TERM
 
     @property
     def file_type(self):
-        file_extension: str = extract_file_extension(self.file)
+        file_format: FileFormat | None = get_file_format(
+            extract_file_extension(self.file)
+        )
+        return file_format.display_name if file_format else "Unknown"
 
-        display_names: dict[str, str] = {
-            file_format["extension"]: file_format["display_name"]
-            for file_format in settings.EXAM_FILE_FORMATS
-        }
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_content_hash = instance.__dict__.get("content_hash")
+        return instance
 
-        return display_names.get(file_extension, "Unknown")
+    @property
+    def metadata_outdated(self) -> bool:
+        """Whether the stored file still needs its metadata rewritten."""
+        if self.metadata_author != settings.EXAM_METADATA_AUTHOR:
+            return True
+        stored_content_hash: str | None = getattr(self, "_stored_content_hash", None)
+        return not self.content_hash or self.content_hash != stored_content_hash
 
     def save(self, *args, **kwargs):
+        if self.file and not self.file._committed:
+            # Reuses the single read done during validation, if any
+            ingestion: FileIngestion = ingest_file(self.file)
+            self.content_hash = ingestion.content_hash
+            self.file_size = ingestion.size
+            # Stored here rather than by the field in super().save(), to be timed
+            with STORAGE_WRITE_SECONDS.time(file_type=file_type_label(self.file.name)):
+                self.file.save(self.file.name, self.file.file, save=False)
+
+        # The metadata rewrite is queued by a post_save receiver in core.signals
+        if self.metadata_outdated:
+            self._processed_duplicate = self._find_processed_duplicate()
+            if self._processed_duplicate is not None:
+                # The file is byte-identical to one whose metadata is already set
+                self.metadata_status = self.MetadataStatus.DONE
+                self.metadata_author = self._processed_duplicate.metadata_author
+            else:
+                self.metadata_status = self.MetadataStatus.PENDING
         super().save(*args, **kwargs)
-        modify_file_metadata(self.file)
+        self._stored_content_hash = self.content_hash
+
+    def _find_processed_duplicate(self) -> "Exam | None":
+        if not self.content_hash:
+            return None
+        return (
+            Exam.objects.exclude(pk=self.pk)
+            .filter(
+                content_hash=self.content_hash,
+                metadata_status=self.MetadataStatus.DONE,
+                metadata_author=settings.EXAM_METADATA_AUTHOR,
+            )
+            .first()
+        )
+
+    @classmethod
+    def delete_file_if_unreferenced(
+        cls, storage: Storage, name: str, unmodified_since: datetime | None = None
+    ) -> bool:
+        """
+        Deletes a stored exam file unless an exam still references it, which happens
+        with content-addressed storage. With unmodified_since, files modified later
+        are kept as well, e.g. reused blobs of uploads whose exam is not saved yet.
+        Returns whether the file was deleted.
+        """
+        if not name or cls.objects.filter(file=name).exists():
+            return False
+        if unmodified_since is not None:
+            # Checked after the exams, as uploads touch a blob before saving the exam
+            try:
+                if storage.get_modified_time(name) > unmodified_since:
+                    return False
+            except NotImplementedError:
+                pass
+            except OSError:
+                return False
+        storage.delete(name)
+        return True
 
     def __str__(self) -> str:
         return self.file_name
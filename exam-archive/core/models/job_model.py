@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+def _default_max_attempts() -> int:
+    return settings.EXAM_METADATA_JOB_MAX_ATTEMPTS
+
+
+class MetadataJob(models.Model):
+    """A queued metadata rewrite of an exam file."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    exam = models.ForeignKey("Exam", on_delete=models.CASCADE, related_name="jobs")
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=_default_max_attempts)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_after"])]
+
+    def __str__(self) -> str:
+        return f"Metadata job #{self.pk} for exam #{self.exam_id} ({self.status})"
@@ -1,56 +1,144 @@
+import io
 import logging
-from collections.abc import Callable
+import shutil
+import tempfile
+from dataclasses import dataclass
 
 from django.conf import settings
 from django.db.models.fields.files import FieldFile
-from docx import Document
-from pypdf import PdfReader, PdfWriter
 
-from core.utils import extract_file_mime_type
+from core.metrics import (
+    METADATA_REWRITE_FAILURES,
+    METADATA_REWRITE_SECONDS,
+    file_type_label,
+)
+from core.handlers import run_file_handler
+from core.registry import FileFormat, get_file_format_by_mime_type
+from core.utils import extract_file_mime_type, forget_ingestion
 
 logger = logging.getLogger(__name__)
 
 
-def modify_file_metadata(file: FieldFile) -> None:
-    """Modifies the metadata of the file in-place based on file type."""
+@dataclass(frozen=True)
+class FileOptimization:
+    original_size: int
+    optimized_size: int
+    kept: bool
 
-    file_mime_type: str = extract_file_mime_type(file)
 
-    file_handlers: dict[str, Callable] = {
-        "application/pdf": _process_pdf,
-        "application/vnd.openxmlformats-officedocument.wordprocessingml.document": _process_docx,
-        # Future file types can be added here
-    }
-    file_handler: Callable[[FieldFile], None] = file_handlers.get(file_mime_type)
+def modify_file_metadata(file: FieldFile) -> FileOptimization | None:
+    """
+    Modifies the metadata of the file in-place with the processor of its file format,
+    then optimizes it if EXAM_PDF_OPTIMIZATION is enabled and returns the outcome of
+    the optimization. Errors raised by a processor are propagated so that the job
+    queue can retry.
+    """
 
-    if file_handler:
-        file_handler(file)
+    file_mime_type: str = extract_file_mime_type(file)
+    file_format: FileFormat | None = get_file_format_by_mime_type(file_mime_type)
+
+    if file_format is not None and file_format.processor is not None:
+        labels: dict[str, str] = {
+            "file_type": file_type_label(file.name),
+            "handler": file_format.processor.__name__,
+        }
+        try:
+            with METADATA_REWRITE_SECONDS.time(**labels):
+                run_file_handler(file_format, file_format.processor, file)
+        except Exception:
+            METADATA_REWRITE_FAILURES.inc(**labels)
+            raise
+        forget_ingestion(file)
     else:
         logger.warning(
             f"File type '{file_mime_type}' not supported for metadata modification."
         )
 
+    if not settings.EXAM_PDF_OPTIMIZATION:
+        return None
+    try:
+        return optimize_file(file)
+    except Exception as e:
+        # The metadata is set, so the unoptimized file is kept rather than retried
+        logger.warning(f"Could not optimize file '{file.name}': {e}", exc_info=True)
+        return None
+
 
-def _process_pdf(file_field: FieldFile) -> None:
-    """Processes PDF files to modify the Author metadata and overwrite the original file."""
+def optimize_file(file: FieldFile) -> FileOptimization | None:
+    """Optimizes the file in-place, if its file format has an optimizer."""
+    # The processor may have left the file open for writing
+    with file.open("rb"):
+        file_format: FileFormat | None = get_file_format_by_mime_type(
+            extract_file_mime_type(file)
+        )
+    if file_format is None or file_format.optimizer is None:
+        return None
+    with METADATA_REWRITE_SECONDS.time(
+        file_type=file_type_label(file.name), handler=file_format.optimizer.__name__
+    ):
+        optimization: FileOptimization = run_file_handler(
+            file_format, file_format.optimizer, file
+        )
+    forget_ingestion(file)
+    return optimization
+
+
+def optimize_pdf(file_field: FieldFile) -> FileOptimization:
+    """
+    Replaces the PDF with its losslessly optimized version if that is at least
+    EXAM_PDF_OPTIMIZATION_MIN_SAVINGS percent smaller.
+    """
+    from core.models import pdf_optimizer
+
+    with tempfile.TemporaryFile() as output:
+        with file_field.open("rb") as pdf_file:
+            original_size: int = pdf_file.seek(0, io.SEEK_END)
+            pdf_file.seek(0)
+            pdf_optimizer.optimize(pdf_file, output)
+        optimized_size: int = output.tell()
+
+        min_savings: int = settings.EXAM_PDF_OPTIMIZATION_MIN_SAVINGS
+        kept: bool = optimized_size <= original_size * (100 - min_savings) / 100
+        if kept:
+            output.seek(0)
+            with file_field.open("wb") as pdf_output_file:
+                shutil.copyfileobj(output, pdf_output_file)
 
     logger.info(
-        f"Starting the process of updating PDF metadata for file: '{file_field.name}'."
+        f"Optimized PDF file '{file_field.name}' from {original_size} to "
+        f"{optimized_size} bytes, {'keeping' if kept else 'discarding'} the result."
     )
-    try:
-        with file_field.open("rb") as pdf_file:
-            reader = PdfReader(pdf_file)
-            writer = PdfWriter()
+    return FileOptimization(original_size, optimized_size, kept)
 
-            # Copy the content to the new PDF
-            writer.append_pages_from_reader(reader)
 
-            # Set the Author
-            author: str = settings.EXAM_METADATA_AUTHOR
-            writer.add_metadata({"/Author": author})
+def process_pdf(file_field: FieldFile) -> None:
+    """Processes PDF files to modify the Author metadata and overwrite the original file."""
+    # pypdf, python-docx and lxml are only imported by processes handling files
+    from core.models import pdf_metadata
 
-        with file_field.open("wb") as pdf_output_file:
-            writer.write(pdf_output_file)
+    logger.info(
+        f"Starting the process of updating PDF metadata for file: '{file_field.name}'."
+    )
+    metadata: dict[str, str] = {"/Author": settings.EXAM_METADATA_AUTHOR}
+    try:
+        try:
+            file_path: str = file_field.path
+            with open(file_path, "rb") as pdf_file:
+                update: bytes = pdf_metadata.build_info_update(pdf_file, metadata)
+        except Exception as e:
+            # Broken files and non-local storages get the full rewrite
+            logger.warning(
+                f"Cannot update PDF metadata of file '{file_field.name}' incrementally, rewriting it: {e}"
+            )
+            with file_field.open("rb") as pdf_file:
+                output = io.BytesIO()
+                pdf_metadata.rewrite_metadata(pdf_file, output, metadata)
+
+            with file_field.open("wb") as pdf_output_file:
+                pdf_output_file.write(output.getvalue())
+        else:
+            with open(file_path, "ab") as pdf_file:
+                pdf_file.write(update)
 
         logger.info(
             f"Successfully processed and updated PDF metadata for file '{file_field.name}'."
@@ -61,24 +149,38 @@ def _process_pdf(file_field: FieldFile) -> None:
             f"An error occurred while processing the PDF file '{file_field.name}': {e}",
             exc_info=True,
         )
+        raise
 
 
-def _process_docx(file_field: FieldFile) -> None:
+def process_docx(file_field: FieldFile) -> None:
     """Processes DOCX files to modify the Author metadata and overwrite the original file."""
+    from docx import Document
+
+    from core.models import docx_metadata
 
     logger.info(
         f"Starting the process of updating DOCX metadata for file: '{file_field.name}'."
     )
+    author: str = settings.EXAM_METADATA_AUTHOR
     try:
-        with file_field.open("rb") as docx_file:
-            document = Document(docx_file)
-            # Assuming metadata modification via core properties
-            core_props = document.core_properties
-            core_props.author = settings.EXAM_METADATA_AUTHOR
-            document.add_paragraph("It was a dark and stormy night.")
-
-        with file_field.open("wb") as docx_output_file:
-            document.save(docx_output_file)
+        with tempfile.TemporaryFile() as output:
+            with file_field.open("rb") as docx_file:
+                try:
+                    docx_metadata.set_author(docx_file, output, author)
+                except docx_metadata.UnsupportedArchiveError as e:
+                    # Fall back to python-docx, which also adds missing core properties
+                    logger.warning(
+                        f"Cannot patch DOCX metadata of file '{file_field.name}' in place, rewriting it: {e}"
+                    )
+                    output.seek(0)
+                    output.truncate()
+                    document = Document(docx_file)
+                    document.core_properties.author = author
+                    document.save(output)
+
+            output.seek(0)
+            with file_field.open("wb") as docx_output_file:
+                shutil.copyfileobj(output, docx_output_file)
 
         logger.info(
             f"Successfully processed and updated DOCX metadata for file '{file_field.name}'."
@@ -89,3 +191,4 @@ def _process_docx(file_field: FieldFile) -> None:
             f"An error occurred while processing the DOCX file '{file_field.name}': {e}",
             exc_info=True,
         )
+        raise
@@ -0,0 +1,131 @@
+import io
+import re
+import struct
+from typing import BinaryIO
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.errors import PdfReadError
+from pypdf.generic import (
+    ArrayObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    PdfObject,
+    create_string_object,
+)
+
+# The last cross-reference section is announced within the final bytes of the file
+_TAIL_SIZE: int = 2048
+_STARTXREF_PATTERN = re.compile(rb"startxref\s+(\d+)\s+%%EOF")
+_XREF_STREAM_PATTERN = re.compile(rb"\s*\d+\s+\d+\s+obj")
+
+
+def _serialize(pdf_object: PdfObject) -> bytes:
+    buffer = io.BytesIO()
+    pdf_object.write_to_stream(buffer)
+    return buffer.getvalue()
+
+
+def _find_last_xref_offset(stream: BinaryIO, file_size: int) -> int:
+    stream.seek(max(file_size - _TAIL_SIZE, 0))
+    matches: list[bytes] = _STARTXREF_PATTERN.findall(stream.read())
+    if not matches:
+        raise PdfReadError("Could not find the 'startxref' marker.")
+
+    xref_offset: int = int(matches[-1])
+    if xref_offset >= file_size:
+        raise PdfReadError("'startxref' points beyond the end of the file.")
+    return xref_offset
+
+
+def build_info_update(stream: BinaryIO, metadata: dict[str, str]) -> bytes:
+    """
+    Builds an incremental-update section that replaces the document Info dictionary.
+
+    Appending the returned bytes to the end of the PDF sets the given metadata while
+    leaving every original byte untouched. Raises PdfReadError for files whose
+    cross-reference data cannot be trusted; those need a full rewrite instead.
+    """
+    file_size: int = stream.seek(0, io.SEEK_END)
+    xref_offset: int = _find_last_xref_offset(stream, file_size)
+
+    stream.seek(xref_offset)
+    xref_head: bytes = stream.read(32)
+    if xref_head.startswith(b"xref"):
+        uses_xref_stream = False
+    elif _XREF_STREAM_PATTERN.match(xref_head):
+        uses_xref_stream = True
+    else:
+        raise PdfReadError("'startxref' does not point at a cross-reference section.")
+
+    reader = PdfReader(stream, strict=True)
+    if reader.is_encrypted:
+        raise PdfReadError("Encrypted documents cannot be updated incrementally.")
+
+    trailer: DictionaryObject = reader.trailer
+    info_number: int = int(trailer["/Size"])
+
+    info = DictionaryObject()
+    if "/Info" in trailer:
+        for key, value in trailer["/Info"].get_object().items():
+            info[NameObject(key)] = value
+    for key, value in metadata.items():
+        info[NameObject(key)] = create_string_object(value)
+
+    new_trailer = DictionaryObject()
+    new_trailer[NameObject("/Root")] = trailer.raw_get("/Root")
+    new_trailer[NameObject("/Info")] = IndirectObject(info_number, 0, None)
+    new_trailer[NameObject("/Prev")] = NumberObject(xref_offset)
+    if "/ID" in trailer:
+        new_trailer[NameObject("/ID")] = ArrayObject(trailer["/ID"])
+
+    # Original files do not always end with an end-of-line marker
+    update = bytearray(b"\n")
+    info_offset: int = file_size + len(update)
+    update += b"%d 0 obj\n%s\nendobj\n" % (info_number, _serialize(info))
+    xref_section_offset: int = file_size + len(update)
+
+    if uses_xref_stream:
+        # Files with cross-reference streams must be continued with one as well
+        entries: bytes = struct.pack(">BIH", 1, info_offset, 0) + struct.pack(
+            ">BIH", 1, xref_section_offset, 0
+        )
+        new_trailer[NameObject("/Type")] = NameObject("/XRef")
+        new_trailer[NameObject("/Size")] = NumberObject(info_number + 2)
+        new_trailer[NameObject("/W")] = ArrayObject(
+            [NumberObject(1), NumberObject(4), NumberObject(2)]
+        )
+        new_trailer[NameObject("/Index")] = ArrayObject(
+            [NumberObject(info_number), NumberObject(2)]
+        )
+        new_trailer[NameObject("/Length")] = NumberObject(len(entries))
+        update += b"%d 0 obj\n%s\nstream\n%s\nendstream\nendobj\n" % (
+            info_number + 1,
+            _serialize(new_trailer),
+            entries,
+        )
+    else:
+        # Starting with the free-list head keeps readers from guessing at the indexes
+        new_trailer[NameObject("/Size")] = NumberObject(info_number + 1)
+        update += b"xref\n0 1\n0000000000 65535 f\r\n%d 1\n%010d 00000 n\r\n" % (
+            info_number,
+            info_offset,
+        )
+        update += b"trailer\n%s\n" % _serialize(new_trailer)
+
+    update += b"startxref\n%d\n%%%%EOF\n" % xref_section_offset
+    return bytes(update)
+
+
+def rewrite_metadata(
+    input_stream: BinaryIO, output_stream: BinaryIO, metadata: dict[str, str]
+) -> None:
+    """Re-serializes the whole document with the given metadata."""
+    reader = PdfReader(input_stream)
+    writer = PdfWriter()
+
+    # Copy the content to the new PDF
+    writer.append_pages_from_reader(reader)
+    writer.add_metadata(metadata)
+    writer.write(output_stream)
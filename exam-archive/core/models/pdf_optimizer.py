@@ -0,0 +1,19 @@
+from typing import BinaryIO
+
+from pypdf import PdfReader, PdfWriter
+
+# Slowest, smallest zlib level; decompression speed does not depend on it
+COMPRESSION_LEVEL: int = 9
+
+
+def optimize(input_stream: BinaryIO, output_stream: BinaryIO) -> None:
+    """
+    Losslessly re-serializes the document: page content streams are recompressed
+    and identical objects, e.g. fonts and images embedded once per page, are merged.
+    Metadata, images and text are kept as they are.
+    """
+    writer = PdfWriter(clone_from=PdfReader(input_stream))
+    for page in writer.pages:
+        page.compress_content_streams(level=COMPRESSION_LEVEL)
+    writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+    writer.write(output_stream)
@@ -0,0 +1,20 @@
+from django.db import models
+
+
+class ExamText(models.Model):
+    """
+    Text extracted from an exam file. On SQLite the rows are mirrored into an FTS5
+    index by triggers, see core.search.backends.
+    """
+
+    exam = models.OneToOneField(
+        "Exam", on_delete=models.CASCADE, primary_key=True, related_name="text"
+    )
+    content_hash = models.CharField(
+        max_length=64, blank=True, help_text="Hash of the file the text was taken from."
+    )
+    text = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"Text of exam #{self.exam_id}"
@@ -0,0 +1,42 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+from core.models.validators import validate_term, validate_year
+
+
+class ExamUpload(models.Model):
+    """
+    A resumable upload, assembled on disk chunk by chunk. The exam is only created
+    once all bytes arrived, see core.uploads.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    length = models.PositiveBigIntegerField(help_text="Total size in bytes.")
+    offset = models.PositiveBigIntegerField(
+        default=0, help_text="Number of bytes received so far."
+    )
+    mime_type = models.CharField(
+        max_length=255, blank=True, help_text="Sniffed from the first chunk."
+    )
+    year = models.PositiveIntegerField(validators=[validate_year])
+    term = models.CharField(max_length=2, validators=[validate_term])
+    course = models.ForeignKey("Course", on_delete=models.CASCADE)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    exam = models.ForeignKey(
+        "Exam", null=True, blank=True, on_delete=models.SET_NULL, editable=False
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["updated_at"])]
+
+    @property
+    def is_complete(self) -> bool:
+        return self.offset == self.length
+
+    def __str__(self) -> str:
+        return f"Upload of '{self.filename}' ({self.offset}/{self.length} bytes)"
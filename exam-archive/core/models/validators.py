@@ -2,14 +2,16 @@ from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db.models.fields.files import FieldFile
 
-from core.utils import extract_file_extension, extract_file_mime_type
+from core.metrics import FILE_VALIDATION_SECONDS, file_type_label
+from core.registry import FileFormat, get_file_format, get_registry
+from core.utils import FileIngestion, ingest_file
 
 
 def validate_term(value) -> None:
     """
     Validator to ensure that the 'term' field has a valid value based on TERMS.
     """
-    valid_terms = [term["code"] for term in settings.TERMS]
+    valid_terms: dict = get_registry().terms
 
     if value not in valid_terms:
         raise ValidationError(
@@ -30,26 +32,40 @@ def validate_year(value) -> None:
         )
 
 
+def _is_stored(file: FieldFile) -> bool:
+    # Stored files were validated when they were uploaded; re-validating them on
+    # every edit of an exam would read the whole file from storage again.
+    return getattr(file, "_committed", False)
+
+
 def validate_file_format(file: FieldFile) -> None:
     """
     Validates both the file extension, MIME type, and file size of the uploaded file.
     The allowed formats and MIME types are fetched from settings.
     """
-    allowed_formats: dict[str, dict] = {
-        f["extension"]: f for f in settings.EXAM_FILE_FORMATS
-    }
+    if _is_stored(file):
+        return
+
+    with FILE_VALIDATION_SECONDS.time(
+        file_type=file_type_label(file.name), validator="format"
+    ):
+        _validate_file_format(file)
 
-    file_extension: str = extract_file_extension(file)
-    file_mime_type: str = extract_file_mime_type(file)
+
+def _validate_file_format(file: FieldFile) -> None:
+    ingestion: FileIngestion = ingest_file(file)
+    file_extension: str = ingestion.extension
+    file_mime_type: str = ingestion.mime_type
 
     # Validate file extension exists in allowed formats
-    if file_extension not in allowed_formats.keys():
+    file_format: FileFormat | None = get_file_format(file_extension)
+    if file_format is None:
         raise ValidationError(
-            f"Unsupported file extension: {file_extension}. Allowed extensions are: {', '.join(allowed_formats.keys())}"
+            f"Unsupported file extension: {file_extension}. Allowed extensions are: {', '.join(get_registry().formats_by_extension)}"
         )
 
     # Validate MIME type matches the expected MIME type for the file extension
-    expected_mime_type: str = allowed_formats[file_extension]["mime_type"]
+    expected_mime_type: str = file_format.mime_type
     if file_mime_type != expected_mime_type:
         raise ValidationError(
             f"File MIME type '{file_mime_type}' does not match the expected MIME type '{expected_mime_type}' for extension '{file_extension}'."
@@ -58,6 +74,13 @@ def validate_file_format(file: FieldFile) -> None:
 
 def validate_file_size(file: FieldFile) -> None:
     # Validate file size using the max_size defined for the file type
+    if _is_stored(file):
+        return
+
     max_file_size: int = settings.EXAM_MAX_UPLOAD_FILE_SIZE
-    if file.size > max_file_size:
+    with FILE_VALIDATION_SECONDS.time(
+        file_type=file_type_label(file.name), validator="size"
+    ):
+        file_size: int = ingest_file(file).size
+    if file_size > max_file_size:
         raise ValidationError(f"File size exceeds the limit of {max_file_size} MB.")
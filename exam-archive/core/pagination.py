@@ -0,0 +1,83 @@
+import base64
+import binascii
+import json
+from typing import Any
+
+from django.core.exceptions import ValidationError
+from django.db.models import Model, Q, QuerySet
+
+DEFAULT_PAGE_SIZE: int = 50
+MAX_PAGE_SIZE: int = 200
+
+
+def _encode_cursor(values: list[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def _decode_cursor(
+    cursor: str, model: type[Model], ordering: tuple[str, ...]
+) -> list[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        raise ValidationError("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValidationError("Invalid cursor.")
+
+    # Cursors come from clients, so every value must be valid for its column
+    cleaned: list[Any] = []
+    for field, value in zip(ordering, values):
+        if isinstance(value, (dict, list)):
+            raise ValidationError("Invalid cursor.")
+        try:
+            cleaned.append(model._meta.get_field(field.lstrip("-")).clean(value, None))
+        except (ValidationError, TypeError, ValueError):
+            raise ValidationError("Invalid cursor.")
+    return cleaned
+
+
+def _after(ordering: tuple[str, ...], values: list[Any]) -> Q:
+    # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y), honouring each direction
+    condition = Q()
+    for index, field in enumerate(ordering):
+        name: str = field.lstrip("-")
+        lookup: str = "lt" if field.startswith("-") else "gt"
+        step = Q(**{f"{name}__{lookup}": values[index]})
+        for previous_field, previous_value in zip(ordering[:index], values):
+            step &= Q(**{previous_field.lstrip("-"): previous_value})
+        condition |= step
+    return condition
+
+
+def paginate_by_keyset(
+    queryset: QuerySet, params: dict, ordering: tuple[str, ...]
+) -> tuple[list[Model], str | None]:
+    """
+    Returns one page of the queryset and the cursor of the next page.
+
+    Pages are selected with a WHERE clause on the ordering columns instead of an
+    OFFSET, so later pages cost the same as the first one. The ordering must be
+    unique, e.g. end with the primary key.
+    """
+    try:
+        limit: int = int(params.get("limit") or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        raise ValidationError("'limit' must be an integer.")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    queryset = queryset.order_by(*ordering)
+    cursor: str | None = params.get("cursor")
+    if cursor:
+        queryset = queryset.filter(
+            _after(ordering, _decode_cursor(cursor, queryset.model, ordering))
+        )
+
+    rows: list[Model] = list(queryset[: limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last: Model = rows[-1]
+    return rows, _encode_cursor(
+        [getattr(last, field.lstrip("-")) for field in ordering]
+    )
@@ -0,0 +1,144 @@
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import CharField, F, Value
+from django.db.models.expressions import Case, Combinable, When
+from django.db.models.functions import Cast, Concat, Right
+from django.utils.module_loading import import_string
+
+UNKNOWN_TERM: str = "Unknown Term"
+# Where the handlers of a file format run, see core.handlers
+EXECUTION_MODES: tuple[str, ...] = ("inline", "thread", "process")
+HANDLER_KINDS: tuple[str, ...] = (
+    "processor",
+    "optimizer",
+    "text_extractor",
+    "thumbnailer",
+)
+
+
+@dataclass(frozen=True)
+class Term:
+    code: str
+    display_name: str
+    start_date: tuple[int, int]
+    end_date: tuple[int, int]
+
+    @property
+    def spans_new_year(self) -> bool:
+        return self.start_date[0] > self.end_date[0]
+
+    def label(self, year: int) -> str:
+        if self.spans_new_year:
+            return f"{self.code}-{year}/{str(year + 1)[-2:]}"
+        return f"{self.code}-{year}"
+
+
+@dataclass(frozen=True)
+class FileFormat:
+    extension: str
+    mime_type: str
+    display_name: str
+    compressed: bool = False
+    # Rewrites the metadata of a stored file in place
+    processor: Callable[[Any], None] | None = None
+    # Losslessly shrinks a stored file in place, returning a FileOptimization
+    optimizer: Callable[[Any], Any] | None = None
+    # Returns the plain text of a file stream for the search index
+    text_extractor: Callable[[Any], str] | None = None
+    # Returns page count, preview and thumbnail source of a file stream
+    thumbnailer: Callable[[Any], Any] | None = None
+    execution: str = "inline"
+
+
+def _build_file_format(file_format: dict) -> FileFormat:
+    execution: str = file_format.get("execution", "inline")
+    if execution not in EXECUTION_MODES:
+        raise ImproperlyConfigured(
+            f"Unknown execution mode '{execution}' of file format "
+            f"'{file_format['extension']}', use one of: {', '.join(EXECUTION_MODES)}."
+        )
+    handlers: dict[str, Callable | None] = {
+        kind: import_string(file_format[kind]) if file_format.get(kind) else None
+        for kind in HANDLER_KINDS
+    }
+    return FileFormat(
+        extension=file_format["extension"],
+        mime_type=file_format["mime_type"],
+        display_name=file_format["display_name"],
+        compressed=file_format.get("compressed", False),
+        execution=execution,
+        **handlers,
+    )
+
+
+class Registry:
+    """Lookup tables for the configured terms and file formats."""
+
+    def __init__(self, terms: list[dict], file_formats: list[dict]) -> None:
+        self.terms: dict[str, Term] = {
+            term["code"]: Term(
+                code=term["code"],
+                display_name=term["display_name"],
+                start_date=tuple(term["start_date"]),
+                end_date=tuple(term["end_date"]),
+            )
+            for term in terms
+        }
+        formats: list[FileFormat] = [
+            _build_file_format(file_format) for file_format in file_formats
+        ]
+        self.formats_by_extension: dict[str, FileFormat] = {
+            file_format.extension: file_format for file_format in formats
+        }
+        self.formats_by_mime_type: dict[str, FileFormat] = {
+            file_format.mime_type: file_format for file_format in formats
+        }
+
+
+_registry: Registry | None = None
+
+
+def build_registry() -> Registry:
+    """
+    (Re)builds the registry from settings.TERMS and settings.EXAM_FILE_FORMATS,
+    importing the file handlers once. Called from CoreConfig.ready() and whenever
+    one of those settings is overridden.
+    """
+    global _registry
+    _registry = Registry(settings.TERMS, settings.EXAM_FILE_FORMATS)
+    return _registry
+
+
+def get_registry() -> Registry:
+    return _registry or build_registry()
+
+
+def get_term(code: str) -> Term | None:
+    return get_registry().terms.get(code)
+
+
+def get_file_format(extension: str) -> FileFormat | None:
+    return get_registry().formats_by_extension.get(extension)
+
+
+def get_file_format_by_mime_type(mime_type: str) -> FileFormat | None:
+    return get_registry().formats_by_mime_type.get(mime_type)
+
+
+def readable_term_expression(term: str = "term", year: str = "year") -> Combinable:
+    """
+    Database expression computing Exam.readable_term for every row of a queryset,
+    e.g. `Exam.objects.annotate(term_label=readable_term_expression())`.
+    """
+    whens: list[When] = []
+    for code, registered_term in get_registry().terms.items():
+        parts: list[Combinable] = [Value(f"{code}-"), Cast(year, CharField())]
+        if registered_term.spans_new_year:
+            parts += [Value("/"), Right(Cast(F(year) + 1, CharField()), 2)]
+        whens.append(When(**{term: code}, then=Concat(*parts)))
+
+    return Case(*whens, default=Value(UNKNOWN_TERM), output_field=CharField())
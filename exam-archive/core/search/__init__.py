@@ -0,0 +1,7 @@
+from core.search.backends import (  # noqa: F401
+    BaseSearchBackend,
+    SearchHit,
+    get_search_backend,
+)
+from core.search.extraction import extract_text  # noqa: F401
+from core.search.indexing import exams_needing_index, index_exam  # noqa: F401
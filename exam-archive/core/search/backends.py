@@ -0,0 +1,259 @@
+import functools
+import math
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Max, QuerySet
+from django.utils.module_loading import import_string
+
+from core.models import ExamText
+from core.search.query import (
+    HIGHLIGHT_END,
+    HIGHLIGHT_START,
+    SNIPPET_ELLIPSIS,
+    SNIPPET_TOKENS,
+    iter_tokens,
+    parse_query,
+    render_snippet,
+)
+
+# Created by migration 0005 on SQLite builds that ship FTS5
+FTS5_TABLE: str = "core_examtext_fts"
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    exam_id: int
+    score: float
+    snippet: str
+
+
+class BaseSearchBackend:
+    """Base class for full-text search backends over ExamText."""
+
+    def search(
+        self, query: str, exams: QuerySet | None = None, limit: int = 20
+    ) -> list[SearchHit]:
+        """
+        Returns up to `limit` hits for the query, best first. If `exams` is given,
+        only exams from that queryset are considered.
+        """
+        raise NotImplementedError
+
+
+class Fts5SearchBackend(BaseSearchBackend):
+    """Queries the SQLite FTS5 index that triggers keep in sync with ExamText."""
+
+    def search(
+        self, query: str, exams: QuerySet | None = None, limit: int = 20
+    ) -> list[SearchHit]:
+        phrases: list[tuple[str, ...]] = parse_query(query)
+        if not phrases:
+            return []
+
+        # Quoting every phrase keeps user input from being read as FTS5 syntax
+        match: str = " ".join(f'"{" ".join(phrase)}"' for phrase in phrases)
+        sql: str = (
+            f"SELECT rowid, bm25({FTS5_TABLE}), "
+            f"snippet({FTS5_TABLE}, 0, %s, %s, %s, %s) "
+            f"FROM {FTS5_TABLE} WHERE {FTS5_TABLE} MATCH %s"
+        )
+        params: list = [
+            HIGHLIGHT_START,
+            HIGHLIGHT_END,
+            SNIPPET_ELLIPSIS,
+            SNIPPET_TOKENS,
+            match,
+        ]
+        if exams is not None:
+            exams_sql, exams_params = (
+                exams.order_by().values("pk").query.sql_with_params()
+            )
+            sql += f" AND rowid IN ({exams_sql})"
+            params += exams_params
+        sql += " ORDER BY rank LIMIT %s"
+        params.append(limit)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+        # bm25() is lower for better matches; hits report higher-is-better scores
+        return [
+            SearchHit(exam_id=exam_id, score=-rank, snippet=render_snippet(snippet))
+            for exam_id, rank, snippet in rows
+        ]
+
+
+class _InvertedIndex:
+    def __init__(self, documents: QuerySet) -> None:
+        # token -> exam id -> token positions
+        self.postings: dict[str, dict[int, list[int]]] = defaultdict(dict)
+        self.lengths: dict[int, int] = {}
+        for exam_id, text in documents.values_list("exam_id", "text").iterator():
+            position: int = -1
+            for position, (token, _, _) in enumerate(iter_tokens(text)):
+                self.postings[token].setdefault(exam_id, []).append(position)
+            self.lengths[exam_id] = position + 1
+        self.average_length: float = (
+            sum(self.lengths.values()) / len(self.lengths) if self.lengths else 0.0
+        )
+
+    def _phrase_matches(self, phrase: tuple[str, ...]) -> dict[int, int]:
+        """Returns the number of occurrences of the phrase per exam."""
+        postings: list[dict[int, list[int]]] = [
+            self.postings.get(token, {}) for token in phrase
+        ]
+        candidates: set[int] = set(postings[0])
+        for token_postings in postings[1:]:
+            candidates &= token_postings.keys()
+
+        matches: dict[int, int] = {}
+        for exam_id in candidates:
+            following: list[set[int]] = [set(p[exam_id]) for p in postings[1:]]
+            occurrences: int = sum(
+                1
+                for start in postings[0][exam_id]
+                if all(
+                    start + i + 1 in positions for i, positions in enumerate(following)
+                )
+            )
+            if occurrences:
+                matches[exam_id] = occurrences
+        return matches
+
+    def search(
+        self, phrases: list[tuple[str, ...]], allowed: set[int] | None
+    ) -> dict[int, float]:
+        """Scores the exams containing every phrase with Okapi BM25."""
+        k1, b = 1.2, 0.75
+        scores: dict[int, float] | None = None
+        for phrase in phrases:
+            matches: dict[int, int] = self._phrase_matches(phrase)
+            if allowed is not None:
+                matches = {e: n for e, n in matches.items() if e in allowed}
+            idf: float = math.log(
+                1 + (len(self.lengths) - len(matches) + 0.5) / (len(matches) + 0.5)
+            )
+
+            phrase_scores: dict[int, float] = {}
+            for exam_id, frequency in matches.items():
+                length_ratio: float = self.lengths[exam_id] / (self.average_length or 1)
+                phrase_scores[exam_id] = idf * (
+                    frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length_ratio))
+                )
+
+            if scores is None:
+                scores = phrase_scores
+            else:
+                scores = {
+                    exam_id: score + phrase_scores[exam_id]
+                    for exam_id, score in scores.items()
+                    if exam_id in phrase_scores
+                }
+        return scores or {}
+
+
+class PythonSearchBackend(BaseSearchBackend):
+    """
+    Keeps an in-memory inverted index of ExamText, for databases without FTS5.
+    The index is rebuilt whenever the stored texts change.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._index: _InvertedIndex | None = None
+        self._version: tuple | None = None
+
+    def _get_index(self) -> _InvertedIndex:
+        version: tuple = tuple(
+            ExamText.objects.aggregate(Count("pk"), Max("updated_at")).values()
+        )
+        with self._lock:
+            if self._index is None or version != self._version:
+                self._index = _InvertedIndex(ExamText.objects.all())
+                self._version = version
+            return self._index
+
+    def search(
+        self, query: str, exams: QuerySet | None = None, limit: int = 20
+    ) -> list[SearchHit]:
+        phrases: list[tuple[str, ...]] = parse_query(query)
+        if not phrases:
+            return []
+
+        allowed: set[int] | None = None
+        if exams is not None:
+            allowed = set(exams.values_list("pk", flat=True))
+        scores: dict[int, float] = self._get_index().search(phrases, allowed)
+        ranked: list[tuple[int, float]] = sorted(
+            scores.items(), key=lambda item: (-item[1], item[0])
+        )[:limit]
+
+        texts: dict[int, str] = dict(
+            ExamText.objects.filter(
+                pk__in=[exam_id for exam_id, _ in ranked]
+            ).values_list("exam_id", "text")
+        )
+        query_tokens: set[str] = {token for phrase in phrases for token in phrase}
+        return [
+            SearchHit(
+                exam_id=exam_id,
+                score=score,
+                snippet=render_snippet(_snippet(texts.get(exam_id, ""), query_tokens)),
+            )
+            for exam_id, score in ranked
+        ]
+
+
+def _snippet(text: str, query_tokens: set[str]) -> str:
+    """Cuts a window of SNIPPET_TOKENS tokens around the first matching token."""
+    spans: list[tuple[str, int, int]] = list(iter_tokens(text))
+    first_match: int = next(
+        (i for i, (token, _, _) in enumerate(spans) if token in query_tokens), 0
+    )
+    start: int = max(0, min(first_match - 2, len(spans) - SNIPPET_TOKENS))
+    window: list[tuple[str, int, int]] = spans[start : start + SNIPPET_TOKENS]
+    if not window:
+        return ""
+
+    parts: list[str] = [SNIPPET_ELLIPSIS] if start > 0 else []
+    position: int = window[0][1]
+    for token, token_start, token_end in window:
+        parts.append(text[position:token_start])
+        if token in query_tokens:
+            parts += [HIGHLIGHT_START, text[token_start:token_end], HIGHLIGHT_END]
+        else:
+            parts.append(text[token_start:token_end])
+        position = token_end
+    if start + SNIPPET_TOKENS < len(spans):
+        parts.append(SNIPPET_ELLIPSIS)
+    return "".join(parts)
+
+
+def fts5_available() -> bool:
+    return connection.vendor == "sqlite" and (
+        FTS5_TABLE in connection.introspection.table_names()
+    )
+
+
+SEARCH_BACKENDS: dict[str, type[BaseSearchBackend]] = {
+    "fts5": Fts5SearchBackend,
+    "python": PythonSearchBackend,
+}
+
+
+@functools.cache
+def get_search_backend() -> BaseSearchBackend:
+    """Returns the search backend configured in settings.EXAM_SEARCH_BACKEND."""
+    backend_name: str = settings.EXAM_SEARCH_BACKEND
+    if backend_name == "auto":
+        backend_name = "fts5" if fts5_available() else "python"
+
+    backend_class: type[BaseSearchBackend] = SEARCH_BACKENDS.get(backend_name) or (
+        import_string(backend_name)
+    )
+    return backend_class()
@@ -0,0 +1,47 @@
+import logging
+from typing import BinaryIO
+
+from django.conf import settings
+from django.db.models.fields.files import FieldFile
+
+from core.handlers import run_stream_handler
+from core.registry import FileFormat, get_file_format_by_mime_type
+from core.utils import extract_file_mime_type
+
+logger = logging.getLogger(__name__)
+
+
+def extract_text(file: FieldFile) -> str:
+    """
+    Extracts the plain text of an exam file for the search index.
+    Returns an empty string for file formats without a text extractor.
+    """
+    with file.open("rb") as stream:
+        file_mime_type: str = extract_file_mime_type(file)
+        file_format: FileFormat | None = get_file_format_by_mime_type(file_mime_type)
+        if file_format is None or file_format.text_extractor is None:
+            logger.info(f"No text extractor for file type '{file_mime_type}'.")
+            return ""
+        text: str = run_stream_handler(file_format, file_format.text_extractor, stream)
+
+    return text[: settings.EXAM_SEARCH_MAX_TEXT_LENGTH]
+
+
+def extract_pdf_text(stream: BinaryIO) -> str:
+    # Imported on first use, so that processes not handling files skip them
+    from pypdf import PdfReader
+
+    reader = PdfReader(stream)
+    # Scanned pages without a text layer yield empty strings
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def extract_docx_text(stream: BinaryIO) -> str:
+    from docx import Document
+
+    document = Document(stream)
+    parts: list[str] = [paragraph.text for paragraph in document.paragraphs]
+    for table in document.tables:
+        for row in table.rows:
+            parts.extend(cell.text for cell in row.cells)
+    return "\n".join(part for part in parts if part)
@@ -0,0 +1,21 @@
+from django.db.models import F, OuterRef, Q, QuerySet, Subquery
+
+from core.models import Exam, ExamText
+from core.search.extraction import extract_text
+
+
+def index_exam(exam: Exam) -> ExamText:
+    """Extracts the text of the exam file and stores it in the search index."""
+    text: str = extract_text(exam.file)
+    exam_text, _ = ExamText.objects.update_or_create(
+        exam=exam, defaults={"text": text, "content_hash": exam.content_hash}
+    )
+    return exam_text
+
+
+def exams_needing_index(exams: QuerySet) -> QuerySet:
+    """Exams that have no indexed text, or whose file changed since it was indexed."""
+    indexed_hash = ExamText.objects.filter(exam=OuterRef("pk")).values("content_hash")
+    return exams.annotate(indexed_hash=Subquery(indexed_hash)).filter(
+        Q(indexed_hash__isnull=True) | ~Q(indexed_hash=F("content_hash"))
+    )
@@ -0,0 +1,46 @@
+import html
+import re
+import unicodedata
+from collections.abc import Iterator
+
+# Letters and digits, matching the token characters of SQLite's unicode61 tokenizer
+_TOKEN_PATTERN = re.compile(r"[^\W_]+")
+HIGHLIGHT_START: str = "\x02"
+HIGHLIGHT_END: str = "\x03"
+SNIPPET_ELLIPSIS: str = "…"
+SNIPPET_TOKENS: int = 12
+
+
+def normalize(token: str) -> str:
+    """Case-folds a token and strips diacritics, e.g. 'Élasticité' -> 'elasticite'."""
+    decomposed: str = unicodedata.normalize("NFKD", token.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def iter_tokens(text: str) -> Iterator[tuple[str, int, int]]:
+    """Yields each normalized token with its start and end offset in the text."""
+    for match in _TOKEN_PATTERN.finditer(text):
+        yield normalize(match.group()), match.start(), match.end()
+
+
+def parse_query(query: str) -> list[tuple[str, ...]]:
+    """
+    Splits a search query into phrases that must all occur in a matching document.
+    Words joined by punctuation form a phrase, so 'IS-LM model' searches for the
+    phrase 'is lm' and the word 'model'.
+    """
+    phrases: list[tuple[str, ...]] = []
+    for word in query.split():
+        tokens: tuple[str, ...] = tuple(token for token, _, _ in iter_tokens(word))
+        if tokens and tokens not in phrases:
+            phrases.append(tokens)
+    return phrases
+
+
+def render_snippet(snippet: str) -> str:
+    """HTML-escapes a snippet and turns its highlight markers into <mark> elements."""
+    return (
+        html.escape(snippet)
+        .replace(HIGHLIGHT_START, "<mark>")
+        .replace(HIGHLIGHT_END, "</mark>")
+    )
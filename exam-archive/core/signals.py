@@ -1,10 +1,83 @@
-from django.db.models.signals import post_delete
+from datetime import timedelta
+from functools import partial
+
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
+from django.utils import timezone
+
+from core.artifacts import delete_artifacts
+from core.cache import bump_listing_generation
+from core.jobs import copy_derived_data, enqueue_metadata_job
+from core.metrics import instrument_query
+from core.models import (
+    Course,
+    DegreeType,
+    Exam,
+    ExamArtifacts,
+    ExamText,
+    FieldOfStudy,
+)
+from core.registry import build_registry
+
+# Uploads store a blob before their exam is committed, so a blob stored this recently
+# may be about to be referenced by a new exam with the same content
+RECENTLY_STORED_FILE_AGE: timedelta = timedelta(minutes=5)
+
+
+@receiver(post_save, sender=Exam)
+def enqueue_exam_metadata_job_on_save(sender, instance: Exam, raw=False, **kwargs):
+    if not raw and instance.metadata_status == Exam.MetadataStatus.PENDING:
+        transaction.on_commit(partial(enqueue_metadata_job, instance.pk))
+
 
-from core.models import Exam
+@receiver(post_save, sender=Exam)
+def copy_derived_data_of_duplicate_on_save(sender, instance: Exam, raw=False, **kwargs):
+    # Set by Exam.save() for uploads identical to an already processed file
+    duplicate: Exam | None = instance.__dict__.pop("_processed_duplicate", None)
+    if not raw and duplicate is not None:
+        copy_derived_data(duplicate, instance)
 
 
 @receiver(post_delete, sender=Exam)
 def auto_delete_exam_file_on_delete(sender, instance: Exam, **kwargs):
+    # Content-addressed storage shares one file between exams with identical content.
+    # Recently stored files are left to `manage.py fsck_exams`
     if instance.file:
-        instance.file.delete(save=False)
+        Exam.delete_file_if_unreferenced(
+            instance.file.storage,
+            instance.file.name,
+            unmodified_since=timezone.now() - RECENTLY_STORED_FILE_AGE,
+        )
+    delete_artifacts(instance.content_hash)
+
+
+@receiver([post_save, post_delete], sender=Exam)
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=FieldOfStudy)
+@receiver([post_save, post_delete], sender=DegreeType)
+@receiver([post_save, post_delete], sender=ExamText)
+@receiver([post_save, post_delete], sender=ExamArtifacts)
+@receiver(m2m_changed, sender=Course.fields_of_study.through)
+def invalidate_listing_cache_on_change(sender, raw=False, **kwargs):
+    # Bumping before the commit would let a concurrent request cache the old data
+    # under the new generation
+    if not raw and kwargs.get("action", "post_").startswith("post_"):
+        transaction.on_commit(bump_listing_generation)
+
+
+@receiver(setting_changed)
+def rebuild_registry_on_setting_changed(sender, setting: str, **kwargs):
+    if setting in ("TERMS", "EXAM_FILE_FORMATS"):
+        build_registry()
+        bump_listing_generation()
+
+
+@receiver(connection_created)
+def instrument_queries_on_connection_created(sender, connection, **kwargs):
+    # Connections are per thread, so the wrapper is installed on each of them rather
+    # than around a request; reconnects reuse the wrapper list
+    if instrument_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(instrument_query)
@@ -0,0 +1,107 @@
+import hashlib
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, Storage, storages
+
+_BLOB_NAME_PATTERN = re.compile(r"(?:^|/)([0-9a-f]{2})/\1[0-9a-f]{62}(\.\w+)?$")
+
+
+def select_exam_storage() -> Storage:
+    """Storage of exam files, configured as STORAGES["exams"]."""
+    return storages["exams"]
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores every file under the SHA-256 of its content, e.g. 'exams/ab/ab12….pdf',
+    so identical files are kept once and shared by all exams referencing them.
+
+    Stored files must be treated as immutable: changed content is saved as a new
+    file instead. A file is only to be deleted once no exam references it anymore,
+    see Exam.delete_file_if_unreferenced().
+    """
+
+    content_addressed: bool = True
+
+    def get_available_name(self, name: str, max_length: int | None = None) -> str:
+        # The final name is only known once the content was hashed in _save()
+        return name
+
+    def _save(self, name: str, content: File) -> str:
+        directory: str = posixpath.dirname(name)
+        os.makedirs(self.path(directory), exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=self.path(directory), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+            blob_name: str = self.blob_name(name, digest.hexdigest())
+            self._store_blob(temp_path, blob_name)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return blob_name
+
+    def _store_blob(self, source_path: str, blob_name: str) -> None:
+        blob_path: str = self.path(blob_name)
+        if self._touch(blob_path):
+            return
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        os.replace(source_path, blob_path)
+        if self.file_permissions_mode is not None:
+            os.chmod(blob_path, self.file_permissions_mode)
+
+    @staticmethod
+    def _touch(blob_path: str) -> bool:
+        """
+        Marks an existing blob as just stored, so that `manage.py fsck_exams` does
+        not take a reused blob for an old orphan. Returns whether the blob exists.
+        """
+        try:
+            os.utime(blob_path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    @staticmethod
+    def blob_name(name: str, content_hash: str) -> str:
+        """Name of the blob for content that is saved under the given name."""
+        extension: str = os.path.splitext(name)[1].lower()
+        return posixpath.join(
+            posixpath.dirname(name), content_hash[:2], f"{content_hash}{extension}"
+        )
+
+    @staticmethod
+    def is_blob_name(name: str) -> bool:
+        return _BLOB_NAME_PATTERN.search(name) is not None
+
+    def adopt(self, name: str, content_hash: str) -> tuple[str, bool]:
+        """
+        Makes the content of a file stored under a legacy name available as a blob,
+        next to the legacy file. Returns the blob name and whether the blob existed
+        already. Deleting the legacy file is left to the caller.
+        """
+        blob_name: str = self.blob_name(name, content_hash)
+        if self._touch(self.path(blob_name)):
+            return blob_name, True
+
+        # A hard link avoids copying the data; the legacy file is removed afterwards
+        temp_path: str = f"{self.path(name)}.part"
+        try:
+            os.link(self.path(name), temp_path)
+        except OSError:
+            shutil.copy2(self.path(name), temp_path)
+        try:
+            self._store_blob(temp_path, blob_name)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return blob_name, False
@@ -1,3 +1,2109 @@
-from django.test import TestCase
+import base64
+import csv
+import hashlib
+import io
+import json
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.db.models.fields.files import FieldFile
+from django.http import HttpResponse, HttpResponseBase
+from django.test import (
+    AsyncClient,
+    Client,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from docx import Document
+from lxml import etree
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject
+
+import core.utils
+from core import artifacts
+from core.artifacts import THUMBNAIL_CONTENT_TYPE, build_artifacts, thumbnail_name
+from core.cache import (
+    LISTING_GENERATION_CACHE_KEY,
+    bump_listing_generation,
+    get_listing_generation,
+)
+from core.handlers import _get_executor
+from core.jobs import (
+    enqueue_metadata_job,
+    reclaim_stale_metadata_jobs,
+    run_metadata_job,
+)
+from core.jobs import metadata_jobs
+from core.jobs.backends import get_backend
+from core.management.commands import import_exams, rebuild_search_index
+from core.metrics import (
+    FILE_INGESTION_SECONDS,
+    REQUEST_DB_QUERIES,
+    Counter,
+    Histogram,
+)
+from core.models import (
+    Course,
+    DegreeType,
+    Exam,
+    ExamArtifacts,
+    ExamText,
+    ExamUpload,
+    FieldOfStudy,
+    ListingGeneration,
+    MetadataJob,
+    docx_metadata,
+    pdf_metadata,
+)
+from core.forms import ExamUploadForm
+from core.models.metadata_service import (
+    FileOptimization,
+    modify_file_metadata,
+    optimize_pdf,
+    process_docx,
+    process_pdf,
+)
+from core.registry import UNKNOWN_TERM, get_file_format
+from core.search import BaseSearchBackend, SearchHit, get_search_backend
+from core.search.backends import (
+    FTS5_TABLE,
+    Fts5SearchBackend,
+    PythonSearchBackend,
+)
+from core.uploads import _hashers, purge_expired_uploads, upload_path
+from core.utils import (
+    FileIngestion,
+    compute_file_hash,
+    extract_file_mime_type,
+    ingest_file,
+)
+from examarchive.settings import _parse_database_options
+
+
+def make_pdf(pages: int = 1, author: str = "") -> bytes:
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=200)
+    if author:
+        writer.add_metadata({"/Author": author})
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+class TemporaryMediaMixin:
+    """Stores the files written by a test in a temporary MEDIA_ROOT."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.media_root: str = directory.name
+        media_settings = override_settings(MEDIA_ROOT=directory.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+
+class AdminChangelistQueryTests(TestCase):
+    """The changelists must not issue a query per row."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser(
+            "admin", "admin@example.com", "password"
+        )
+        cls.degree = DegreeType.objects.create(name="Bachelor")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def add_rows(self, count: int) -> None:
+        offset: int = Course.objects.count()
+        courses: list[Course] = Course.objects.bulk_create(
+            [Course(title=f"Course {offset + i}") for i in range(count)]
+        )
+        # Rows are created without files, so nothing is written to storage
+        Exam.objects.bulk_create(
+            [
+                Exam(
+                    file=f"exams/{course.title}.pdf",
+                    year=2020,
+                    term="WS",
+                    course=course,
+                )
+                for course in courses
+            ]
+        )
+        FieldOfStudy.objects.bulk_create(
+            [
+                FieldOfStudy(
+                    name=f"Field {offset + i}",
+                    abbreviation=f"F{offset + i}",
+                    degree=self.degree,
+                )
+                for i in range(count)
+            ]
+        )
+
+    def assertConstantQueries(self, url: str) -> None:
+        self.add_rows(2)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.add_rows(20)
+        with self.assertNumQueries(len(queries)):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_course_changelist(self):
+        self.assertConstantQueries(reverse("admin:core_course_changelist"))
+
+    def test_course_changelist_sorted_by_exam_count(self):
+        self.assertConstantQueries(reverse("admin:core_course_changelist") + "?o=2")
+
+    def test_exam_changelist(self):
+        self.assertConstantQueries(reverse("admin:core_exam_changelist"))
+
+    def test_field_of_study_changelist(self):
+        self.assertConstantQueries(reverse("admin:core_fieldofstudy_changelist"))
+
+
+class ImportTimeTests(SimpleTestCase):
+    """Management commands and web workers must not load the file parsers."""
+
+    # Imported on first use by the file handlers
+    LAZY_MODULES: tuple[str, ...] = ("docx", "lxml", "magic", "PIL", "pypdf")
+    # Generous, to catch new heavy dependencies rather than slow machines
+    IMPORT_BUDGET_SECONDS: float = 1.5
+
+    def import_times(self) -> dict[str, int]:
+        """Self import time in microseconds of each module loaded by django.setup()."""
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import django; django.setup()"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        times: dict[str, int] = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_time, _, module = line.removeprefix("import time:").split("|")
+            times[module.strip()] = int(self_time)
+        return times
+
+    def test_file_parsers_are_imported_lazily(self):
+        modules: list[str] = [
+            module
+            for module in self.import_times()
+            if module.split(".")[0] in self.LAZY_MODULES
+        ]
+        self.assertEqual(modules, [])
+
+    def test_import_budget(self):
+        seconds: float = sum(self.import_times().values()) / 1_000_000
+        self.assertLess(seconds, self.IMPORT_BUDGET_SECONDS)
+
+
+class FileHandlerExecutionTests(SimpleTestCase):
+    def test_worker_processes_run_handlers_inline(self):
+        self.assertIsNone(_get_executor("inline"))
+        with mock.patch("core.workers._is_worker_process", True):
+            for execution in ("inline", "thread", "process"):
+                self.assertIsNone(_get_executor(execution))
+
+
+@override_settings(EXAM_METADATA_JOB_BACKEND="thread")
+class ImportExamsTests(TemporaryMediaMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        get_backend.cache_clear()
+        self.addCleanup(get_backend.cache_clear)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory: str = directory.name
+
+    def write_file(self, path: str, content: bytes) -> None:
+        full_path: str = os.path.join(self.directory, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as file:
+            file.write(content)
+
+    def test_jobs_of_imported_exams_finish_before_the_command_exits(self):
+        self.write_file("Economics/2020-WS.pdf", make_pdf())
+        call_command(
+            "import_exams",
+            self.directory,
+            pattern=r"(?P<course>[^/]+)/(?P<year>\d{4})-(?P<term>\w\w)\.pdf",
+            create_courses=True,
+            workers=1,
+            stdout=io.StringIO(),
+        )
+        exam: Exam = Exam.objects.get()
+        self.assertEqual(exam.metadata_status, Exam.MetadataStatus.DONE)
+        self.assertEqual(exam.metadata_author, settings.EXAM_METADATA_AUTHOR)
+
+    def test_jobs_of_the_thread_backend_use_the_process_pool(self):
+        self.write_file("Economics/2020-WS.pdf", make_pdf())
+        executors: list[Executor | None] = []
+
+        def get_executor(execution: str) -> Executor | None:
+            executors.append(_get_executor(execution))
+            return executors[-1]
+
+        with mock.patch("core.handlers._get_executor", get_executor):
+            call_command(
+                "import_exams",
+                self.directory,
+                pattern=r"(?P<course>[^/]+)/(?P<year>\d{4})-(?P<term>\w\w)\.pdf",
+                create_courses=True,
+                workers=1,
+                stdout=io.StringIO(),
+            )
+
+        self.assertEqual(Exam.objects.get().metadata_status, Exam.MetadataStatus.DONE)
+        # The PDF handlers are declared with "execution": "process"
+        self.assertTrue(executors)
+        for executor in executors:
+            self.assertIsInstance(executor, ProcessPoolExecutor)
+
+    def test_unexpected_errors_are_reported_per_file(self):
+        self.write_file("Economics/2020-WS.pdf", make_pdf())
+        self.write_file("Economics/2021-SS.pdf", make_pdf(pages=2))
+
+        validate = import_exams.validate_candidate
+
+        def validate_candidate(path: str, year: str, term: str) -> str:
+            if year == "2021":
+                raise RuntimeError("The parser crashed.")
+            return validate(path, year, term)
+
+        report: str = os.path.join(self.directory, "report.csv")
+        # Threads instead of processes, which would not see the patched function
+        with (
+            mock.patch.object(import_exams, "create_process_pool", ThreadPoolExecutor),
+            mock.patch.object(import_exams, "validate_candidate", validate_candidate),
+        ):
+            call_command(
+                "import_exams",
+                self.directory,
+                pattern=r"(?P<course>[^/]+)/(?P<year>\d{4})-(?P<term>\w\w)\.pdf",
+                create_courses=True,
+                workers=1,
+                report=report,
+                stdout=io.StringIO(),
+                stderr=io.StringIO(),
+            )
+
+        self.assertEqual(Exam.objects.get().year, 2020)
+        with open(report, newline="", encoding="utf-8") as file:
+            rows: dict[str, dict] = {
+                os.path.basename(row["path"]): row for row in csv.DictReader(file)
+            }
+        self.assertEqual(rows["2020-WS.pdf"]["status"], "imported")
+        self.assertEqual(rows["2021-SS.pdf"]["status"], "error")
+        self.assertIn("The parser crashed.", rows["2021-SS.pdf"]["message"])
+
+
+class ApiPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.courses: list[Course] = Course.objects.bulk_create(
+            [Course(title=f"Course {i}") for i in range(5)]
+        )
+        Exam.objects.bulk_create(
+            [
+                Exam(
+                    file=f"exams/{i}.pdf",
+                    year=2015 + i % 3,
+                    term="WS",
+                    course=cls.courses[0],
+                    metadata_status=Exam.MetadataStatus.DONE,
+                )
+                for i in range(7)
+            ]
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def collect_pages(self, url: str) -> list[int]:
+        ids: list[int] = []
+        cursor: str | None = None
+        while True:
+            params: dict = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids += [result["id"] for result in response.json()["results"]]
+            cursor = response.json()["next_cursor"]
+            if cursor is None:
+                return ids
+
+    def test_exam_pages(self):
+        expected: list[int] = list(
+            Exam.objects.order_by("-year", "-id").values_list("pk", flat=True)
+        )
+        self.assertEqual(self.collect_pages(reverse("core:exam-list")), expected)
+
+    def test_course_pages(self):
+        expected: list[int] = [course.pk for course in self.courses]
+        self.assertEqual(self.collect_pages(reverse("core:course-list")), expected)
+
+    def test_tampered_cursors(self):
+        cursors: list = [
+            ["x", "y"],
+            [None, None],
+            [{"a": 1}, {"b": 2}],
+            [[1], [2]],
+            [1],
+            {"year": 2020},
+        ]
+        for url in (reverse("core:exam-list"), reverse("core:course-list")):
+            for values in cursors:
+                cursor: str = base64.urlsafe_b64encode(
+                    json.dumps(values).encode()
+                ).decode()
+                with self.subTest(url=url, cursor=values):
+                    response = self.client.get(url, {"cursor": cursor})
+                    self.assertEqual(response.status_code, 400)
+            with self.subTest(url=url, cursor="not base64"):
+                self.assertEqual(
+                    self.client.get(url, {"cursor": "%%%"}).status_code, 400
+                )
+
+
+class ReadableTermTests(TestCase):
+    def test_database_annotation_matches_the_property(self):
+        expected: dict[tuple[str, int], str] = {
+            ("SS", 2023): "SS-2023",
+            ("WS", 2023): "WS-2023/24",
+            ("WS", 1999): "WS-1999/00",
+            ("WS", 2009): "WS-2009/10",
+            ("XX", 2023): UNKNOWN_TERM,
+        }
+        course: Course = Course.objects.create(title="Course")
+        Exam.objects.bulk_create(
+            Exam(file=f"exams/{term}-{year}.pdf", term=term, year=year, course=course)
+            for term, year in expected
+        )
+
+        exams: list[Exam] = list(Exam.objects.with_readable_term())
+        self.assertEqual(len(exams), len(expected))
+        for exam in exams:
+            with self.subTest(term=exam.term, year=exam.year):
+                self.assertEqual(exam.term_label, expected[exam.term, exam.year])
+                self.assertEqual(
+                    Exam(term=exam.term, year=exam.year).readable_term,
+                    exam.term_label,
+                )
+
+
+class ListingCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_from_another_process_invalidates_cached_listing(self):
+        url: str = reverse("core:course-list")
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+
+        # Other processes share the database, but not this process' memory cache,
+        # which sees their bump once its cached generation expired
+        ListingGeneration.objects.update(value=F("value") + 1)
+        self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+        cache.delete(LISTING_GENERATION_CACHE_KEY)
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+
+    def test_cache_hits_need_no_queries(self):
+        url: str = reverse("core:course-list")
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+
+        bump_listing_generation()
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+
+    def test_model_changes_invalidate_cached_listing(self):
+        url: str = reverse("core:course-list")
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.create(title="Statistics")
+
+        response = self.client.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(
+            [course["title"] for course in response.json()["results"]], ["Statistics"]
+        )
+
+
+class SeedArchiveTests(TemporaryMediaMixin, TestCase):
+    def test_seed_archive(self):
+        call_command(
+            "seed_archive",
+            degrees=2,
+            fields_per_degree=3,
+            courses=4,
+            exams=12,
+            batch_size=5,
+            docx_ratio=0.5,
+            stdout=io.StringIO(),
+        )
+        self.assertEqual(DegreeType.objects.count(), 2)
+        self.assertEqual(FieldOfStudy.objects.count(), 6)
+        self.assertEqual(Course.objects.count(), 4)
+        self.assertEqual(Exam.objects.published().count(), 12)
+        self.assertEqual(ExamText.objects.count(), 12)
+
+        extensions: set[str] = set()
+        for exam in Exam.objects.all():
+            extension: str = os.path.splitext(exam.file.name)[1]
+            extensions.add(extension)
+            with exam.file.open("rb"):
+                self.assertEqual(
+                    extract_file_mime_type(exam.file),
+                    get_file_format(extension).mime_type,
+                )
+                self.assertEqual(compute_file_hash(exam.file), exam.content_hash)
+            self.assertEqual(exam.file.size, exam.file_size)
+            with exam.file.open("rb") as file:
+                if extension == ".pdf":
+                    reader = PdfReader(file, strict=True)
+                    author: str = reader.metadata.author
+                    text: str = reader.pages[0].extract_text()
+                else:
+                    document = Document(file)
+                    author = document.core_properties.author
+                    text = "\n".join(p.text for p in document.paragraphs)
+            self.assertEqual(author, settings.EXAM_METADATA_AUTHOR)
+            self.assertIn(exam.text.text.splitlines()[0], text)
+        self.assertEqual(extensions, {".pdf", ".docx"})
+
+
+@override_settings(
+    EXAM_METADATA_JOB_BACKEND="database",
+    EXAM_METADATA_JOB_MAX_ATTEMPTS=3,
+    EXAM_METADATA_JOB_RETRY_DELAY=5,
+    EXAM_METADATA_JOB_TIMEOUT=600,
+)
+class MetadataJobTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Created without signals, so no job is queued yet
+        cls.exam: Exam = Exam.objects.bulk_create(
+            [
+                Exam(
+                    file="exams/exam.pdf",
+                    year=2020,
+                    term="WS",
+                    course=Course.objects.create(title="Course"),
+                )
+            ]
+        )[0]
+
+    def setUp(self):
+        super().setUp()
+        get_backend.cache_clear()
+        self.addCleanup(get_backend.cache_clear)
+
+    def test_pending_jobs_are_not_queued_twice(self):
+        job: MetadataJob = enqueue_metadata_job(self.exam.pk)
+        self.assertIsNone(enqueue_metadata_job(self.exam.pk))
+        self.assertEqual(list(MetadataJob.objects.all()), [job])
+
+        MetadataJob.objects.filter(pk=job.pk).update(status=MetadataJob.Status.DONE)
+        self.assertIsNotNone(enqueue_metadata_job(self.exam.pk))
+
+    def test_failing_job_backs_off_and_fails(self):
+        # The exam file was never stored, so every attempt fails
+        job: MetadataJob = enqueue_metadata_job(self.exam.pk)
+        for attempt, delay in ((1, 5), (2, 10)):
+            before = timezone.now()
+            job = run_metadata_job(job.pk)
+            self.assertEqual(job.status, MetadataJob.Status.PENDING)
+            self.assertEqual(job.attempts, attempt)
+            self.assertIn("No such file", job.last_error)
+            self.assertGreaterEqual(job.run_after, before + timedelta(seconds=delay))
+            self.assertLess(job.run_after, before + timedelta(seconds=delay + 5))
+
+        job = run_metadata_job(job.pk)
+        self.assertEqual(job.status, MetadataJob.Status.FAILED)
+        self.assertEqual(job.attempts, 3)
+        self.exam.refresh_from_db()
+        self.assertEqual(self.exam.metadata_status, Exam.MetadataStatus.FAILED)
+        # Finished jobs are not claimed again
+        self.assertIsNone(run_metadata_job(job.pk))
+
+    def create_running_job(self, attempts: int, seconds_ago: int) -> MetadataJob:
+        job: MetadataJob = MetadataJob.objects.create(
+            exam=self.exam, status=MetadataJob.Status.RUNNING, attempts=attempts
+        )
+        MetadataJob.objects.filter(pk=job.pk).update(
+            updated_at=timezone.now() - timedelta(seconds=seconds_ago)
+        )
+        return job
+
+    def test_stale_running_jobs_are_requeued(self):
+        stale: MetadataJob = self.create_running_job(attempts=1, seconds_ago=601)
+        running: MetadataJob = self.create_running_job(attempts=1, seconds_ago=60)
+
+        self.assertEqual(reclaim_stale_metadata_jobs(), 1)
+        stale.refresh_from_db()
+        running.refresh_from_db()
+        self.assertEqual(stale.status, MetadataJob.Status.PENDING)
+        self.assertEqual(running.status, MetadataJob.Status.RUNNING)
+        self.assertEqual(reclaim_stale_metadata_jobs(), 0)
+
+    def test_stale_running_jobs_out_of_attempts_fail(self):
+        job: MetadataJob = self.create_running_job(attempts=3, seconds_ago=601)
+
+        self.assertEqual(reclaim_stale_metadata_jobs(), 1)
+        job.refresh_from_db()
+        self.exam.refresh_from_db()
+        self.assertEqual(job.status, MetadataJob.Status.FAILED)
+        self.assertEqual(self.exam.metadata_status, Exam.MetadataStatus.FAILED)
+
+
+def store_exam(content: bytes, name: str = "exam.pdf", **fields) -> Exam:
+    """An exam whose file is stored as is, bypassing validation and jobs."""
+    file_field = Exam._meta.get_field("file")
+    stored_name: str = file_field.storage.save(
+        file_field.generate_filename(None, name), ContentFile(content)
+    )
+    return Exam.objects.bulk_create(
+        [
+            Exam(
+                file=stored_name,
+                year=2020,
+                term="WS",
+                course=Course.objects.get_or_create(title="Course")[0],
+                content_hash=hashlib.sha256(content).hexdigest(),
+                file_size=len(content),
+                metadata_status=Exam.MetadataStatus.DONE,
+                **fields,
+            )
+        ]
+    )[0]
+
+
+@override_settings(EXAM_METADATA_JOB_BACKEND="database")
+class MetadataOutdatedTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        get_backend.cache_clear()
+        self.addCleanup(get_backend.cache_clear)
+        self.content: bytes = make_pdf()
+        self.exam: Exam = Exam.objects.get(
+            pk=store_exam(
+                self.content, metadata_author=settings.EXAM_METADATA_AUTHOR
+            ).pk
+        )
+
+    def save(self, exam: Exam) -> Exam:
+        with self.captureOnCommitCallbacks(execute=True):
+            exam.save()
+        return Exam.objects.get(pk=exam.pk)
+
+    def test_field_edits_keep_the_processed_file(self):
+        for field, value in (("year", 2021), ("term", "SS")):
+            setattr(self.exam, field, value)
+            self.assertFalse(self.exam.metadata_outdated, field)
+            self.exam = self.save(self.exam)
+            self.assertEqual(getattr(self.exam, field), value)
+            self.assertEqual(self.exam.metadata_status, Exam.MetadataStatus.DONE)
+        self.assertFalse(MetadataJob.objects.exists())
+
+    def test_new_file_is_processed(self):
+        self.exam.file = ContentFile(make_pdf(pages=2), name="new.pdf")
+        exam: Exam = self.save(self.exam)
+        self.assertEqual(exam.metadata_status, Exam.MetadataStatus.PENDING)
+        self.assertNotEqual(exam.content_hash, hashlib.sha256(self.content).hexdigest())
+        self.assertTrue(MetadataJob.objects.filter(exam=exam).exists())
+
+    def test_changed_author_is_processed(self):
+        with override_settings(EXAM_METADATA_AUTHOR="Someone else"):
+            self.assertTrue(self.exam.metadata_outdated)
+            exam: Exam = self.save(self.exam)
+        self.assertEqual(exam.metadata_status, Exam.MetadataStatus.PENDING)
+        self.assertTrue(MetadataJob.objects.filter(exam=exam).exists())
+
+    def test_backfill_marks_processed_exams_without_rewriting_them(self):
+        pending: Exam = store_exam(make_pdf(pages=2), name="pending.pdf")
+        Exam.objects.filter(pk=pending.pk).update(
+            metadata_status=Exam.MetadataStatus.PENDING
+        )
+        Exam.objects.update(content_hash="", metadata_author="")
+        path: str = self.exam.file.path
+        modified: float = os.path.getmtime(path)
+
+        stdout = io.StringIO()
+        call_command("backfill_exam_hashes", "--mark-processed", stdout=stdout)
+        self.assertIn("Backfilled 2 exam hash(es).", stdout.getvalue())
+
+        exam: Exam = Exam.objects.get(pk=self.exam.pk)
+        self.assertEqual(exam.content_hash, hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(exam.metadata_author, settings.EXAM_METADATA_AUTHOR)
+        self.assertFalse(exam.metadata_outdated)
+        self.assertEqual(Exam.objects.get(pk=pending.pk).metadata_author, "")
+        with open(path, "rb") as file:
+            self.assertEqual(file.read(), self.content)
+        self.assertEqual(os.path.getmtime(path), modified)
+
+        # Saving the backfilled exam does not rewrite it either
+        exam.year = 2021
+        self.assertEqual(self.save(exam).metadata_status, Exam.MetadataStatus.DONE)
+        self.assertFalse(MetadataJob.objects.exists())
+
+
+def age_file(path: str, seconds: int = 7200) -> None:
+    modified: float = timezone.now().timestamp() - seconds
+    os.utime(path, (modified, modified))
+
+
+@override_settings(EXAM_METADATA_JOB_BACKEND="database")
+class FsckExamsTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        get_backend.cache_clear()
+        self.addCleanup(get_backend.cache_clear)
+        self.storage = Exam._meta.get_field("file").storage
+
+    def fsck(self, *args: str) -> dict[str, list[dict]]:
+        """Runs the command and returns the reported problems by kind."""
+        report: str = os.path.join(self.media_root, "report.csv")
+        call_command(
+            "fsck_exams",
+            *args,
+            report=report,
+            stdout=io.StringIO(),
+            stderr=io.StringIO(),
+        )
+        problems: dict[str, list[dict]] = {}
+        with open(report, newline="", encoding="utf-8") as file:
+            for row in csv.DictReader(file):
+                problems.setdefault(row["kind"], []).append(row)
+        return problems
+
+    def test_consistent_archive(self):
+        store_exam(make_pdf())
+        self.assertEqual(self.fsck("--repair"), {})
+
+    def test_missing_file(self):
+        exam: Exam = store_exam(make_pdf())
+        self.storage.delete(exam.file.name)
+
+        problems = self.fsck("--repair")
+        self.assertEqual(list(problems), ["missing"])
+        self.assertEqual(problems["missing"][0]["exam"], str(exam.pk))
+
+    def test_invalid_file(self):
+        exam: Exam = store_exam(b"Just some text, not a PDF.")
+        self.assertEqual(list(self.fsck()), ["invalid"])
+        exam.refresh_from_db()
+        self.assertEqual(exam.metadata_status, Exam.MetadataStatus.DONE)
+
+        self.assertEqual(self.fsck("--repair")["invalid"][0]["repaired"], "True")
+        exam.refresh_from_db()
+        self.assertEqual(exam.metadata_status, Exam.MetadataStatus.FAILED)
+
+    def test_changed_file(self):
+        exam: Exam = store_exam(make_pdf())
+        content: bytes = make_pdf(pages=2)
+        with open(exam.file.path, "wb") as file:
+            file.write(content)
+
+        self.assertEqual(list(self.fsck()), ["mismatch"])
+        self.assertEqual(list(self.fsck("--skip-hash")), ["mismatch"])
+        self.fsck("--repair")
+        exam.refresh_from_db()
+        self.assertEqual(exam.file_size, len(content))
+        self.assertEqual(exam.content_hash, hashlib.sha256(content).hexdigest())
+        self.assertTrue(MetadataJob.objects.filter(exam=exam).exists())
+        self.assertEqual(self.fsck(), {})
+
+    def test_orphans(self):
+        old: str = self.storage.save("exams/old.pdf", ContentFile(make_pdf()))
+        age_file(self.storage.path(old))
+        # Possibly an upload whose exam is being saved
+        self.storage.save("exams/new.pdf", ContentFile(make_pdf(pages=2)))
+
+        problems = self.fsck("--repair")
+        self.assertEqual([row["name"] for row in problems["orphan"]], [old])
+        self.assertFalse(self.storage.exists(old))
+
+    def test_orphan_reused_by_an_upload_is_kept(self):
+        content: bytes = make_pdf()
+        orphan: str = self.storage.save("exams/old.pdf", ContentFile(content))
+        age_file(self.storage.path(orphan))
+
+        # An upload of the same content reuses the blob before its exam is saved
+        self.assertEqual(
+            self.storage.save("exams/upload.pdf", ContentFile(content)), orphan
+        )
+        self.assertEqual(self.fsck("--repair"), {})
+        self.assertTrue(self.storage.exists(orphan))
+
+    def test_orphan_reused_after_the_scan_is_kept(self):
+        orphan: str = self.storage.save("exams/old.pdf", ContentFile(make_pdf()))
+        cutoff = timezone.now() - timedelta(hours=1)
+        age_file(self.storage.path(orphan))
+        os.utime(self.storage.path(orphan))
+
+        self.assertFalse(
+            Exam.delete_file_if_unreferenced(
+                self.storage, orphan, unmodified_since=cutoff
+            )
+        )
+        self.assertTrue(self.storage.exists(orphan))
+
+
+@override_settings(EXAM_METADATA_JOB_BACKEND="database")
+class ContentAddressedStorageTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.course: Course = Course.objects.create(title="Course")
+
+    def setUp(self):
+        super().setUp()
+        get_backend.cache_clear()
+        self.addCleanup(get_backend.cache_clear)
+        self.storage = Exam._meta.get_field("file").storage
+
+    def upload(self, content: bytes, name: str = "exam.pdf") -> Exam:
+        exam = Exam(
+            file=ContentFile(content, name=name),
+            year=2020,
+            term="WS",
+            course=self.course,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            exam.save()
+        return exam
+
+    def stored_files(self) -> list[str]:
+        return sorted(
+            os.path.relpath(os.path.join(directory, name), self.media_root)
+            for directory, _, names in os.walk(self.media_root)
+            for name in names
+        )
+
+    def test_identical_uploads_share_a_file(self):
+        content: bytes = make_pdf()
+        first: Exam = self.upload(content, name="first.pdf")
+        second: Exam = self.upload(content, name="second.pdf")
+
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertTrue(self.storage.is_blob_name(first.file.name))
+        self.assertEqual(self.stored_files(), [first.file.name])
+
+    def test_shared_file_is_deleted_with_the_last_exam(self):
+        content: bytes = make_pdf()
+        first: Exam = self.upload(content)
+        second: Exam = self.upload(content)
+        name: str = first.file.name
+
+        age_file(self.storage.path(name))
+        first.delete()
+        self.assertTrue(self.storage.exists(name))
+        self.assertFalse(Exam.delete_file_if_unreferenced(self.storage, name))
+        self.assertTrue(self.storage.exists(name))
+
+        second.delete()
+        self.assertFalse(self.storage.exists(name))
+
+    def test_recently_stored_file_survives_deleting_its_exam(self):
+        # It may be the blob of an upload whose exam is not saved yet
+        exam: Exam = self.upload(make_pdf())
+        exam.delete()
+        self.assertTrue(self.storage.exists(exam.file.name))
+
+    def test_upload_racing_a_rewrite_keeps_the_original(self):
+        content: bytes = make_pdf()
+        exam: Exam = self.upload(content)
+        original_name: str = exam.file.name
+        age_file(self.storage.path(original_name))
+        hash_and_size = metadata_jobs._hash_and_size
+
+        def upload_meanwhile(storage, name: str) -> tuple[str, int]:
+            # An upload with the original content stores the blob again while the
+            # job rewrites it, but the job finishes before the upload saves its exam
+            self.assertEqual(
+                self.storage.save("exams/again.pdf", ContentFile(content)),
+                original_name,
+            )
+            return hash_and_size(storage, name)
+
+        with mock.patch.object(metadata_jobs, "_hash_and_size", upload_meanwhile):
+            run_metadata_job(MetadataJob.objects.get(exam=exam).pk)
+        exam.refresh_from_db()
+        self.assertNotEqual(exam.file.name, original_name)
+        self.assertTrue(self.storage.exists(original_name))
+
+        # Rewrites without a concurrent upload still delete the original
+        rewritten: Exam = store_exam(content)
+        age_file(self.storage.path(rewritten.file.name))
+        Exam.objects.filter(pk=rewritten.pk).update(
+            metadata_status=Exam.MetadataStatus.PENDING
+        )
+        run_metadata_job(enqueue_metadata_job(rewritten.pk).pk)
+        self.assertFalse(self.storage.exists(original_name))
+
+    def test_upload_identical_to_a_processed_exam_copies_its_derived_data(self):
+        content: bytes = make_pdf()
+        processed: Exam = self.upload(content)
+        self.assertTrue(MetadataJob.objects.filter(exam=processed).exists())
+        Exam.objects.filter(pk=processed.pk).update(
+            metadata_status=Exam.MetadataStatus.DONE,
+            metadata_author=settings.EXAM_METADATA_AUTHOR,
+        )
+        ExamText.objects.create(
+            exam=processed, content_hash=processed.content_hash, text="Exam text"
+        )
+        ExamArtifacts.objects.create(
+            exam=processed,
+            content_hash=processed.content_hash,
+            file_size=processed.file_size,
+            page_count=1,
+        )
+
+        duplicate: Exam = self.upload(content)
+        self.assertEqual(duplicate.metadata_status, Exam.MetadataStatus.DONE)
+        self.assertEqual(duplicate.metadata_author, settings.EXAM_METADATA_AUTHOR)
+        self.assertFalse(MetadataJob.objects.filter(exam=duplicate).exists())
+        self.assertEqual(ExamText.objects.get(exam=duplicate).text, "Exam text")
+        self.assertEqual(ExamArtifacts.objects.get(exam=duplicate).page_count, 1)
+
+    def test_dedupe_exam_files(self):
+        duplicated: bytes = make_pdf()
+        legacy_files: dict[str, bytes] = {
+            "exams/a.pdf": duplicated,
+            "exams/b.pdf": duplicated,
+            "exams/c.pdf": make_pdf(pages=2),
+        }
+        for name, content in legacy_files.items():
+            os.makedirs(os.path.dirname(self.storage.path(name)), exist_ok=True)
+            with open(self.storage.path(name), "wb") as file:
+                file.write(content)
+        Exam.objects.bulk_create(
+            Exam(file=name, year=2020, term="WS", course=self.course)
+            for name in legacy_files
+        )
+
+        stdout = io.StringIO()
+        call_command("dedupe_exam_files", "--dry-run", stdout=stdout)
+        self.assertIn(
+            "Would move 2 file(s) and merge 1 duplicate(s)", stdout.getvalue()
+        )
+        self.assertEqual(self.stored_files(), sorted(legacy_files))
+
+        stdout = io.StringIO()
+        call_command("dedupe_exam_files", stdout=stdout)
+        self.assertIn("Moved 2 file(s) and merged 1 duplicate(s)", stdout.getvalue())
+        names: dict[str, str] = dict(Exam.objects.values_list("pk", "file"))
+        self.assertEqual(len(set(names.values())), 2)
+        self.assertEqual(self.stored_files(), sorted(set(names.values())))
+        for exam in Exam.objects.all():
+            self.assertTrue(self.storage.is_blob_name(exam.file.name))
+            with exam.file.open("rb") as file:
+                self.assertEqual(compute_file_hash(file), exam.file.name[-68:-4])
+
+
+class ExamArtifactsTests(TemporaryMediaMixin, TestCase):
+    def store_thumbnail(self, exam: Exam) -> str:
+        # Written directly, as thumbnails are only scaled with the optional Pillow
+        name: str = thumbnail_name(exam.content_hash)
+        default_storage.save(name, ContentFile(b"thumbnail"))
+        ExamArtifacts.objects.update_or_create(
+            exam=exam,
+            defaults={
+                "content_hash": exam.content_hash,
+                "file_size": exam.file_size,
+                "has_thumbnail": True,
+            },
+        )
+        return name
+
+    def test_artifacts_are_only_rebuilt_for_changed_content(self):
+        exam: Exam = store_exam(make_pdf(pages=2))
+        with mock.patch(
+            "core.artifacts.run_stream_handler", wraps=artifacts.run_stream_handler
+        ) as run_stream_handler:
+            built: ExamArtifacts = build_artifacts(exam)
+            self.assertEqual(built.page_count, 2)
+            self.assertEqual(built.file_size, exam.file_size)
+            self.assertEqual(built.content_hash, exam.content_hash)
+            self.assertEqual(run_stream_handler.call_count, 1)
+
+            self.assertEqual(build_artifacts(exam), built)
+            self.assertEqual(run_stream_handler.call_count, 1)
+
+            build_artifacts(exam, force=True)
+            self.assertEqual(run_stream_handler.call_count, 2)
+
+            # A new file replaces the artifacts, and the thumbnail of the old one
+            old_thumbnail: str = self.store_thumbnail(exam)
+            content: bytes = make_pdf(pages=3)
+            Exam.objects.filter(pk=exam.pk).update(
+                file=exam.file.storage.save("exams/new.pdf", ContentFile(content)),
+                content_hash=hashlib.sha256(content).hexdigest(),
+            )
+            exam.refresh_from_db()
+            self.assertEqual(build_artifacts(exam).page_count, 3)
+            self.assertEqual(run_stream_handler.call_count, 3)
+            self.assertFalse(default_storage.exists(old_thumbnail))
+
+    def test_shared_thumbnail_survives_deleting_a_duplicate(self):
+        content: bytes = make_pdf()
+        first: Exam = store_exam(content)
+        second: Exam = store_exam(content)
+        self.store_thumbnail(first)
+        name: str = self.store_thumbnail(second)
+
+        first.delete()
+        self.assertTrue(default_storage.exists(name))
+        response = self.client.get(reverse("core:exam-thumbnail", args=[second.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"thumbnail")
+        self.assertEqual(response["Content-Type"], THUMBNAIL_CONTENT_TYPE)
+        self.assertEqual(response["ETag"], f'"{second.content_hash}"')
+
+        second.delete()
+        self.assertFalse(default_storage.exists(name))
+
+    def test_missing_thumbnails(self):
+        exam: Exam = store_exam(make_pdf())
+        url: str = reverse("core:exam-thumbnail", args=[exam.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        ExamArtifacts.objects.create(
+            exam=exam, content_hash=exam.content_hash, file_size=exam.file_size
+        )
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        # Artifacts of a previous file are outdated
+        self.store_thumbnail(exam)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        Exam.objects.filter(pk=exam.pk).update(content_hash="changed")
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+def make_xref_stream_pdf() -> bytes:
+    """A one-page PDF 1.5 file indexed by a compressed cross-reference stream."""
+    objects: list[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 200 200] >>",
+    ]
+    output = bytearray(b"%PDF-1.5\n")
+    offsets: list[int] = []
+    for number, pdf_object in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, pdf_object)
+    xref_offset: int = len(output)
+    entries: bytes = struct.pack(">BIH", 0, 0, 65535)
+    for offset in offsets + [xref_offset]:
+        entries += struct.pack(">BIH", 1, offset, 0)
+    data: bytes = zlib.compress(entries)
+    output += (
+        b"4 0 obj\n<< /Type /XRef /Size 5 /W [1 4 2] /Root 1 0 R "
+        b"/Filter /FlateDecode /Length %d >>\nstream\n%s\nendstream\nendobj\n"
+        b"startxref\n%d\n%%%%EOF" % (len(data), data, xref_offset)
+    )
+    return bytes(output)
+
+
+class PdfMetadataTests(TemporaryMediaMixin, TestCase):
+    metadata: dict[str, str] = {"/Author": "Fachschaft – Münster"}
+
+    def assertInfoUpdated(self, original: bytes) -> PdfReader:
+        update: bytes = pdf_metadata.build_info_update(
+            io.BytesIO(original), self.metadata
+        )
+        updated: bytes = original + update
+        # The original bytes stay untouched, so the update is only appended
+        self.assertEqual(updated[: len(original)], original)
+
+        reader = PdfReader(io.BytesIO(updated), strict=True)
+        self.assertEqual(reader.metadata["/Author"], self.metadata["/Author"])
+        self.assertEqual(len(reader.pages), len(PdfReader(io.BytesIO(original)).pages))
+        return reader
+
+    def test_xref_table(self):
+        writer = PdfWriter()
+        writer.add_blank_page(width=200, height=200)
+        writer.add_metadata({"/Author": "Someone", "/Title": "Exam"})
+        output = io.BytesIO()
+        writer.write(output)
+        original: bytes = output.getvalue()
+        self.assertIn(b"\nxref\n", original)
+
+        reader: PdfReader = self.assertInfoUpdated(original)
+        self.assertEqual(reader.metadata["/Title"], "Exam")
+
+    def test_xref_stream(self):
+        original: bytes = make_xref_stream_pdf()
+        PdfReader(io.BytesIO(original), strict=True).pages
+        self.assertInfoUpdated(original)
+
+    def test_repeated_updates(self):
+        original: bytes = make_pdf(pages=2)
+        updated: bytes = original + pdf_metadata.build_info_update(
+            io.BytesIO(original), {"/Author": "First"}
+        )
+        self.assertInfoUpdated(updated)
+
+    def test_broken_cross_reference_data_is_rejected(self):
+        original: bytes = make_pdf()
+        # Point 'startxref' at the header instead of the cross-reference table
+        broken: bytes = original[: original.rindex(b"startxref")] + (
+            b"startxref\n1\n%%EOF\n"
+        )
+        with self.assertRaises(pdf_metadata.PdfReadError):
+            pdf_metadata.build_info_update(io.BytesIO(broken), self.metadata)
+        with self.assertRaises(pdf_metadata.PdfReadError):
+            pdf_metadata.build_info_update(io.BytesIO(b"%PDF-1.4\nno"), self.metadata)
+
+    @override_settings(EXAM_METADATA_AUTHOR="Fachschaft – Münster")
+    def test_broken_file_is_rewritten(self):
+        original: bytes = make_pdf(pages=2)
+        broken: bytes = original[: original.rindex(b"startxref")] + (
+            b"startxref\n1\n%%EOF\n"
+        )
+        exam: Exam = store_exam(broken)
+
+        with (
+            self.assertLogs("core.models.metadata_service", "WARNING") as logs,
+            self.assertLogs("pypdf", "WARNING"),
+        ):
+            process_pdf(exam.file)
+        self.assertIn("incrementally, rewriting it", logs.output[0])
+        with exam.file.open("rb") as file:
+            rewritten: bytes = file.read()
+        self.assertNotEqual(rewritten[: len(broken)], broken)
+        reader = PdfReader(io.BytesIO(rewritten), strict=True)
+        self.assertEqual(reader.metadata["/Author"], "Fachschaft – Münster")
+        self.assertEqual(len(reader.pages), 2)
+
+    @override_settings(EXAM_METADATA_AUTHOR="Fachschaft – Münster")
+    def test_intact_file_is_updated_incrementally(self):
+        original: bytes = make_xref_stream_pdf()
+        exam: Exam = store_exam(original)
+
+        process_pdf(exam.file)
+        with exam.file.open("rb") as file:
+            updated: bytes = file.read()
+        self.assertEqual(updated[: len(original)], original)
+        reader = PdfReader(io.BytesIO(updated), strict=True)
+        self.assertEqual(reader.metadata["/Author"], "Fachschaft – Münster")
+
+
+def make_uncompressed_pdf(pages: int = 2) -> bytes:
+    """A PDF whose page content streams are stored uncompressed."""
+    writer = PdfWriter()
+    for _ in range(pages):
+        page = writer.add_blank_page(width=200, height=200)
+        content = DecodedStreamObject()
+        content.set_data(b"0 0 m 200 200 l S\n" * 500)
+        page.replace_contents(content)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+class PdfOptimizationTests(TemporaryMediaMixin, TestCase):
+    def optimize(self, content: bytes) -> tuple[FileOptimization, bytes]:
+        exam: Exam = store_exam(content)
+        optimization: FileOptimization = optimize_pdf(exam.file)
+        with exam.file.open("rb") as file:
+            return optimization, file.read()
+
+    def test_smaller_result_replaces_the_file(self):
+        content: bytes = make_uncompressed_pdf()
+        optimization, stored = self.optimize(content)
+        self.assertTrue(optimization.kept)
+        self.assertEqual(optimization.original_size, len(content))
+        self.assertEqual(optimization.optimized_size, len(stored))
+        self.assertLess(len(stored), len(content) * 0.95)
+        self.assertEqual(len(PdfReader(io.BytesIO(stored)).pages), 2)
+
+    @override_settings(EXAM_PDF_OPTIMIZATION_MIN_SAVINGS=100)
+    def test_result_below_the_threshold_is_discarded(self):
+        content: bytes = make_uncompressed_pdf()
+        optimization, stored = self.optimize(content)
+        self.assertFalse(optimization.kept)
+        self.assertLess(optimization.optimized_size, optimization.original_size)
+        self.assertEqual(stored, content)
+
+
+class OptimizeExamsTests(TemporaryMediaMixin, TransactionTestCase):
+    """The command optimizes in a pool, whose threads need committed data."""
+
+    def setUp(self):
+        super().setUp()
+        pool = mock.patch(
+            "core.management.commands.optimize_exams.create_process_pool",
+            lambda workers: ThreadPoolExecutor(2),
+        )
+        pool.start()
+        self.addCleanup(pool.stop)
+        # File handlers then run inline, seeing the overridden settings
+        worker = mock.patch("core.workers._is_worker_process", True)
+        worker.start()
+        self.addCleanup(worker.stop)
+        self.content: bytes = make_uncompressed_pdf()
+        self.exam: Exam = store_exam(self.content)
+
+    def optimize(self, *args: str) -> str:
+        stdout = io.StringIO()
+        with mock.patch.object(
+            metadata_jobs, "_derive_from_file", wraps=metadata_jobs._derive_from_file
+        ) as self.derive_from_file:
+            call_command("optimize_exams", *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_optimize_exams(self):
+        generation: int = get_listing_generation()
+        with override_settings(EXAM_PDF_OPTIMIZATION_MIN_SAVINGS=100):
+            self.assertIn("Optimized 0 of 1 exam(s)", self.optimize())
+        exam: Exam = Exam.objects.get(pk=self.exam.pk)
+        self.assertEqual(exam.original_size, len(self.content))
+        self.assertLess(exam.optimized_size, len(self.content))
+        # The file is unchanged, so neither listings nor derived data are refreshed
+        self.assertEqual(exam.file.name, self.exam.file.name)
+        self.assertEqual(exam.content_hash, self.exam.content_hash)
+        self.assertEqual(get_listing_generation(), generation)
+        self.derive_from_file.assert_not_called()
+
+        # Exams optimized before are skipped
+        self.assertIn("Optimized 0 of 0 exam(s)", self.optimize())
+
+        self.assertIn("Optimized 1 of 1 exam(s)", self.optimize("--force"))
+        exam = Exam.objects.get(pk=self.exam.pk)
+        with exam.file.open("rb") as file:
+            stored: bytes = file.read()
+        self.assertEqual(exam.optimized_size, len(stored))
+        self.assertEqual(exam.file_size, len(stored))
+        self.assertEqual(exam.content_hash, hashlib.sha256(stored).hexdigest())
+        self.assertFalse(exam.file.storage.exists(self.exam.file.name))
+        self.assertGreater(get_listing_generation(), generation)
+        self.derive_from_file.assert_called_once()
+        self.assertEqual(
+            ExamArtifacts.objects.get(exam=exam).content_hash, exam.content_hash
+        )
+
+
+def make_docx(*paragraphs: str, core_properties: bool = True) -> bytes:
+    document = Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    document.core_properties.author = "Someone"
+    output = io.BytesIO()
+    document.save(output)
+    if core_properties:
+        return output.getvalue()
+
+    # Drop the core-properties part and its relationship
+    stripped = io.BytesIO()
+    with (
+        zipfile.ZipFile(output) as source,
+        zipfile.ZipFile(stripped, "w", zipfile.ZIP_DEFLATED) as target,
+    ):
+        for name in source.namelist():
+            data: bytes = source.read(name)
+            if name == docx_metadata.CORE_PROPERTIES_PART:
+                continue
+            if name == "_rels/.rels":
+                rels = etree.fromstring(data)
+                for relationship in rels:
+                    if relationship.get("Target") == "docProps/core.xml":
+                        rels.remove(relationship)
+                data = etree.tostring(rels, xml_declaration=True, encoding="UTF-8")
+            target.writestr(name, data)
+    return stripped.getvalue()
+
+
+def raw_zip_members(data: bytes) -> dict[str, bytes]:
+    """The local header and compressed data of each member, as stored."""
+    members: dict[str, bytes] = {}
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for info in archive.infolist():
+            name_length, extra_length = struct.unpack_from(
+                "<2H", data, info.header_offset + 26
+            )
+            end: int = (
+                info.header_offset
+                + 30
+                + name_length
+                + extra_length
+                + info.compress_size
+            )
+            members[info.filename] = data[info.header_offset : end]
+    return members
+
+
+class ExamExportTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.contents: list[bytes] = [make_pdf(pages=1), make_pdf(pages=2)]
+        # Same course and term, so both have the same file name
+        self.exams: list[Exam] = [store_exam(content) for content in self.contents]
+        pending: Exam = store_exam(make_pdf(pages=3))
+        Exam.objects.filter(pk=pending.pk).update(
+            metadata_status=Exam.MetadataStatus.PENDING
+        )
+        self.url: str = (
+            reverse("core:exam-export") + f"?course={self.exams[0].course_id}"
+        )
+
+    def export(
+        self, headers: dict[str, str] | None = None
+    ) -> tuple[HttpResponseBase, bytes]:
+        response = self.client.get(self.url, headers=headers)
+        if not response.streaming:
+            return response, response.content
+        return response, b"".join(response.streaming_content)
+
+    def test_archive(self):
+        response, body = self.export()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        self.assertIn("exams-course.zip", response["Content-Disposition"])
+
+        name: str = self.exams[0].file_name.replace("/", "-")
+        stem, extension = os.path.splitext(name)
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.namelist(), [name, f"{stem}-2{extension}"])
+            self.assertEqual(
+                sorted(archive.read(info) for info in archive.infolist()),
+                sorted(self.contents),
+            )
+            for info in archive.infolist():
+                self.assertEqual(info.compress_type, zipfile.ZIP_STORED)
+        # Stored members hold the PDF bytes as they are
+        for member in raw_zip_members(body).values():
+            self.assertTrue(any(content in member for content in self.contents))
+
+    def test_missing_files_are_skipped(self):
+        os.remove(self.exams[0].file.path)
+        with self.assertLogs("core.export", "WARNING"):
+            _, body = self.export()
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            self.assertEqual(
+                [archive.read(name) for name in archive.namelist()], [self.contents[1]]
+            )
+
+    def test_conditional_requests(self):
+        response, _ = self.export()
+        etag: str = response["ETag"]
+        self.assertIn("public", response["Cache-Control"])
+
+        response, body = self.export({"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(body, b"")
+
+        # Changed content gets a new ETag
+        Exam.objects.filter(pk=self.exams[0].pk).update(content_hash="changed")
+        response, _ = self.export({"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_a_filter_is_required(self):
+        response = self.client.get(reverse("core:exam-export"))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("errors", response.json())
+
+
+class DocxMetadataTests(TemporaryMediaMixin, TestCase):
+    def test_only_core_properties_are_rewritten(self):
+        original: bytes = make_docx("First", "Second")
+        output = io.BytesIO()
+        docx_metadata.set_author(io.BytesIO(original), output, "Fachschaft – Münster")
+        updated: bytes = output.getvalue()
+
+        with zipfile.ZipFile(io.BytesIO(updated)) as archive:
+            self.assertIsNone(archive.testzip())
+        original_members: dict[str, bytes] = raw_zip_members(original)
+        updated_members: dict[str, bytes] = raw_zip_members(updated)
+        self.assertEqual(list(updated_members), list(original_members))
+        for name, member in original_members.items():
+            if name != docx_metadata.CORE_PROPERTIES_PART:
+                self.assertEqual(updated_members[name], member, name)
+
+        document = Document(io.BytesIO(updated))
+        self.assertEqual(document.core_properties.author, "Fachschaft – Münster")
+        self.assertEqual([p.text for p in document.paragraphs], ["First", "Second"])
+
+    def test_archive_without_core_properties_is_rejected(self):
+        with self.assertRaises(docx_metadata.UnsupportedArchiveError):
+            docx_metadata.set_author(
+                io.BytesIO(make_docx("First", core_properties=False)),
+                io.BytesIO(),
+                "Fachschaft – Münster",
+            )
+
+    @override_settings(EXAM_METADATA_AUTHOR="Fachschaft – Münster")
+    def test_unsupported_archive_is_rewritten_with_python_docx(self):
+        exam: Exam = store_exam(
+            make_docx("First", "Second", core_properties=False), name="exam.docx"
+        )
+
+        with self.assertLogs("core.models.metadata_service", "WARNING") as logs:
+            process_docx(exam.file)
+        self.assertIn("rewriting it", logs.output[0])
+        with exam.file.open("rb") as file:
+            document = Document(file)
+        self.assertEqual(document.core_properties.author, "Fachschaft – Münster")
+        self.assertEqual([p.text for p in document.paragraphs], ["First", "Second"])
+
+    @override_settings(EXAM_METADATA_AUTHOR="Fachschaft – Münster")
+    def test_document_is_patched_in_place(self):
+        original: bytes = make_docx("First")
+        exam: Exam = store_exam(original, name="exam.docx")
+
+        process_docx(exam.file)
+        with exam.file.open("rb") as file:
+            document = Document(file)
+        self.assertEqual(document.core_properties.author, "Fachschaft – Münster")
+        self.assertEqual([p.text for p in document.paragraphs], ["First"])
+
+
+@override_settings(EXAM_METADATA_JOB_BACKEND="database")
+class FileIngestionTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        get_backend.cache_clear()
+        self.addCleanup(get_backend.cache_clear)
+        sniff = mock.patch(
+            "core.utils._sniff_mime_type", wraps=core.utils._sniff_mime_type
+        )
+        self.sniff_mime_type = sniff.start()
+        self.addCleanup(sniff.stop)
+
+    def test_validation_and_saving_share_one_read(self):
+        content: bytes = make_pdf()
+        form = ExamUploadForm(
+            {
+                "year": "2020",
+                "term": "WS",
+                "course": Course.objects.create(title="Course").pk,
+            },
+            {"file": SimpleUploadedFile("exam.pdf", content)},
+        )
+        before: tuple[int, float] = observations(
+            FILE_INGESTION_SECONDS, file_type="pdf"
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        exam: Exam = form.save()
+        after: tuple[int, float] = observations(FILE_INGESTION_SECONDS, file_type="pdf")
+        self.assertEqual(after[0], before[0] + 1)
+        self.assertEqual(self.sniff_mime_type.call_count, 1)
+        self.assertEqual(exam.content_hash, hashlib.sha256(content).hexdigest())
+        self.assertEqual(exam.file_size, len(content))
+
+    def test_rewritten_file_is_ingested_again(self):
+        storage = FileSystemStorage(location=self.media_root)
+        file = FieldFile(
+            Exam(),
+            Exam._meta.get_field("file"),
+            storage.save("exam.pdf", ContentFile(make_pdf())),
+        )
+        file.storage = storage
+        original: FileIngestion = ingest_file(file)
+        self.assertIs(ingest_file(file), original)
+
+        modify_file_metadata(file)
+        with file.open("rb"):
+            content: bytes = file.read()
+            ingestion: FileIngestion = ingest_file(file)
+        self.assertEqual(ingestion.content_hash, hashlib.sha256(content).hexdigest())
+        self.assertNotEqual(ingestion.content_hash, original.content_hash)
+        self.assertEqual(ingestion.size, len(content))
+
+
+class ExamUploadViewTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser(
+            "admin", "admin@example.com", "password"
+        )
+        cls.course: Course = Course.objects.create(title="Course")
+
+    def setUp(self):
+        super().setUp()
+        get_backend.cache_clear()
+        self.addCleanup(get_backend.cache_clear)
+        self.client.force_login(self.user)
+
+    def upload(self, content: bytes, name: str = "exam.pdf"):
+        return self.client.post(
+            reverse("core:exam-upload"),
+            {
+                "file": ContentFile(content, name=name),
+                "year": "2020",
+                "term": "WS",
+                "course": str(self.course.pk),
+            },
+        )
+
+    def test_upload_is_ingested_once_outside_the_orm_thread(self):
+        content: bytes = make_pdf(pages=2)
+        threads: list[threading.Thread] = []
+        sniff_mime_type = core.utils._sniff_mime_type
+
+        def record_thread(head: bytes) -> str:
+            threads.append(threading.current_thread())
+            return sniff_mime_type(head)
+
+        with mock.patch("core.utils._sniff_mime_type", record_thread):
+            response = self.upload(content)
+
+        self.assertEqual(response.status_code, 202, response.content)
+        exam: Exam = Exam.objects.get(pk=response.json()["id"])
+        self.assertEqual(exam.content_hash, hashlib.sha256(content).hexdigest())
+        self.assertEqual(exam.file_size, len(content))
+        # The test client runs the thread-sensitive calls in the main thread
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+    def test_invalid_file(self):
+        response = self.upload(b"plain text", name="exam.txt")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("file", response.json()["errors"])
+        self.assertFalse(Exam.objects.exists())
+
+    def test_anonymous_upload(self):
+        self.client.logout()
+        response = self.upload(make_pdf())
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Exam.objects.exists())
+
+
+class ExamSearchViewTests(TransactionTestCase):
+    """The search runs on its own connection, which needs committed data."""
+
+    def setUp(self):
+        cache.clear()
+        course: Course = Course.objects.create(title="Course")
+        statuses: list[str] = [
+            Exam.MetadataStatus.DONE,
+            Exam.MetadataStatus.DONE,
+            Exam.MetadataStatus.PENDING,
+        ]
+        self.exams: list[Exam] = Exam.objects.bulk_create(
+            [
+                Exam(
+                    file=f"exams/exam-{i}.pdf",
+                    year=2020,
+                    term="WS",
+                    course=course,
+                    metadata_status=status,
+                )
+                for i, status in enumerate(statuses)
+            ]
+        )
+        for exam, text in zip(
+            self.exams,
+            (
+                "Integrals and more integrals",
+                "Derivatives and one integrals task",
+                "Integrals of the pending exam",
+            ),
+        ):
+            ExamText.objects.create(exam=exam, text=text)
+
+    def test_results_run_outside_the_orm_thread(self):
+        threads: list[threading.Thread] = []
+        search = Fts5SearchBackend.search
+
+        def record_thread(backend, *args, **kwargs) -> list[SearchHit]:
+            threads.append(threading.current_thread())
+            return search(backend, *args, **kwargs)
+
+        path: str = reverse("core:exam-search") + "?q=integrals"
+        with mock.patch.object(Fts5SearchBackend, "search", record_thread):
+            for get in (self.client.get, async_to_sync(AsyncClient().get)):
+                cache.clear()
+                response = get(path)
+                self.assertEqual(response.status_code, 200)
+                results: list[dict] = response.json()["results"]
+                self.assertEqual(
+                    [result["id"] for result in results],
+                    [self.exams[0].pk, self.exams[1].pk],
+                )
+                self.assertIn("<mark>", results[0]["snippet"])
+
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.main_thread(), threads)
+
+    def test_query_is_required(self):
+        response = self.client.get(reverse("core:exam-search"))
+        self.assertEqual(response.status_code, 400)
+
+
+class SearchBackendTests(TestCase):
+    backends: tuple[type[BaseSearchBackend], ...] = (
+        Fts5SearchBackend,
+        PythonSearchBackend,
+    )
+
+    def create_exams(self, *texts: str, **fields) -> list[Exam]:
+        course: Course = Course.objects.get_or_create(title="Course")[0]
+        exams: list[Exam] = Exam.objects.bulk_create(
+            Exam(
+                file=f"exams/exam-{i}.pdf",
+                year=2020,
+                term="WS",
+                course=course,
+                **{"metadata_status": Exam.MetadataStatus.DONE, **fields},
+            )
+            for i in range(len(texts))
+        )
+        ExamText.objects.bulk_create(
+            ExamText(exam=exam, text=text) for exam, text in zip(exams, texts)
+        )
+        return exams
+
+    def search(self, backend_class: type[BaseSearchBackend], query: str, **kwargs):
+        return backend_class().search(query, **kwargs)
+
+    def test_ranking(self):
+        once, repeated, _ = self.create_exams(
+            "One task on integrals among many tasks on other analysis topics",
+            "Integrals, integrals and more integrals",
+            "Derivatives only",
+        )
+        for backend_class in self.backends:
+            with self.subTest(backend_class.__name__):
+                hits: list[SearchHit] = self.search(backend_class, "integrals")
+                self.assertEqual([hit.exam_id for hit in hits], [repeated.pk, once.pk])
+                self.assertGreater(hits[0].score, hits[1].score)
+                self.assertEqual(
+                    len(self.search(backend_class, "integrals", limit=1)), 1
+                )
+
+    def test_phrases(self):
+        hyphenated, reversed_words, apart = self.create_exams(
+            "The IS-LM model of the goods market",
+            "LM is not the same",
+            "IS curve and later the LM curve",
+        )
+        for backend_class in self.backends:
+            with self.subTest(backend_class.__name__):
+                for query in ("IS-LM", "is/lm model"):
+                    hits: list[SearchHit] = self.search(backend_class, query)
+                    self.assertEqual(
+                        [hit.exam_id for hit in hits], [hyphenated.pk], query
+                    )
+                self.assertEqual(
+                    {hit.exam_id for hit in self.search(backend_class, "IS LM")},
+                    {hyphenated.pk, reversed_words.pk, apart.pk},
+                )
+
+    def test_snippets_are_escaped(self):
+        self.create_exams("<script>alert(1)</script> Integrals & <b>limits</b>")
+        for backend_class in self.backends:
+            with self.subTest(backend_class.__name__):
+                snippet: str = self.search(backend_class, "integrals")[0].snippet
+                self.assertIn("<mark>Integrals</mark>", snippet)
+                self.assertIn("&lt;/script&gt;", snippet)
+                self.assertIn("&amp;", snippet)
+                self.assertNotIn("<script>", snippet)
+                self.assertNotIn("<b>", snippet)
+
+    def test_only_given_exams_are_searched(self):
+        (published,) = self.create_exams("Published integrals")
+        (pending,) = self.create_exams(
+            "Pending integrals", metadata_status=Exam.MetadataStatus.PENDING
+        )
+        for backend_class in self.backends:
+            with self.subTest(backend_class.__name__):
+                self.assertEqual(
+                    {hit.exam_id for hit in self.search(backend_class, "integrals")},
+                    {published.pk, pending.pk},
+                )
+                hits: list[SearchHit] = self.search(
+                    backend_class, "integrals", exams=Exam.objects.published()
+                )
+                self.assertEqual([hit.exam_id for hit in hits], [published.pk])
+
+    def test_deleted_exams_are_removed_from_the_index(self):
+        kept, deleted = self.create_exams("Integrals", "More integrals")
+        deleted.delete()
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT rowid FROM {FTS5_TABLE}")
+            self.assertEqual(cursor.fetchall(), [(kept.pk,)])
+        for backend_class in self.backends:
+            with self.subTest(backend_class.__name__):
+                hits: list[SearchHit] = self.search(backend_class, "integrals")
+                self.assertEqual([hit.exam_id for hit in hits], [kept.pk])
+
+
+class RebuildSearchIndexTests(TemporaryMediaMixin, TransactionTestCase):
+    """The command extracts texts in a pool, whose threads need committed data."""
+
+    def setUp(self):
+        super().setUp()
+        pool = mock.patch.object(
+            rebuild_search_index,
+            "create_process_pool",
+            lambda workers: ThreadPoolExecutor(2),
+        )
+        pool.start()
+        self.addCleanup(pool.stop)
+
+    def rebuild(self, *args: str) -> str:
+        stdout = io.StringIO()
+        call_command("rebuild_search_index", *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_rebuild(self):
+        integrals: Exam = store_exam(make_docx("Integrals"), name="a.docx")
+        derivatives: Exam = store_exam(make_docx("Derivatives"), name="b.docx")
+        pending: Exam = store_exam(make_docx("Pending"), name="c.docx")
+        Exam.objects.filter(pk=pending.pk).update(
+            metadata_status=Exam.MetadataStatus.PENDING
+        )
+
+        self.assertIn("Indexed 2 of 2 exam(s).", self.rebuild())
+        self.assertEqual(
+            dict(ExamText.objects.values_list("exam_id", "text")),
+            {integrals.pk: "Integrals", derivatives.pk: "Derivatives"},
+        )
+        self.assertEqual(
+            ExamText.objects.get(exam=integrals).content_hash, integrals.content_hash
+        )
+
+        # Only texts of changed files are extracted again, unless --full is given
+        self.assertIn("Indexed 0 of 0 exam(s).", self.rebuild())
+        ExamText.objects.filter(exam=derivatives).update(content_hash="outdated")
+        self.assertIn("Indexed 1 of 1 exam(s).", self.rebuild())
+        self.assertIn("Indexed 2 of 2 exam(s).", self.rebuild("--full"))
+
+        hits: list[SearchHit] = get_search_backend().search("derivatives")
+        self.assertEqual([hit.exam_id for hit in hits], [derivatives.pk])
+
+
+class ResumableUploadTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser(
+            "admin", "admin@example.com", "password"
+        )
+        cls.course: Course = Course.objects.create(title="Course")
+
+    def setUp(self):
+        super().setUp()
+        get_backend.cache_clear()
+        self.addCleanup(get_backend.cache_clear)
+        self.client.force_login(self.user)
+
+    def creation_headers(self, length: int, filename: str) -> dict[str, str]:
+        metadata: dict[str, str] = {
+            "filename": filename,
+            "year": "2020",
+            "term": "WS",
+            "course": str(self.course.pk),
+        }
+        return {
+            "Tus-Resumable": "1.0.0",
+            "Upload-Length": str(length),
+            "Upload-Metadata": ",".join(
+                f"{key} {base64.b64encode(value.encode()).decode()}"
+                for key, value in metadata.items()
+            ),
+        }
+
+    def create(self, length: int, filename: str = "exam.pdf") -> str:
+        response = self.client.post(
+            reverse("core:upload-create"),
+            headers=self.creation_headers(length, filename),
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return response["Location"]
+
+    def append(self, location: str, offset: int, chunk: bytes):
+        return self.client.patch(
+            location,
+            chunk,
+            content_type="application/offset+octet-stream",
+            headers={"Tus-Resumable": "1.0.0", "Upload-Offset": str(offset)},
+        )
+
+    def test_chunks_are_assembled_into_an_exam(self):
+        content: bytes = make_pdf(pages=3)
+        location: str = self.create(len(content))
+        upload: ExamUpload = ExamUpload.objects.get()
+        middle: int = len(content) // 2
+
+        response = self.append(location, 0, content[:middle])
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response["Upload-Offset"], str(middle))
+        self.assertNotIn("X-Exam-Id", response)
+        self.assertIn(upload.pk, _hashers)
+        self.assertEqual(self.client.head(location)["Upload-Offset"], str(middle))
+
+        response = self.append(location, middle, content[middle:])
+        self.assertEqual(response.status_code, 204)
+        exam: Exam = Exam.objects.get()
+        self.assertEqual(response["X-Exam-Id"], str(exam.pk))
+        self.assertEqual(exam.content_hash, hashlib.sha256(content).hexdigest())
+        self.assertEqual(exam.file_size, len(content))
+        with exam.file.open("rb") as file:
+            self.assertEqual(file.read(), content)
+        self.assertNotIn(upload.pk, _hashers)
+        self.assertFalse(os.path.exists(upload_path(upload)))
+
+    def test_offset_mismatch(self):
+        content: bytes = make_pdf()
+        location: str = self.create(len(content))
+        self.append(location, 0, content[:100])
+
+        for offset in (0, 50, 200):
+            response = self.append(location, offset, content[offset:])
+            self.assertEqual(response.status_code, 409)
+        self.assertEqual(ExamUpload.objects.get().offset, 100)
+        self.assertFalse(Exam.objects.exists())
+
+    def test_unexpected_mime_type_discards_the_upload(self):
+        content: bytes = b"Just some text, not a PDF." * 100
+        location: str = self.create(len(content))
+        upload: ExamUpload = ExamUpload.objects.get()
+
+        response = self.append(location, 0, content)
+        self.assertEqual(response.status_code, 415)
+        self.assertFalse(ExamUpload.objects.exists())
+        self.assertFalse(os.path.exists(upload_path(upload)))
+        self.assertNotIn(upload.pk, _hashers)
+        self.assertEqual(self.client.head(location).status_code, 404)
+
+    def test_resuming_without_the_hash_state_rehashes_the_file(self):
+        content: bytes = make_pdf(pages=3)
+        location: str = self.create(len(content))
+        upload: ExamUpload = ExamUpload.objects.get()
+        first, second = len(content) // 3, 2 * len(content) // 3
+        self.append(location, 0, content[:first])
+
+        # Resumed by another process, or after a restart
+        _hashers.clear()
+        self.assertEqual(
+            self.append(location, first, content[first:second]).status_code, 204
+        )
+
+        # Nor is the hash state of another offset used
+        _hashers[upload.pk] = (first, hashlib.sha256(b"other"), time.monotonic())
+        self.assertEqual(
+            self.append(location, second, content[second:]).status_code, 204
+        )
+        exam: Exam = Exam.objects.get()
+        self.assertEqual(exam.content_hash, hashlib.sha256(content).hexdigest())
+
+    def test_csrf_token_of_tus_clients(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        content: bytes = make_pdf()
+        headers: dict[str, str] = self.creation_headers(len(content), "exam.pdf")
+        url: str = reverse("core:upload-create")
+        self.assertEqual(client.post(url, headers=headers).status_code, 403)
+
+        token: str = client.options(url).cookies[settings.CSRF_COOKIE_NAME].value
+        headers["X-CSRFToken"] = token
+        response = client.post(url, headers=headers)
+        self.assertEqual(response.status_code, 201)
+        response = client.patch(
+            response["Location"],
+            content,
+            content_type="application/offset+octet-stream",
+            headers={
+                "Tus-Resumable": "1.0.0",
+                "Upload-Offset": "0",
+                "X-CSRFToken": token,
+            },
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertTrue(Exam.objects.exists())
+
+    @override_settings(EXAM_UPLOAD_EXPIRY=60)
+    def test_stale_hash_states_are_forgotten(self):
+        content: bytes = make_pdf(pages=2)
+        location: str = self.create(len(content))
+        upload: ExamUpload = ExamUpload.objects.get()
+        self.append(location, 0, content[:100])
+
+        offset, hasher, kept_at = _hashers[upload.pk]
+        _hashers[upload.pk] = (offset, hasher, kept_at - 61)
+        self.assertEqual(purge_expired_uploads(), 0)
+        self.assertNotIn(upload.pk, _hashers)
+
+        # The bytes received so far are rehashed instead
+        self.append(location, 100, content[100:])
+        exam: Exam = Exam.objects.get()
+        self.assertEqual(exam.content_hash, hashlib.sha256(content).hexdigest())
+
+
+def observations(histogram: Histogram, **labels: str) -> tuple[int, float]:
+    """Number and sum of the values observed so far."""
+    counts, total = histogram._values.get(histogram._label_values(labels), ([0], [0.0]))
+    return sum(counts), total[0]
+
+
+class MetricsExpositionTests(SimpleTestCase):
+    def test_histogram(self):
+        histogram = Histogram(
+            "test_seconds", "Test durations.", ("view",), buckets=(0.1, 1)
+        )
+        for value in (0.05, 0.1, 0.5, 5):
+            histogram.observe(value, view="a")
+        histogram.observe(2, view="b")
+
+        self.assertEqual(
+            histogram.render().splitlines(),
+            [
+                "# HELP test_seconds Test durations.",
+                "# TYPE test_seconds histogram",
+                # Buckets are cumulative and include their upper bound
+                'test_seconds_bucket{view="a",le="0.1"} 2',
+                'test_seconds_bucket{view="a",le="1"} 3',
+                'test_seconds_bucket{view="a",le="+Inf"} 4',
+                'test_seconds_sum{view="a"} 5.65',
+                'test_seconds_count{view="a"} 4',
+                'test_seconds_bucket{view="b",le="0.1"} 0',
+                'test_seconds_bucket{view="b",le="1"} 0',
+                'test_seconds_bucket{view="b",le="+Inf"} 1',
+                'test_seconds_sum{view="b"} 2',
+                'test_seconds_count{view="b"} 1',
+            ],
+        )
+
+    def test_counter_label_escaping(self):
+        counter = Counter("test_total", "Test events.", ("name",))
+        counter.inc(name='a "quoted"\\path\nline')
+        counter.inc(2, name='a "quoted"\\path\nline')
+        counter.inc(0.5, name="plain")
+
+        self.assertEqual(
+            counter.render().splitlines()[2:],
+            [
+                'test_total{name="a \\"quoted\\"\\\\path\\nline"} 3',
+                'test_total{name="plain"} 0.5',
+            ],
+        )
+
+
+class MetricsMiddlewareTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Course.objects.create(title="Course")
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def assertRecordedQueries(self, view: str, get: Callable[[], HttpResponse]):
+        """Makes a request and checks the recorded query count against the queries."""
+        before: tuple[int, float] = observations(REQUEST_DB_QUERIES, view=view)
+        with CaptureQueriesContext(connection) as queries:
+            response: HttpResponse = get()
+        self.assertEqual(response.status_code, 200)
+        after: tuple[int, float] = observations(REQUEST_DB_QUERIES, view=view)
+        self.assertEqual(after[0], before[0] + 1)
+        self.assertGreater(len(queries), 0)
+        self.assertEqual(after[1] - before[1], len(queries))
+
+    def test_sync_view(self):
+        path: str = reverse("core:course-list")
+        self.assertRecordedQueries("core:course-list", lambda: self.client.get(path))
+
+    def test_async_view(self):
+        exam: Exam = store_exam(make_pdf())
+        path: str = reverse("core:exam-download", args=[exam.pk])
+        self.assertRecordedQueries("core:exam-download", lambda: self.client.get(path))
+
+        # Through the async middleware path, with the ORM calls in worker threads
+        self.assertRecordedQueries(
+            "core:exam-download", lambda: async_to_sync(AsyncClient().get)(path)
+        )
+
+
+class MetricsViewTests(SimpleTestCase):
+    def test_allowed_address(self):
+        response = self.client.get(reverse("metrics"), REMOTE_ADDR="127.0.0.1")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            response["Content-Type"].startswith("text/plain; version=0.0.4")
+        )
+        self.assertIn(
+            "# TYPE examarchive_request_seconds histogram", response.content.decode()
+        )
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.1"])
+    def test_other_addresses_are_forbidden(self):
+        self.assertEqual(
+            self.client.get(reverse("metrics"), REMOTE_ADDR="127.0.0.1").status_code,
+            403,
+        )
+        self.assertEqual(
+            self.client.get(reverse("metrics"), REMOTE_ADDR="10.0.0.1").status_code,
+            200,
+        )
+
+
+class ExamDownloadTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.content: bytes = make_pdf(pages=2)
+        self.exam: Exam = store_exam(self.content)
+        self.url: str = reverse("core:exam-download", args=[self.exam.pk])
+        self.etag: str = f'"{self.exam.content_hash}"'
+
+    def download(
+        self, headers: dict[str, str] | None = None, asynchronous: bool = False
+    ) -> tuple[HttpResponseBase, bytes]:
+        """Downloads the exam through WSGI or ASGI, returning the response and body."""
+        if not asynchronous:
+            response = self.client.get(self.url, headers=headers)
+            if not response.streaming:
+                return response, response.content
+            return response, b"".join(response.streaming_content)
+
+        async def get() -> tuple[HttpResponseBase, bytes]:
+            response = await AsyncClient().get(self.url, headers=headers)
+            if not response.streaming:
+                return response, response.content
+            return response, b"".join([chunk async for chunk in response])
+
+        return async_to_sync(get)()
+
+    def test_whole_file(self):
+        for asynchronous in (False, True):
+            response, body = self.download(asynchronous=asynchronous)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(body, self.content)
+            self.assertEqual(response["Content-Type"], "application/pdf")
+            self.assertEqual(response["ETag"], self.etag)
+            self.assertEqual(response["Accept-Ranges"], "bytes")
+            self.assertTrue(response["Content-Disposition"].startswith("attachment"))
+
+    def test_ranges(self):
+        size: int = len(self.content)
+        for header, start, end in (
+            ("bytes=10-19", 10, 19),
+            ("bytes=100-", 100, size - 1),
+            ("bytes=-20", size - 20, size - 1),
+            ("bytes=0-999999", 0, size - 1),
+        ):
+            for asynchronous in (False, True):
+                response, body = self.download({"Range": header}, asynchronous)
+                self.assertEqual(response.status_code, 206, header)
+                self.assertEqual(
+                    response["Content-Range"], f"bytes {start}-{end}/{size}"
+                )
+                self.assertEqual(response["Content-Length"], str(end - start + 1))
+                self.assertEqual(body, self.content[start : end + 1])
+
+    def test_ignored_ranges(self):
+        for headers in (
+            {"Range": "bytes=0-9,20-29"},
+            {"Range": "items=0-9"},
+            # The client's copy is outdated, so it gets the whole file
+            {"Range": "bytes=10-19", "If-Range": '"outdated"'},
+        ):
+            response, body = self.download(headers)
+            self.assertEqual(response.status_code, 200, headers)
+            self.assertEqual(body, self.content)
+
+        response, body = self.download({"Range": "bytes=10-19", "If-Range": self.etag})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.content[10:20])
+
+    def test_unsatisfiable_ranges(self):
+        size: int = len(self.content)
+        for header in (f"bytes={size}-", "bytes=20-10"):
+            for asynchronous in (False, True):
+                response, _ = self.download({"Range": header}, asynchronous)
+                self.assertEqual(response.status_code, 416, header)
+                self.assertEqual(response["Content-Range"], f"bytes */{size}")
+
+    def test_conditional_requests(self):
+        for asynchronous in (False, True):
+            response, body = self.download({"If-None-Match": self.etag}, asynchronous)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response["ETag"], self.etag)
+            self.assertEqual(body, b"")
+
+            response, _ = self.download({"If-None-Match": '"other"'}, asynchronous)
+            self.assertEqual(response.status_code, 200)
+
+    def test_unpublished_exam(self):
+        Exam.objects.filter(pk=self.exam.pk).update(
+            metadata_status=Exam.MetadataStatus.PENDING
+        )
+        self.assertEqual(self.download()[0].status_code, 404)
+
+    @override_settings(EXAM_DOWNLOAD_ACCEL_REDIRECT_LOCATION="/protected/")
+    def test_accel_redirect(self):
+        Exam.objects.filter(pk=self.exam.pk).update(file="exams/WS 2020?#100%.pdf")
+        response, body = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, b"")
+        self.assertEqual(
+            response["X-Accel-Redirect"], "/protected/exams/WS%202020%3F%23100%25.pdf"
+        )
+        self.assertEqual(response["ETag"], self.etag)
+
+
+class DatabaseOptionsTests(SimpleTestCase):
+    def test_typed_options(self):
+        self.assertEqual(
+            _parse_database_options("sqlite", "timeout=20&cached_statements=50"),
+            {"timeout": 20.0, "cached_statements": 50},
+        )
+        self.assertEqual(
+            _parse_database_options(
+                "postgresql",
+                "sslmode=require&connect_timeout=5&pool=false&isolation_level=1"
+                "&server_side_binding=ON",
+            ),
+            {
+                "sslmode": "require",
+                "connect_timeout": "5",
+                "pool": False,
+                "isolation_level": 1,
+                "server_side_binding": True,
+            },
+        )
+
+    def test_invalid_values(self):
+        for scheme, query in (
+            ("sqlite", "timeout=soon"),
+            ("postgresql", "pool=maybe"),
+            ("postgresql", "prepare_threshold=1.5"),
+        ):
+            with self.assertRaises(RuntimeError):
+                _parse_database_options(scheme, query)
@@ -0,0 +1,280 @@
+import base64
+import binascii
+import fcntl
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import BinaryIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.http import UnreadablePostError
+from django.utils import timezone
+
+from core.forms import ExamUploadMetadataForm
+from core.models import Exam, ExamUpload
+from core.registry import FileFormat, get_file_format
+from core.utils import (
+    INGESTION_CHUNK_SIZE,
+    MIME_SNIFF_SIZE,
+    FileIngestion,
+    extract_file_extension,
+    extract_file_mime_type,
+)
+
+logger = logging.getLogger(__name__)
+
+# SHA-256 state of the uploads in progress in this process, by upload id, together
+# with the offset it covers and the monotonic time it was kept at. Hash objects
+# cannot be stored, so an upload resumed in another process rehashes the bytes
+# received so far once. Entries of uploads abandoned or purged elsewhere are dropped
+# after EXAM_UPLOAD_EXPIRY seconds.
+_hashers: dict[uuid.UUID, tuple[int, "hashlib._Hash", float]] = {}
+_hashers_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    """A request on a resumable upload that cannot be fulfilled."""
+
+    def __init__(self, message: str, status: int = 400) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def upload_path(upload: ExamUpload) -> str:
+    """Path of the partial file the chunks of the upload are appended to."""
+    return os.path.join(
+        settings.MEDIA_ROOT, settings.EXAM_UPLOAD_DIRECTORY, f"{upload.pk}.part"
+    )
+
+
+def upload_expires_at(upload: ExamUpload) -> datetime:
+    return upload.updated_at + timedelta(seconds=settings.EXAM_UPLOAD_EXPIRY)
+
+
+def parse_metadata(header: str) -> dict[str, str]:
+    """Decodes an 'Upload-Metadata' header of comma-separated 'key base64' pairs."""
+    metadata: dict[str, str] = {}
+    for pair in header.split(","):
+        key, _, value = pair.strip().partition(" ")
+        if not key:
+            continue
+        try:
+            metadata[key] = base64.b64decode(value, validate=True).decode()
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadError(f"Upload metadata '{key}' is not valid base64.")
+    return metadata
+
+
+def create_upload(length: int, metadata: dict[str, str], user) -> ExamUpload:
+    """
+    Starts an upload of the given number of bytes. The metadata holds the 'filename'
+    and the 'year', 'term' and 'course' of the exam; raises ValidationError if they
+    are invalid.
+    """
+    max_file_size: int = settings.EXAM_MAX_UPLOAD_FILE_SIZE
+    if length <= 0:
+        raise UploadError("Upload-Length must be a positive number of bytes.")
+    if length > max_file_size:
+        raise UploadError(
+            f"File size exceeds the limit of {max_file_size} bytes.", status=413
+        )
+
+    form = ExamUploadMetadataForm(metadata)
+    if not form.is_valid():
+        raise ValidationError(form.errors)
+
+    upload: ExamUpload = form.save(commit=False)
+    upload.length = length
+    upload.created_by = user
+    upload.save()
+
+    os.makedirs(os.path.dirname(upload_path(upload)), exist_ok=True)
+    open(upload_path(upload), "xb").close()
+    return upload
+
+
+def append_chunk(upload: ExamUpload, offset: int, stream: BinaryIO) -> ExamUpload:
+    """
+    Appends the bytes read from the stream at the given offset, which has to equal
+    the number of bytes received so far. The MIME type is checked as soon as enough
+    bytes arrived, and the exam is created once the upload is complete.
+    """
+    try:
+        file = open(upload_path(upload), "r+b")
+    except FileNotFoundError:
+        raise UploadError("The upload is no longer available.", status=404)
+
+    with file:
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadError("Another request is appending to the upload.", status=423)
+
+        try:
+            upload.refresh_from_db()
+        except ExamUpload.DoesNotExist:
+            raise UploadError("The upload is no longer available.", status=404)
+        if offset != upload.offset:
+            raise UploadError(
+                f"Upload-Offset {offset} does not match the {upload.offset} bytes "
+                "received so far.",
+                status=409,
+            )
+
+        # Bytes written by an interrupted request but never recorded are dropped
+        file.truncate(offset)
+        # Taken out of _hashers, so it is only kept again if the chunk is recorded
+        hasher = _resume_hasher(upload, file)
+        received: int = offset
+        try:
+            while chunk := stream.read(INGESTION_CHUNK_SIZE):
+                if received + len(chunk) > upload.length:
+                    raise UploadError("The chunk exceeds Upload-Length.", status=413)
+                file.write(chunk)
+                hasher.update(chunk)
+                received += len(chunk)
+                if not upload.mime_type and received >= min(
+                    MIME_SNIFF_SIZE, upload.length
+                ):
+                    _check_mime_type(upload, file)
+        except UnreadablePostError as e:
+            # The client went away; what arrived is kept for it to resume
+            logger.info(f"Upload {upload.pk} was interrupted at {received} bytes: {e}")
+        finally:
+            # Unless the upload was discarded for its MIME type
+            if upload.pk is not None:
+                _record_progress(upload, received)
+
+        if upload.is_complete and upload.exam_id is None:
+            _complete(upload, file, hasher.hexdigest())
+        else:
+            _keep_hasher(upload, hasher)
+    return upload
+
+
+def delete_upload(upload: ExamUpload) -> None:
+    """Discards an upload together with the bytes received so far."""
+    try:
+        os.remove(upload_path(upload))
+    except FileNotFoundError:
+        pass
+    with _hashers_lock:
+        _hashers.pop(upload.pk, None)
+    upload.delete()
+
+
+def purge_expired_uploads() -> int:
+    """
+    Deletes uploads without progress for EXAM_UPLOAD_EXPIRY seconds, as well as
+    partial files left without an upload. Returns the number of deleted uploads.
+    """
+    cutoff: datetime = timezone.now() - timedelta(seconds=settings.EXAM_UPLOAD_EXPIRY)
+    expired: list[ExamUpload] = list(ExamUpload.objects.filter(updated_at__lt=cutoff))
+    for upload in expired:
+        delete_upload(upload)
+
+    directory: str = os.path.join(settings.MEDIA_ROOT, settings.EXAM_UPLOAD_DIRECTORY)
+    if os.path.isdir(directory):
+        known: set[str] = {
+            f"{pk}.part" for pk in ExamUpload.objects.values_list("pk", flat=True)
+        }
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if (
+                    entry.name.endswith(".part")
+                    and entry.name not in known
+                    and entry.stat().st_mtime < cutoff.timestamp()
+                ):
+                    os.remove(entry.path)
+
+    _forget_stale_hashers()
+    return len(expired)
+
+
+def _resume_hasher(upload: ExamUpload, file: BinaryIO) -> "hashlib._Hash":
+    with _hashers_lock:
+        entry: tuple[int, "hashlib._Hash", float] | None = _hashers.pop(upload.pk, None)
+    if entry is not None and entry[0] == upload.offset:
+        file.seek(upload.offset)
+        return entry[1]
+
+    # Resumed in another process or after a restart
+    hasher = hashlib.sha256()
+    file.seek(0)
+    while chunk := file.read(INGESTION_CHUNK_SIZE):
+        hasher.update(chunk)
+    return hasher
+
+
+def _check_mime_type(upload: ExamUpload, file: BinaryIO) -> None:
+    position: int = file.tell()
+    file.seek(0)
+    # Named after the upload rather than its partial file, for the metrics
+    mime_type: str = extract_file_mime_type(File(file, name=upload.filename))
+    file.seek(position)
+
+    file_format: FileFormat | None = get_file_format(
+        os.path.splitext(upload.filename)[1].lower()
+    )
+    expected_mime_type: str | None = file_format.mime_type if file_format else None
+    if mime_type != expected_mime_type:
+        delete_upload(upload)
+        raise UploadError(
+            f"File MIME type '{mime_type}' does not match the expected MIME type "
+            f"'{expected_mime_type}' of '{upload.filename}'.",
+            status=415,
+        )
+    upload.mime_type = mime_type
+
+
+def _record_progress(upload: ExamUpload, received: int) -> None:
+    upload.offset = received
+    upload.updated_at = timezone.now()
+    ExamUpload.objects.filter(pk=upload.pk).update(
+        offset=upload.offset,
+        mime_type=upload.mime_type,
+        updated_at=upload.updated_at,
+    )
+
+
+def _keep_hasher(upload: ExamUpload, hasher: "hashlib._Hash") -> None:
+    with _hashers_lock:
+        _hashers[upload.pk] = (upload.offset, hasher, time.monotonic())
+    _forget_stale_hashers()
+
+
+def _forget_stale_hashers() -> None:
+    cutoff: float = time.monotonic() - settings.EXAM_UPLOAD_EXPIRY
+    with _hashers_lock:
+        for upload_id, (_, _, kept_at) in list(_hashers.items()):
+            if kept_at < cutoff:
+                del _hashers[upload_id]
+
+
+def _complete(upload: ExamUpload, file: BinaryIO, content_hash: str) -> None:
+    file.seek(0)
+    exam = Exam(year=upload.year, term=upload.term, course=upload.course)
+    exam.file = File(file, name=upload.filename)
+    # Gathered while the chunks arrived, so neither validation nor save() reread it
+    exam.file._ingestion = FileIngestion(
+        extension=extract_file_extension(exam.file),
+        mime_type=upload.mime_type,
+        size=upload.length,
+        content_hash=content_hash,
+    )
+    try:
+        exam.full_clean()
+    except ValidationError:
+        delete_upload(upload)
+        raise
+    exam.save()
+
+    upload.exam = exam
+    ExamUpload.objects.filter(pk=upload.pk).update(exam=exam)
+    os.remove(upload_path(upload))
@@ -0,0 +1,19 @@
+from django.urls import path
+
+from core import views
+
+app_name = "core"
+
+urlpatterns = [
+    path("exams/", views.exam_list, name="exam-list"),
+    path("exams/export/", views.exam_export, name="exam-export"),
+    path("exams/search/", views.exam_search, name="exam-search"),
+    path("exams/upload/", views.exam_upload, name="exam-upload"),
+    path("exams/<int:pk>/download/", views.exam_download, name="exam-download"),
+    path("exams/<int:pk>/thumbnail/", views.exam_thumbnail, name="exam-thumbnail"),
+    path("uploads/", views.upload_create, name="upload-create"),
+    path("uploads/<uuid:pk>/", views.upload_detail, name="upload-detail"),
+    path("courses/", views.course_list, name="course-list"),
+    path("fields-of-study/", views.field_of_study_list, name="field-of-study-list"),
+    path("degrees/", views.degree_list, name="degree-list"),
+]
@@ -1,21 +1,109 @@
 import datetime
+import hashlib
+from dataclasses import dataclass
 from typing import Tuple
 
-import magic
 from django.conf import settings
 from django.db.models.fields.files import FieldFile
 
+from core.metrics import (
+    FILE_INGESTION_SECONDS,
+    MIME_SNIFF_SECONDS,
+    file_type_label,
+)
+
 
 def extract_file_extension(file: FieldFile) -> str:
     return f".{file.name.split(".")[-1].lower()}"
 
 
+MIME_SNIFF_SIZE: int = 2048
+INGESTION_CHUNK_SIZE: int = 64 * 1024
+
+
+def _sniff_mime_type(head: bytes) -> str:
+    # libmagic is loaded on first use, not by every process importing this module
+    import magic
+
+    return magic.from_buffer(head, mime=True)
+
+
+@dataclass(frozen=True)
+class FileIngestion:
+    """Facts about an uploaded file, gathered in a single read."""
+
+    extension: str
+    mime_type: str
+    size: int
+    content_hash: str
+
+
+def ingest_file(file: FieldFile) -> FileIngestion:
+    """
+    Streams the file once to sniff its MIME type, measure its size and hash it.
+    The result is cached on the file, so validators and Exam.save() share one read.
+    """
+    cached: FileIngestion | None = _cached_ingestion(file)
+    if cached is not None:
+        return cached
+
+    with FILE_INGESTION_SECONDS.time(file_type=file_type_label(file.name)):
+        digest = hashlib.sha256()
+        head: bytes = b""
+        size: int = 0
+        for chunk in file.chunks(INGESTION_CHUNK_SIZE):
+            if len(head) < MIME_SNIFF_SIZE:
+                head += chunk[: MIME_SNIFF_SIZE - len(head)]
+            digest.update(chunk)
+            size += len(chunk)
+        file.seek(0)
+
+        ingestion = FileIngestion(
+            extension=extract_file_extension(file),
+            mime_type=_sniff_mime_type(head),
+            size=size,
+            content_hash=digest.hexdigest(),
+        )
+    file._ingestion = ingestion
+    return ingestion
+
+
+def _cached_ingestion(file: FieldFile) -> FileIngestion | None:
+    # Uploads ingested before they were assigned to an exam carry the result on the
+    # uploaded file, which the FieldFile of the exam wraps
+    return getattr(file, "_ingestion", None) or getattr(
+        file.__dict__.get("_file"), "_ingestion", None
+    )
+
+
+def forget_ingestion(file: FieldFile) -> None:
+    """Drops the cached ingestion result, e.g. after the file content was rewritten."""
+    file.__dict__.pop("_ingestion", None)
+    wrapped_file = file.__dict__.get("_file")
+    if wrapped_file is not None:
+        wrapped_file.__dict__.pop("_ingestion", None)
+
+
 def extract_file_mime_type(file: FieldFile) -> str:
-    file_mime_type: str = magic.from_buffer(file.read(2048), mime=True)
-    file.seek(0)
+    cached: FileIngestion | None = _cached_ingestion(file)
+    if cached is not None:
+        return cached.mime_type
+
+    with MIME_SNIFF_SECONDS.time(file_type=file_type_label(file.name)):
+        file_mime_type: str = _sniff_mime_type(file.read(MIME_SNIFF_SIZE))
+        file.seek(0)
     return file_mime_type
 
 
+def compute_file_hash(file: FieldFile, chunk_size: int = INGESTION_CHUNK_SIZE) -> str:
+    """Computes the SHA-256 hex digest of the file, streaming it in chunks."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks(chunk_size):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
 def to_snake_case(s: str) -> str:
     return s.casefold().replace(" ", "_")
 
@@ -36,9 +124,11 @@ def get_current_term_and_year() -> Tuple[str, str]:
             ):
                 return (
                     term["code"],
-                    current_year
-                    if current_month_day >= start_month_day
-                    else current_year - 1,
+                    (
+                        current_year
+                        if current_month_day >= start_month_day
+                        else current_year - 1
+                    ),
                 )
         else:
             if start_month_day <= current_month_day <= end_month_day:
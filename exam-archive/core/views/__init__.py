@@ -0,0 +1,15 @@
+from core.views.api_views import (  # noqa: F401
+    course_list,
+    degree_list,
+    exam_list,
+    exam_search,
+    field_of_study_list,
+)
+from core.views.download_views import exam_download, exam_thumbnail  # noqa: F401
+from core.views.export_views import exam_export  # noqa: F401
+from core.views.metrics_views import metrics  # noqa: F401
+from core.views.upload_views import (  # noqa: F401
+    exam_upload,
+    upload_create,
+    upload_detail,
+)
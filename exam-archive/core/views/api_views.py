@@ -0,0 +1,221 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections
+from django.db.models import Count, Prefetch, Q, QuerySet
+from django.http import HttpRequest, JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+
+from core.artifacts import current_artifacts
+from core.cache import cache_listing
+from core.filters import filter_courses, filter_exams
+from core.models import Course, DegreeType, Exam, ExamArtifacts, FieldOfStudy
+from core.pagination import paginate_by_keyset
+from core.search import BaseSearchBackend, SearchHit, get_search_backend
+
+EXAM_ORDERING: tuple[str, ...] = ("-year", "-id")
+COURSE_ORDERING: tuple[str, ...] = ("title", "id")
+DEFAULT_SEARCH_LIMIT: int = 20
+MAX_SEARCH_LIMIT: int = 100
+
+
+def _error(error: ValidationError, status: int = 400) -> JsonResponse:
+    return JsonResponse({"errors": error.messages}, status=status)
+
+
+def _serialize_degree(degree: DegreeType) -> dict:
+    return {"id": degree.pk, "name": degree.name}
+
+
+def _serialize_field_of_study(field_of_study: FieldOfStudy) -> dict:
+    return {
+        "id": field_of_study.pk,
+        "name": field_of_study.name,
+        "abbreviation": field_of_study.abbreviation,
+        "degree": _serialize_degree(field_of_study.degree),
+    }
+
+
+def _serialize_course(course: Course) -> dict:
+    return {
+        "id": course.pk,
+        "title": course.title,
+        "fields_of_study": [
+            _serialize_field_of_study(field_of_study)
+            for field_of_study in course.fields_of_study.all()
+        ],
+    }
+
+
+def _serialize_artifacts(exam: Exam) -> dict | None:
+    artifacts: ExamArtifacts | None = current_artifacts(exam)
+    if artifacts is None:
+        return None
+    return {
+        "file_size": artifacts.file_size,
+        "page_count": artifacts.page_count,
+        "preview": artifacts.preview,
+        "thumbnail_url": (
+            reverse("core:exam-thumbnail", args=[exam.pk])
+            if artifacts.has_thumbnail
+            else None
+        ),
+    }
+
+
+def _serialize_exam(exam: Exam) -> dict:
+    return {
+        "id": exam.pk,
+        "file_name": exam.file_name,
+        "file_type": exam.file_type,
+        "year": exam.year,
+        "term": exam.term,
+        "readable_term": exam.readable_term,
+        "course": _serialize_course(exam.course),
+        "download_url": reverse("core:exam-download", args=[exam.pk]),
+        "artifacts": _serialize_artifacts(exam),
+    }
+
+
+@require_GET
+@cache_listing
+def exam_list(request: HttpRequest) -> JsonResponse:
+    exams = (
+        Exam.objects.published()
+        .with_readable_term()
+        .select_related("course", "artifacts")
+        .prefetch_related(
+            Prefetch(
+                "course__fields_of_study",
+                queryset=FieldOfStudy.objects.select_related("degree"),
+            )
+        )
+    )
+    try:
+        exams = filter_exams(exams, request.GET)
+        page, next_cursor = paginate_by_keyset(exams, request.GET, EXAM_ORDERING)
+    except ValidationError as e:
+        return _error(e)
+
+    return JsonResponse(
+        {
+            "results": [_serialize_exam(exam) for exam in page],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+def _search(
+    backend: BaseSearchBackend, query: str, exams: QuerySet, limit: int
+) -> list[SearchHit]:
+    try:
+        return backend.search(query, exams, limit)
+    finally:
+        # The request cycle only closes the connections of the thread shared by all
+        # ORM calls, not the one of the thread the search ran in
+        close_old_connections()
+
+
+@require_GET
+@cache_listing
+async def exam_search(request: HttpRequest) -> JsonResponse:
+    """
+    Searches the text of published exams. Accepts the filters of the exam list;
+    results are ranked by relevance and carry a snippet with <mark>ed matches.
+    """
+    query: str = request.GET.get("q", "").strip()
+    if not query:
+        return _error(ValidationError("'q' is required."))
+
+    try:
+        exams = filter_exams(Exam.objects.published(), request.GET)
+        limit: int = int(request.GET.get("limit") or DEFAULT_SEARCH_LIMIT)
+    except ValidationError as e:
+        return _error(e)
+    except ValueError:
+        return _error(ValidationError("'limit' must be an integer."))
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+
+    # Ranking runs in a worker thread, keeping the event loop free under ASGI. It is
+    # not thread-sensitive, so concurrent searches do not queue up behind each other
+    # in the one thread shared by all ORM calls
+    backend: BaseSearchBackend = await sync_to_async(get_search_backend)()
+    hits: list[SearchHit] = await sync_to_async(_search, thread_sensitive=False)(
+        backend, query, exams, limit
+    )
+    exams_by_id: dict[int, Exam] = await (
+        Exam.objects.with_readable_term()
+        .select_related("course", "artifacts")
+        .prefetch_related(
+            Prefetch(
+                "course__fields_of_study",
+                queryset=FieldOfStudy.objects.select_related("degree"),
+            )
+        )
+        .ain_bulk([hit.exam_id for hit in hits])
+    )
+
+    return JsonResponse(
+        {
+            "results": [
+                {
+                    **_serialize_exam(exams_by_id[hit.exam_id]),
+                    "score": round(hit.score, 4),
+                    "snippet": hit.snippet,
+                }
+                for hit in hits
+                if hit.exam_id in exams_by_id
+            ]
+        }
+    )
+
+
+@require_GET
+@cache_listing
+def course_list(request: HttpRequest) -> JsonResponse:
+    courses = Course.objects.annotate(
+        exam_count=Count(
+            "exam", filter=Q(exam__metadata_status=Exam.MetadataStatus.DONE)
+        )
+    ).prefetch_related(
+        Prefetch(
+            "fields_of_study", queryset=FieldOfStudy.objects.select_related("degree")
+        )
+    )
+    try:
+        courses = filter_courses(courses, request.GET)
+        page, next_cursor = paginate_by_keyset(courses, request.GET, COURSE_ORDERING)
+    except ValidationError as e:
+        return _error(e)
+
+    return JsonResponse(
+        {
+            "results": [
+                {**_serialize_course(course), "exam_count": course.exam_count}
+                for course in page
+            ],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+@require_GET
+@cache_listing
+def field_of_study_list(request: HttpRequest) -> JsonResponse:
+    fields_of_study = FieldOfStudy.objects.select_related("degree").order_by("name")
+    degree: str | None = request.GET.get("degree")
+    if degree:
+        if not degree.isdigit():
+            return _error(ValidationError("'degree' must be an integer."))
+        fields_of_study = fields_of_study.filter(degree_id=degree)
+
+    return JsonResponse(
+        {"results": [_serialize_field_of_study(f) for f in fields_of_study]}
+    )
+
+
+@require_GET
+@cache_listing
+def degree_list(request: HttpRequest) -> JsonResponse:
+    degrees = DegreeType.objects.order_by("name")
+    return JsonResponse({"results": [_serialize_degree(d) for d in degrees]})
@@ -0,0 +1,214 @@
+import re
+from collections.abc import AsyncIterator
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.storage import Storage, default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBase,
+)
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header
+from django.views.decorators.http import require_safe
+
+from core.artifacts import THUMBNAIL_CONTENT_TYPE, current_artifacts, thumbnail_name
+from core.models import Exam, ExamArtifacts
+from core.registry import FileFormat, get_file_format
+from core.utils import extract_file_extension
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+STREAM_CHUNK_SIZE: int = 64 * 1024
+
+
+class _FileRange:
+    """Read-only view on a byte range of an open file."""
+
+    def __init__(self, file, start: int, length: int) -> None:
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data: bytes = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self) -> None:
+        self.file.close()
+
+
+async def _stream_file(
+    storage: Storage, name: str, start: int, length: int
+) -> AsyncIterator[bytes]:
+    """
+    Streams a byte range of a stored file to ASGI clients. Reads happen in worker
+    threads, so the event loop keeps serving other requests while a slow client
+    drains its download, without occupying a thread in between.
+    """
+    # Opened on the first chunk, so responses that are never sent hold no file
+    file = await sync_to_async(storage.open, thread_sensitive=False)(name, "rb")
+    read = sync_to_async(file.read, thread_sensitive=False)
+    try:
+        await sync_to_async(file.seek, thread_sensitive=False)(start)
+        remaining: int = length
+        while remaining > 0:
+            chunk: bytes = await read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        await sync_to_async(file.close, thread_sensitive=False)()
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Parses a single-range 'Range' header into an inclusive (start, end) pair.
+    Returns None for headers that should be ignored, raises ValueError if the
+    range cannot be satisfied.
+    """
+    match = _RANGE_PATTERN.match(header.replace(" ", ""))
+    if not match or match.groups() == ("", ""):
+        # Multiple ranges are rare for downloads; serving the full file is allowed
+        return None
+
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+
+    if start >= size or start > end:
+        raise ValueError(f"Range {header!r} not satisfiable for {size} bytes.")
+    return start, end
+
+
+def _content_type(exam: Exam) -> str:
+    file_format: FileFormat | None = get_file_format(extract_file_extension(exam.file))
+    return file_format.mime_type if file_format else "application/octet-stream"
+
+
+def _offloaded_response(exam: Exam, content_type: str) -> HttpResponse | None:
+    location: str = settings.EXAM_DOWNLOAD_ACCEL_REDIRECT_LOCATION
+    if location:
+        response = HttpResponse(content_type=content_type)
+        # nginx decodes the URI and treats '?' as the start of the query string
+        response["X-Accel-Redirect"] = f"{location.rstrip('/')}/{quote(exam.file.name)}"
+        return response
+
+    if settings.EXAM_DOWNLOAD_SENDFILE:
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = exam.file.path
+        return response
+
+    return None
+
+
+@require_safe
+async def exam_download(request: HttpRequest, pk: int) -> HttpResponseBase:
+    exam: Exam = await aget_object_or_404(
+        Exam.objects.published().select_related("course"), pk=pk
+    )
+    etag: str | None = f'"{exam.content_hash}"' if exam.content_hash else None
+
+    conditional_response = get_conditional_response(request, etag=etag)
+    if conditional_response is not None:
+        if etag:
+            conditional_response["ETag"] = etag
+        return conditional_response
+
+    content_type: str = _content_type(exam)
+
+    # The front-end server handles ranges and conditional requests by itself
+    response: HttpResponseBase | None = _offloaded_response(exam, content_type)
+    if response is None:
+        response = await _file_response(request, exam, content_type, etag)
+
+    # Winter terms read e.g. 'WS-2023/24', which is not a valid file name
+    download_name: str = exam.file_name.replace("/", "-")
+    response["Content-Disposition"] = content_disposition_header(True, download_name)
+    if etag:
+        response["ETag"] = etag
+    return response
+
+
+async def _file_response(
+    request: HttpRequest, exam: Exam, content_type: str, etag: str | None
+) -> HttpResponseBase:
+    storage: Storage = exam.file.storage
+    size: int = await sync_to_async(storage.size, thread_sensitive=False)(
+        exam.file.name
+    )
+
+    byte_range: tuple[int, int] | None = None
+    range_header: str = request.headers.get("Range", "")
+    if_range: str = request.headers.get("If-Range", "")
+    # A stale If-Range validator means the client has to fetch the whole file again
+    if range_header and (not if_range or if_range == etag):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    start, end = byte_range or (0, size - 1)
+    if isinstance(request, ASGIRequest):
+        # No thread is held while the client is slow to receive the file
+        response = FileResponse(
+            _stream_file(storage, exam.file.name, start, end - start + 1),
+            content_type=content_type,
+        )
+        response["Content-Length"] = end - start + 1
+    else:
+        file = await sync_to_async(storage.open, thread_sensitive=False)(
+            exam.file.name, "rb"
+        )
+        # Whole files go through wsgi.file_wrapper, i.e. sendfile() where available
+        response = FileResponse(
+            file if byte_range is None else _FileRange(file, start, end - start + 1),
+            content_type=content_type,
+        )
+
+    if byte_range is not None:
+        response.status_code = 206
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+@require_safe
+def exam_thumbnail(request: HttpRequest, pk: int) -> HttpResponseBase:
+    exam: Exam = get_object_or_404(
+        Exam.objects.published().select_related("artifacts"), pk=pk
+    )
+    artifacts: ExamArtifacts | None = current_artifacts(exam)
+    if artifacts is None or not artifacts.has_thumbnail:
+        raise Http404("The exam has no thumbnail.")
+
+    # Thumbnails are stored by content hash, so the hash identifies them as well
+    etag: str = f'"{exam.content_hash}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = FileResponse(
+            default_storage.open(thumbnail_name(exam.content_hash)),
+            content_type=THUMBNAIL_CONTENT_TYPE,
+        )
+    response["ETag"] = etag
+    patch_cache_control(
+        response, public=True, max_age=settings.EXAM_THUMBNAIL_CACHE_MAX_AGE
+    )
+    return response
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import (
+    HttpRequest,
+    HttpResponseBase,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header
+from django.views.decorators.http import require_safe
+
+from core.export import export_etag, export_file_name, stream_exam_archive
+from core.filters import filter_exams
+from core.models import Exam
+
+EXPORT_FILTERS: tuple[str, ...] = ("course", "field_of_study", "degree", "year", "term")
+
+
+@require_safe
+def exam_export(request: HttpRequest) -> HttpResponseBase:
+    if not any(request.GET.get(key) for key in EXPORT_FILTERS):
+        return JsonResponse(
+            {"errors": [f"Filter by at least one of: {', '.join(EXPORT_FILTERS)}."]},
+            status=400,
+        )
+
+    try:
+        exams = filter_exams(Exam.objects.published(), request.GET)
+        etag: str = export_etag(exams)
+    except ValidationError as e:
+        return JsonResponse({"errors": e.messages}, status=400)
+
+    response: HttpResponseBase | None = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = StreamingHttpResponse(
+            stream_exam_archive(
+                exams.select_related("course").order_by("course__title", "-year")
+            ),
+            content_type="application/zip",
+        )
+        response["Content-Disposition"] = content_disposition_header(
+            True, export_file_name(exams, request.GET)
+        )
+
+    # Lets a caching proxy in front of Django serve repeated exports of a filter
+    response["ETag"] = etag
+    patch_cache_control(
+        response, public=True, max_age=settings.EXAM_EXPORT_CACHE_MAX_AGE
+    )
+    return response
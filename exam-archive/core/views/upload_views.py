@@ -0,0 +1,173 @@
+from uuid import UUID
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.http import HttpRequest, HttpResponse, JsonResponse, QueryDict
+from django.urls import reverse
+from django.utils.http import http_date
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import require_http_methods, require_POST
+
+from core.forms import ExamUploadForm
+from core.models import Exam, ExamUpload
+from core.uploads import (
+    UploadError,
+    append_chunk,
+    create_upload,
+    delete_upload,
+    parse_metadata,
+    upload_expires_at,
+)
+from core.utils import ingest_file
+
+TUS_VERSION: str = "1.0.0"
+
+
+async def _get_uploader(request: HttpRequest):
+    """The requesting user, if allowed to upload exams."""
+    user = await request.auser()
+    return user if await sync_to_async(user.has_perm)("core.add_exam") else None
+
+
+def _forbidden() -> JsonResponse:
+    return JsonResponse(
+        {"errors": ["You are not allowed to upload exams."]}, status=403
+    )
+
+
+def _read_form_data(request: HttpRequest) -> tuple[QueryDict, dict]:
+    # Parsing the multipart body blocks
+    return request.POST, request.FILES
+
+
+def _create_exam(data: QueryDict, files: dict) -> tuple[Exam | None, dict]:
+    # Validation and saving reuse the ingestion of the file, but query the database
+    form = ExamUploadForm(data, files)
+    if not form.is_valid():
+        return None, {field: list(errors) for field, errors in form.errors.items()}
+    return form.save(), {}
+
+
+@require_POST
+async def exam_upload(request: HttpRequest) -> JsonResponse:
+    """
+    Creates an exam from a multipart upload with 'file', 'year', 'term' and 'course'.
+    The exam is published once its metadata job is done, see
+    EXAM_METADATA_JOB_BACKEND.
+    """
+    if await _get_uploader(request) is None:
+        return _forbidden()
+
+    data, files = await sync_to_async(_read_form_data)(request)
+    upload: UploadedFile | None = files.get("file")
+    if upload is not None:
+        # Hashing needs no database, so concurrent uploads are hashed in parallel
+        # instead of one after another in the thread shared by all ORM calls
+        await sync_to_async(ingest_file, thread_sensitive=False)(upload)
+    exam, errors = await sync_to_async(_create_exam)(data, files)
+    if exam is None:
+        return JsonResponse({"errors": errors}, status=400)
+
+    return JsonResponse(
+        {"id": exam.pk, "metadata_status": exam.metadata_status}, status=202
+    )
+
+
+def _tus_response(status: int = 204, upload: ExamUpload | None = None) -> HttpResponse:
+    response = HttpResponse(status=status)
+    response["Tus-Resumable"] = TUS_VERSION
+    if upload is not None:
+        response["Upload-Offset"] = upload.offset
+        response["Upload-Length"] = upload.length
+        response["Upload-Expires"] = http_date(upload_expires_at(upload).timestamp())
+        response["Cache-Control"] = "no-store"
+        if upload.exam_id is not None:
+            response["X-Exam-Id"] = upload.exam_id
+    return response
+
+
+def _upload_error(error: UploadError | ValidationError) -> JsonResponse:
+    if isinstance(error, ValidationError):
+        response = JsonResponse({"errors": error.message_dict}, status=400)
+    else:
+        response = JsonResponse({"errors": [str(error)]}, status=error.status)
+    response["Tus-Resumable"] = TUS_VERSION
+    return response
+
+
+@require_http_methods(["OPTIONS", "POST"])
+@ensure_csrf_cookie
+async def upload_create(request: HttpRequest) -> HttpResponse:
+    """
+    Starts a resumable upload, following the tus 1.0 protocol with the creation and
+    termination extensions. 'Upload-Metadata' carries the filename and the year,
+    term and course of the exam.
+
+    Uploads are authenticated by the session, so like every unsafe request, POST,
+    PATCH and DELETE need the CSRF token in the X-CSRFToken header. tus clients take
+    it from the csrftoken cookie, which an OPTIONS request sets, and send it as a
+    custom header, e.g. through the 'headers' option of tus-js-client.
+    """
+    if request.method == "OPTIONS":
+        response = _tus_response()
+        response["Tus-Version"] = TUS_VERSION
+        response["Tus-Extension"] = "creation,termination"
+        response["Tus-Max-Size"] = settings.EXAM_MAX_UPLOAD_FILE_SIZE
+        return response
+
+    user = await _get_uploader(request)
+    if user is None:
+        return _forbidden()
+    try:
+        length: int = int(request.headers.get("Upload-Length", ""))
+        upload: ExamUpload = await sync_to_async(create_upload)(
+            length,
+            parse_metadata(request.headers.get("Upload-Metadata", "")),
+            user,
+        )
+    except ValueError:
+        return _upload_error(UploadError("Upload-Length must be an integer."))
+    except (UploadError, ValidationError) as e:
+        return _upload_error(e)
+
+    response = _tus_response(201, upload)
+    response["Location"] = reverse("core:upload-detail", args=[upload.pk])
+    return response
+
+
+@require_http_methods(["HEAD", "PATCH", "DELETE"])
+async def upload_detail(request: HttpRequest, pk: UUID) -> HttpResponse:
+    """Reports the offset of an upload, appends a chunk to it, or discards it."""
+    user = await _get_uploader(request)
+    if user is None:
+        return _forbidden()
+    upload: ExamUpload | None = await ExamUpload.objects.filter(
+        pk=pk, created_by=user
+    ).afirst()
+    if upload is None:
+        return _upload_error(UploadError("Upload not found.", status=404))
+
+    if request.method == "HEAD":
+        return _tus_response(200, upload)
+
+    if request.method == "DELETE":
+        await sync_to_async(delete_upload)(upload)
+        return _tus_response()
+
+    if request.content_type != "application/offset+octet-stream":
+        return _upload_error(
+            UploadError(
+                "Chunks must be sent as application/offset+octet-stream.", status=415
+            )
+        )
+    try:
+        offset: int = int(request.headers.get("Upload-Offset", ""))
+        # Appending and hashing block, so they run in a worker thread
+        upload = await sync_to_async(append_chunk)(upload, offset, request)
+    except ValueError:
+        return _upload_error(UploadError("Upload-Offset must be an integer."))
+    except (UploadError, ValidationError) as e:
+        return _upload_error(e)
+    return _tus_response(upload=upload)
@@ -0,0 +1,31 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+_is_worker_process: bool = False
+
+
+def setup_worker_process() -> None:
+    """Initializes Django in a freshly spawned worker process."""
+    global _is_worker_process
+    import django
+
+    _is_worker_process = True
+    django.setup()
+
+
+def in_worker_process() -> bool:
+    """Whether this process is a worker of a pool from create_process_pool()."""
+    return _is_worker_process
+
+
+def create_process_pool(max_workers: int | None = None) -> ProcessPoolExecutor:
+    """
+    Creates a process pool whose workers can use the ORM and settings.
+    Workers are spawned instead of forked, so they never inherit open database
+    connections or locks held by threads of the parent process.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=setup_worker_process,
+    )
@@ -0,0 +1,17 @@
+#!/bin/bash
+
+# Source the shared virtual environment check script
+source ./scripts/check_venv.sh
+
+# Generate a synthetic archive with exam files, passing all arguments on,
+# e.g. ./scripts/seed_archive.sh --exams 200000 --courses 2000
+echo "Generating synthetic archive: $*"
+python manage.py seed_archive "$@"
+
+# Check if the generation was successful
+if [ $? -eq 0 ]; then
+    echo "Synthetic archive generated successfully!"
+else
+    echo "Failed to generate synthetic archive!"
+    exit 1
+fi